@@ -0,0 +1,21 @@
+import os
+from typing import Dict, List
+import syntaxlight
+
+test_folder_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test")
+
+
+def load_test_files(limit: int = None) -> Dict[str, List[str]]:
+    """
+    test/ 下每种支持的语言的测试文件 (language -> 文件路径列表), 按文件名的编号排序
+
+    limit 不为 None 时每种语言只取前 limit 个文件
+    """
+    test_files = {}
+    for language in syntaxlight.supported_languages:
+        language_path = os.path.join(test_folder_path, language)
+        if not os.path.isdir(language_path):
+            continue
+        files = sorted(os.listdir(language_path), key=lambda x: int(os.path.splitext(x)[0]))[:limit]
+        test_files[language] = [os.path.join(language_path, file) for file in files]
+    return test_files
@@ -0,0 +1,33 @@
+import unittest
+from syntaxlight.gdt import GlobalDescriptorTable, CSS
+
+
+class TestScope(unittest.TestCase):
+    def test_shadowed_scope(self):
+        # 同名作用域嵌套时内外层的描述符内容相同, 离开内层后可见的应当是外层的描述符本身
+        gdt = GlobalDescriptorTable()
+        gdt.register_id("T", CSS.TYPEDEF, scope="block")
+        outer = gdt._scopes[-1][1]["T"]
+        gdt.push_scope("block")
+        gdt.register_id("T", CSS.TYPEDEF, scope="block")
+        inner = gdt._scopes[-1][1]["T"]
+        self.assertEqual(inner, outer)
+        self.assertIsNot(inner, outer)
+
+        gdt.pop_scope("block")
+        self.assertIs(gdt._visible["T"][-1], outer)
+        self.assertEqual(gdt["T"], CSS.TYPEDEF)
+
+        # 外层重新注册时替换的也是外层的描述符
+        gdt.push_scope("block")
+        gdt.register_id("T", CSS.TYPEDEF, scope="block")
+        gdt.pop_scope("block")
+        gdt.register_id("T", CSS.MACRO_DEFINE, scope="block")
+        self.assertEqual(gdt["T"], CSS.MACRO_DEFINE)
+        gdt.pop_scope("block")
+        self.assertNotIn("T", gdt)
+        self.assertEqual(gdt._visible, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
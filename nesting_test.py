@@ -0,0 +1,79 @@
+import re
+import sys
+import html
+import unittest
+import syntaxlight
+
+# 远超默认递归深度限制的嵌套层数, 解析不应依赖 Python 的调用栈
+DEPTH = sys.getrecursionlimit() * 3
+
+
+def nested(open_text: str, inner: str, close_text: str, depth: int = DEPTH) -> str:
+    return open_text * depth + inner + close_text * depth
+
+
+class TestNesting(unittest.TestCase):
+    def assert_parse(self, text: str, language: str):
+        result = syntaxlight.parse(text, language, file_path=f"nesting.{language}")
+        self.assertTrue(result.success, result.error)
+        # 去掉 span 后的 html 与原文一致, 所有 token 都被保留
+        code = html.unescape(re.sub(r"<[^>]*>", "", result.parser.to_html()))
+        self.assertEqual(code, text.rstrip())
+
+    def test_c(self):
+        for expr in (
+            nested("(", "1", ")"),
+            nested("-(", "1", ")"),
+            nested("a[", "0", "]"),
+            nested("f(", "0", ")"),
+            nested("sizeof(", "a", ")"),
+            "1" + " + 1" * DEPTH,
+            "a" + " = a" * DEPTH,
+            "a" + " ? b : a" * DEPTH,
+        ):
+            self.assert_parse(f"int x = {expr};\n", "c")
+
+    def test_lua(self):
+        for expr in (
+            nested("(", "1", ")"),
+            nested("-(", "1", ")"),
+            nested("t[", "1", "]"),
+            "1" + " + 1" * DEPTH,
+        ):
+            self.assert_parse(f"x = {expr}\n", "lua")
+
+    def test_rust(self):
+        for expr in (
+            nested("(", "1", ")"),
+            nested("-(", "1", ")"),
+            nested("[", "1", "]"),
+            "1" + " + 1" * DEPTH,
+        ):
+            self.assert_parse(f"fn main() {{ let x = {expr}; }}\n", "rust")
+
+    def test_verilog(self):
+        for expr in (
+            nested("(", "1", ")"),
+            nested("a[", "0", "]"),
+            "1" + " + 1" * DEPTH,
+        ):
+            self.assert_parse(f"module m(input a); assign x = {expr}; endmodule\n", "verilog")
+
+    def test_json(self):
+        self.assert_parse(nested("[", "1", "]"), "json")
+        self.assert_parse(nested('{"a": ', "1", "}"), "json")
+
+    def test_xml(self):
+        self.assert_parse(nested("<a>", "x", "</a>"), "xml")
+
+    def test_toml(self):
+        self.assert_parse("k = " + nested("[", "1", "]") + "\n", "toml")
+        self.assert_parse("k = " + nested("{a = ", "1", "}") + "\n", "toml")
+
+    def test_dot(self):
+        self.assert_parse("graph {" + nested("a -- {", "b", "}") + "}", "dot")
+        self.assert_parse("graph {" + nested("subgraph {", "b", "}") + "}", "dot")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import syntaxlight
+from syntaxlight.syntax_parse import get_parser
+from corpus import load_test_files
+
+TEST_FILES = load_test_files()
+
+
+def highlight(file_path: str, language: str, **kwargs):
+    result = syntaxlight.parse_file(file_path, language, **kwargs)
+    return result.success, result.parser.to_html(), result.parser
+
+
+class TestParseMode(unittest.TestCase):
+    def test_build_ast(self):
+        # build_ast=False 只为 token 添加 CSS 类名, 高亮结果与默认模式一致
+        for language, files in TEST_FILES.items():
+            for file_path in files:
+                with self.subTest(file_path=file_path):
+                    success, expected, _ = highlight(file_path, language)
+                    result = highlight(file_path, language, build_ast=False)
+                    self.assertEqual(result[:2], (success, expected))
+                    self.assertIsNone(result[2].root)
+
+    def test_packrat_window(self):
+        # 缓存向后查看的判断结果不影响高亮结果, 窗口很小时缓存被频繁淘汰也一样
+        for language, files in TEST_FILES.items():
+            for file_path in files:
+                with self.subTest(file_path=file_path):
+                    success, expected, _ = highlight(file_path, language)
+                    for packrat_window in (1, 64):
+                        result = highlight(file_path, language, packrat_window=packrat_window)
+                        self.assertEqual(result[:2], (success, expected))
+
+    def test_packrat_peek(self):
+        # 同一位置的 peek 在 invisible_characters 改变 (例如 C 开始预处理) 后重新计算
+        parser = get_parser("a\nb c;", "c")
+        parser.context.packrat_window = 8
+        self.assertEqual(parser.peek_next_token().value, "b")
+        parser.lexer.invisible_characters = parser.lexer.invisible_characters - {"\n"}
+        self.assertEqual(parser.peek_next_token().value, "\n")
+        self.assertEqual(parser.peek_next_token(2).value, "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
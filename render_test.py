@@ -0,0 +1,178 @@
+import io
+import os
+import re
+import tempfile
+import unittest
+from html import escape, unescape
+from html.parser import HTMLParser
+import syntaxlight
+from syntaxlight.token import Token, TokenType
+from syntaxlight.stylesheet import CSS_DIR, parse_css, parse_declarations, load_themes
+from corpus import load_test_files
+
+# 每种语言取前几个测试文件
+TEST_FILES = load_test_files(limit=3)
+
+
+THEMES = [theme for theme in load_themes() if theme != "others"]
+SCOPE_PATTERN = re.compile(r'^pre\[class\*="language-[\w-]*"\]\s*')
+# 会被子元素继承的属性, 其余属性 (例如 background) 每一层 span 分别生效
+INHERITED_PROPERTIES = ("color", "font-style", "font-weight")
+
+
+def css_rules(css_content: str):
+    """
+    css 中作用于 span 的规则, (优先级, 出现的顺序, 要求的 class, 声明)
+    """
+    rules = []
+    for selector, declarations in parse_css(css_content):
+        selector = SCOPE_PATTERN.sub("", selector)
+        if selector == "code span":
+            # minify 时 .Token 的规则, 匹配所有 span, 优先级低于任何 class 选择器
+            classes, specificity = frozenset(), 0
+        elif selector.startswith("."):
+            classes = frozenset(selector[1:].split("."))
+            specificity = len(classes)
+        else:
+            continue
+        rules.append((specificity, len(rules), classes, parse_declarations(declarations)))
+    return sorted(rules, key=lambda rule: rule[:2])
+
+
+class SpanStyles(HTMLParser):
+    """
+    按照 css 规则计算每个非空白字符最终的样式
+    """
+
+    def __init__(self, rules) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rules = rules
+        self.stack = []
+        self.styles = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if attrs.get("style") is not None:
+            style = parse_declarations(attrs["style"])
+        else:
+            classes = frozenset((attrs.get("class") or "").split())
+            style = {}
+            for _, _, rule_classes, declarations in self.rules:
+                if rule_classes <= classes:
+                    style.update(declarations)
+        self.stack.append(style)
+
+    def handle_endtag(self, tag):
+        self.stack.pop()
+
+    def handle_data(self, data):
+        style = {}
+        for span_style in self.stack:
+            for name, value in span_style.items():
+                if name in INHERITED_PROPERTIES:
+                    style[name] = value
+                else:
+                    style[name] = style.get(name, ()) + (value,)
+        for char in data:
+            if not char.isspace():
+                self.styles.append((char, style))
+
+
+def span_styles(html: str, css_content: str = ""):
+    parser = SpanStyles(css_rules(css_content))
+    parser.feed(html)
+    parser.close()
+    return parser.styles
+
+
+def get_parser(file_path: str, language: str):
+    # to_html 会修改 token 的 class (例如 BraceDepth), 每次渲染都重新解析
+    return syntaxlight.parse_file(file_path, language).parser
+
+
+class TestRender(unittest.TestCase):
+    def test_chunks(self):
+        # 分段生成/写入的 html 拼接后与 to_html 相同
+        for language, files in TEST_FILES.items():
+            for file_path in files:
+                with self.subTest(file_path=file_path):
+                    expected = get_parser(file_path, language).to_html([2], [3])
+                    chunks = list(get_parser(file_path, language).iter_html([2], [3], chunk_tokens=7))
+                    self.assertEqual("".join(chunks), expected)
+                    sink = io.StringIO()
+                    get_parser(file_path, language).write_html(sink, [2], [3])
+                    self.assertEqual(sink.getvalue(), expected)
+
+    def test_unpositioned_token(self):
+        # 没有位置且与原文不同的 token 不影响其前后 gap 的输出, 之后的 token 从下一个有位置的 token 重新同步
+        text = "int a  =\tb;\nint c;"
+        parser = syntaxlight.parse(text, "c").parser
+        parser.token_list[1] = Token(TokenType.ID, "x")
+        html = parser.to_html([], [3, 5])
+        code = unescape(re.sub(r"<[^>]*>", "", html))
+        self.assertEqual(code, text.replace("a", "x", 1))
+        self.assertEqual(re.findall(r'<span class="Token HighlightToken">([^<]*)</span>', html), ["  ", "\t"])
+
+    def test_highlight_tokens(self):
+        # 空白不再生成 token, highlight_tokens 仍然按照以前的方式编号: 连续的空格为一个 token, 其他空白字符各为一个 token
+        text = '{"a":  1,\n\t"b": 2}'
+        expected = {0: "{", 3: "  ", 4: "1", 5: ",", 6: "\n", 7: "\t", 8: '"b"', 10: " ", 11: "2", 12: "}"}
+        for index, value in expected.items():
+            with self.subTest(index=index):
+                html = syntaxlight.parse(text, "json").parser.to_html([], [index])
+                highlighted = re.findall(r'<span class="[^"]*HighlightToken[^"]*">([^<]*)</span>', html)
+                self.assertEqual(highlighted, [escape(value)])
+
+        # 高亮行中的空白同时保留 HighlightLine
+        html = syntaxlight.parse(text, "json").parser.to_html([2], [7])
+        self.assertIn('<span class="Token HighlightLine HighlightToken">\t</span>', html)
+
+    def test_render_modes(self):
+        # 各种渲染模式配合对应的 css 后, 每个字符的样式与默认输出配合完整的 css 相同
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for theme in THEMES:
+                full_dir = os.path.join(tmp_dir, theme, "full")
+                minify_dir = os.path.join(tmp_dir, theme, "minify")
+                os.makedirs(full_dir)
+                os.makedirs(minify_dir)
+                for language, files in TEST_FILES.items():
+                    if not os.path.exists(os.path.join(CSS_DIR, f"{language}.css")):
+                        continue
+                    syntaxlight.export_css([language], full_dir, theme)
+                    syntaxlight.export_css([language], minify_dir, theme, minify=True)
+                    with open(os.path.join(full_dir, f"{language}.css"), encoding="utf-8") as f:
+                        full_css = f.read()
+                    with open(os.path.join(minify_dir, f"{language}.css"), encoding="utf-8") as f:
+                        minify_css = f.read()
+
+                    for file_path in files:
+                        with self.subTest(theme=theme, file_path=file_path):
+                            html = get_parser(file_path, language).to_html([2], [3])
+                            expected = span_styles(html, full_css)
+
+                            def render(**kwargs):
+                                return get_parser(file_path, language).to_html([2], [3], **kwargs)
+
+                            self.assertEqual(span_styles(render(merge_spans=True), full_css), expected)
+                            self.assertEqual(span_styles(render(prune_classes=True), full_css), expected)
+                            self.assertEqual(span_styles(render(minify=True), minify_css), expected)
+                            self.assertEqual(span_styles(render(minify=True, merge_spans=True), minify_css), expected)
+                            self.assertEqual(span_styles(render(inline_style=theme)), expected)
+                            self.assertEqual(
+                                span_styles(render(inline_style=theme, merge_spans=True)), expected
+                            )
+
+                            # 只导出用到的规则
+                            used_classes = syntaxlight.UsedClasses()
+                            used_html = render(used_classes=used_classes)
+                            used_css = syntaxlight.export_used_css(used_classes, theme)
+                            self.assertEqual(span_styles(used_html, used_css), expected)
+
+                            used_classes = syntaxlight.UsedClasses()
+                            used_html = render(used_classes=used_classes, minify=True)
+                            used_css = syntaxlight.export_used_css(used_classes, theme, minify=True)
+                            self.assertEqual(span_styles(used_html, used_css), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import re
+import tempfile
+import unittest
+import syntaxlight
+
+HEADER = """typedef unsigned long uint64;
+typedef struct proc proc_t;
+#define NPROC 64
+"""
+
+SNIPPET = """static uint64 (*syscalls[])(void);
+proc_t *p = (proc_t *)x;
+uint64 n = NPROC * sizeof(uint64);
+"""
+
+
+def spans(html: str):
+    """
+    (class, 文本) 列表
+    """
+    return re.findall(r'<span class="([^"]*)">([^<]*)</span>', html)
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self) -> None:
+        # 头文件与代码段写在一起解析时代码段的高亮结果
+        result = syntaxlight.parse(HEADER + SNIPPET, "c", file_path="all.c")
+        self.assertTrue(result.success, result.error)
+        self.expected = spans(result.parser.to_html())[-len(spans(self.highlight_snippet())) :]
+
+    def highlight_snippet(self, **kwargs) -> str:
+        return syntaxlight.parse(SNIPPET, "c", file_path="snippet.c", **kwargs).parser.to_html()
+
+    def test_without_definitions(self):
+        # 单独解析时无法识别 uint64/proc_t, 说明后面的测试确实依赖共享的定义
+        self.assertNotEqual(spans(self.highlight_snippet()), self.expected)
+
+    def test_prelude(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            header_path = os.path.join(tmp_dir, "types.h")
+            prelude_path = os.path.join(tmp_dir, "types.prelude.json")
+            with open(header_path, "w", encoding="utf-8") as f:
+                f.write(HEADER)
+
+            prelude = syntaxlight.build_prelude([header_path], prelude_path)
+            self.assertEqual(dict(syntaxlight.load_prelude(prelude_path)), dict(prelude))
+            self.assertEqual(spans(self.highlight_snippet(prelude=prelude_path)), self.expected)
+            self.assertEqual(spans(self.highlight_snippet(prelude=prelude)), self.expected)
+
+    def test_session(self):
+        session = syntaxlight.Session("c")
+        self.assertTrue(session.parse(HEADER, file_path="types.h").success)
+        result = session.parse(SNIPPET, file_path="snippet.c")
+        self.assertTrue(result.success, result.error)
+        self.assertEqual(spans(result.parser.to_html()), self.expected)
+
+        # reset 之后不再共享之前的定义
+        session.reset()
+        self.assertNotEqual(spans(session.parse(SNIPPET, file_path="snippet.c").parser.to_html()), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
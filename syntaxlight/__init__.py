@@ -1,9 +1,13 @@
-from .syntax_parse import parse, get_lexer, parse_file, get_tokens
-from .export import export_css
+from .syntax_parse import parse, get_lexer, parse_file, get_tokens, build_prelude
+from .gdt import load_prelude
+from .session import Session
+from .export import export_css, export_used_css
+from .stylesheet import UsedClasses
 from .example import example_display
 from .asts.ast import display_ast
 from .language import is_language_support, clean_language, supported_languages
 from .lexers import TokenSet
 from .lexers.lexer import Lexer
 from .parsers.parser import Parser
-from .token import Token, TokenType
\ No newline at end of file
+from .token import Token, TokenType
+from .token_stream import TokenStream
\ No newline at end of file
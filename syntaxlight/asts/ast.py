@@ -1,30 +1,35 @@
 import textwrap
 from enum import Enum
 from ..lexers import Token
-from typing import List, Union
-
-AST_CREATED_INDEX = 0
+from typing import Dict, Iterator, List, Tuple, Union
+from ..context import current_context
 
 
 class AST(object):
-    def __init__(self) -> None:
-        # 节点被创建的顺序
-        global AST_CREATED_INDEX
-        self._created_index = AST_CREATED_INDEX
-        AST_CREATED_INDEX = AST_CREATED_INDEX + 1
+    _indent = " " * 4
+    _depth = 0  # 节点深度
+    _created_index = -1
+    node_info: str = ""
+    # highlight-only 模式 (ParseContext.build_ast 为 False) 下为 None
+    _ast_leaves: List[str] = None
 
+    def __init__(self) -> None:
         self.class_name: str = self.__class__.__name__
-        self.node_info: str = f"[{self.class_name}:{self._created_index}]"
-
-        self._indent = " " * 4
         # AST 树包含的 Token
         self._tokens: List[Token] = []
-        self._depth = 0  # 节点深度
         self.is_leaf_ast = False  # 底层 AST, 叶节点
 
         # 默认 update 的时候只会为一级 AST 添加当前类名, 启用此选项后会递归地将类名传递给其下的每一个叶节点
         # 默认不开启以减少对子类的影响
         self.update_subnode = False
+        context = current_context()
+        if not context.build_ast:
+            return
+
+        # 节点在当前文本中被创建的顺序
+        self._created_index = context.ast_created_index
+        context.ast_created_index += 1
+        self.node_info = f"[{self.class_name}:{self._created_index}]"
         self._ast_leaves: List[str] = []
 
     def register_token(self, tokens: List[Token], extra_class_name: str = None):
@@ -32,11 +37,12 @@ class AST(object):
         将 token 注册到 AST 树中以更新 token 的属性
         """
         for token in tokens:
-            token.class_list.append(self.class_name)
+            token.add_class(self.class_name)
             if extra_class_name:
-                token.class_list.append(extra_class_name)
+                token.add_class(extra_class_name)
             self._tokens.append(token)
-            token.ast = self
+            if self._ast_leaves is not None:
+                token.ast = self
 
     def update(self, **kwargs):
         """
@@ -44,38 +50,16 @@ class AST(object):
         """
         for key, node in kwargs.items():
             setattr(self, key, node)
-            # 记录调用 key 值, 用于生成 AST 树时的叶子节点顺序
-            self._ast_leaves.append(key)
+            if self._ast_leaves is not None:
+                # 记录调用 key 值, 用于生成 AST 树时的叶子节点顺序
+                self._ast_leaves.append(key)
             # 将子元素的 token 也添加当前 AST 的 class
             if isinstance(node, AST):
                 for token in node._tokens:
-                    token.class_list.append(self.class_name)
+                    token.add_class(self.class_name)
             if self.update_subnode:
-                self._update_sub_ast(node, self.class_name)
-
-    def _update_sub_ast(self, node: "AST", class_name: str):
-        """
-        为叶节点补充添加类名信息, 但 token 会有很复杂的 class name, 不宜采用
-        """
-        if node is None:
-            return
-        if type(node) == list:
-            for nod in node:
-                self._update_sub_ast(nod, class_name)
-            return
-        if node.is_leaf_ast:
-            node.class_name = class_name
-            for token in node._tokens:
-                token.class_list.append(class_name)
-            return
-        else:
-            for _, attribute_value in vars(node).items():
-                if isinstance(attribute_value, AST):
-                    self._update_sub_ast(attribute_value, class_name)
-                elif type(attribute_value) == list:
-                    if len(attribute_value) > 0 and isinstance(attribute_value[0], AST):
-                        for a_v in attribute_value:
-                            self._update_sub_ast(a_v, class_name)
+                # 为叶节点补充添加类名信息, 但 token 会有很复杂的 class name, 不宜采用
+                _annotate_ast_type(node, self.class_name, True)
 
     def visit(self, node_visitor: "NodeVisitor" = None):
         """
@@ -397,54 +381,114 @@ def display_ast(node: AST, sub_roots: List[AST]):
 def add_ast_type(node: AST, css_type: Enum):
     """
     为叶节点补充添加类名信息
-    """
-    if node is None:
-        return
-    if type(node) == list:
-        for nod in node:
-            add_ast_type(nod, css_type)
-        return
 
-    if node.is_leaf_ast:
-        node.class_name = css_type.value
-        for token in node._tokens:
-            token.class_list.append(css_type.value)
-            # print(token, f"[{class_name}]")
-        return
-    else:
-        # 遍历对象的所有属性
-        for _, attribute_value in vars(node).items():
-            if isinstance(attribute_value, AST):
-                add_ast_type(attribute_value, css_type)
-            elif type(attribute_value) == list:
-                if len(attribute_value) > 0 and isinstance(attribute_value[0], AST):
-                    for a_v in attribute_value:
-                        add_ast_type(a_v, css_type)
+    只记录, 在 resolve_ast_types 时生效
+    """
+    _annotate_ast_type(node, css_type.value, True)
 
 
 def delete_ast_type(node: AST, css_type: Enum):
     """
     为叶节点补充去除类名信息
+
+    只记录, 在 resolve_ast_types 时生效
     """
+    _annotate_ast_type(node, css_type.value, False)
+
+
+def _annotate_ast_type(node: Union[AST, list], class_name: str, is_add: bool):
+    _record_ast_type(current_context().ast_type_annotations, node, class_name, is_add)
+
+
+def _record_ast_type(annotations: list, node: Union[AST, list], class_name: str, is_add: bool):
     if node is None:
         return
     if type(node) == list:
         for nod in node:
-            delete_ast_type(nod, css_type)
+            _record_ast_type(annotations, nod, class_name, is_add)
         return
-
     if node.is_leaf_ast:
-        for token in node._tokens:
-            if css_type.value in token.class_list:
-                token.class_list.remove(css_type.value)
-            # print(token, f"[{class_name}]")
+        annotations.append((node, class_name, is_add))
         return
-    else:
-        # 遍历对象的所有属性
-        for _, attribute_value in vars(node).items():
-            if isinstance(attribute_value, AST):
-                delete_ast_type(attribute_value, css_type)
-            elif type(attribute_value) == list:
-                if len(attribute_value) > 0 and isinstance(attribute_value[0], AST):
-                    for a_v in attribute_value:
-                        delete_ast_type(a_v, css_type)
+    # 只展开一层, 记录当前已有的子节点, 之后才加入 node 的子节点不受影响
+    for sub_node in _sub_asts(node):
+        annotations.append((sub_node, class_name, is_add))
+
+
+def _sub_asts(node: AST) -> Iterator[AST]:
+    """
+    遍历对象的所有属性, 得到其下的子节点
+    """
+    for attribute_value in vars(node).values():
+        if isinstance(attribute_value, AST):
+            yield attribute_value
+        elif type(attribute_value) == list:
+            if len(attribute_value) > 0 and isinstance(attribute_value[0], AST):
+                stack = attribute_value[::-1]
+                while stack:
+                    a_v = stack.pop()
+                    if type(a_v) == list:
+                        stack.extend(reversed(a_v))
+                    elif a_v is not None:
+                        yield a_v
+
+
+def resolve_ast_types():
+    """
+    处理当前 context 中所有记录的类名, 整个过程中每个节点只展开一次
+
+    1. 找到最外层的被标记节点, 内层被标记节点在展开外层节点时被覆盖
+    2. 从最外层节点向下传递沿途的标记, 叶节点按照记录顺序依次添加或删除类名
+    """
+    context = current_context()
+    annotations = context.ast_type_annotations
+    context.ast_type_annotations = []
+
+    node_annotations: Dict[int, List[Tuple[int, str, bool]]] = {}
+    nodes: List[AST] = []
+    for index, (node, class_name, is_add) in enumerate(annotations):
+        key = id(node)
+        if key not in node_annotations:
+            node_annotations[key] = []
+            nodes.append(node)
+        node_annotations[key].append((index, class_name, is_add))
+
+    visited = set()
+    roots: Dict[int, AST] = {}
+    for node in nodes:
+        if id(node) in visited:
+            continue
+        visited.add(id(node))
+        stack = [node]
+        while stack:
+            for sub_node in _sub_asts(stack.pop()):
+                key = id(sub_node)
+                if key in visited:
+                    # 已经展开过的外层节点现在位于 node 之下
+                    roots.pop(key, None)
+                    continue
+                visited.add(key)
+                stack.append(sub_node)
+        roots[id(node)] = node
+
+    for root in roots.values():
+        stack = [(root, ())]
+        while stack:
+            node, inherited = stack.pop()
+            own = node_annotations.get(id(node))
+            if own is not None:
+                inherited = inherited + tuple(own)
+            if node.is_leaf_ast:
+                for _, class_name, is_add in sorted(inherited):
+                    if is_add:
+                        node.class_name = class_name
+                        for token in node._tokens:
+                            if class_name not in token.classes:
+                                token.add_class(class_name)
+                    else:
+                        for token in node._tokens:
+                            while class_name in token.classes:
+                                token.remove_class(class_name)
+            else:
+                for sub_node in _sub_asts(node):
+                    stack.append((sub_node, inherited))
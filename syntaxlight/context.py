@@ -0,0 +1,45 @@
+from collections import OrderedDict
+from contextvars import ContextVar
+from enum import Enum
+from typing import List, Tuple
+from .gdt import GlobalDescriptorTable
+
+
+class ParseContext:
+    """
+    一次解析过程中的全部可变状态, 由 Parser 持有
+
+    每次解析使用各自的 context, 因此不同文本的 typedef/宏定义不会互相影响, AST 节点的编号在每个文本中都从 0 开始,
+    多个线程可以同时解析而不需要加锁
+
+    解析期间通过 with parser.context 将其设置为当前线程(协程)的 context, AST 节点创建时从 current_context() 获取
+    """
+
+    def __init__(self, default_descriptors: List[Tuple[str, Enum]] = None, build_ast: bool = True):
+        self.gdt = GlobalDescriptorTable(default_descriptors)
+        # 为 False 时为 highlight-only 模式: AST 节点只用于在解析过程中为 token 添加类名,
+        # 不记录创建顺序和 graphviz 信息, token 也不再引用所属的节点, 解析结束后即可释放
+        self.build_ast = build_ast
+        self.ast_created_index = 0  # 下一个 AST 节点的编号
+        # add_ast_type / delete_ast_type 以及 update_subnode 记录的 (node, class_name, 是否添加), 按记录顺序排列
+        # 解析过程中只记录, 由 resolve_ast_types 统一为叶节点的 token 添加或删除类名
+        self.ast_type_annotations: list = []
+        # packrat 缓存只保留当前位置之前 packrat_window 个 token 以内的结果, 为 0 时不缓存, 见 Parser.memoize
+        self.packrat_window = 0
+        self.packrat_memo: OrderedDict = OrderedDict()
+        self._reset_tokens = []
+
+    def __enter__(self) -> "ParseContext":
+        self._reset_tokens.append(CURRENT_CONTEXT.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        CURRENT_CONTEXT.reset(self._reset_tokens.pop())
+
+
+# 不在解析过程中创建的 AST 节点使用默认的 context
+CURRENT_CONTEXT: ContextVar[ParseContext] = ContextVar("syntaxlight_parse_context", default=ParseContext())
+
+
+def current_context() -> ParseContext:
+    return CURRENT_CONTEXT.get()
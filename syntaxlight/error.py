@@ -1,5 +1,5 @@
 from enum import Enum
-from .token import Token, TokenType
+from .token import Token, TokenType, LineIndex
 
 # Common error type
 
@@ -51,12 +51,14 @@ class Error(Exception):
         error_context: str = None,
         error_message: str = None,
         file_path: str = None,
+        line_index: LineIndex = None,
     ):
         self.token = token  # 当前 token 信息
         self.error_code = error_code  # 错误类型
         self.error_context = error_context  # 错误上下文
         self.error_message = error_message  # 错误信息
         self.file_path = file_path
+        self.line_index = line_index  # error_context 的行索引, 未给出时在输出时构建
 
         # 自定义错误信息, 如果不为 None 则覆盖默认错误信息
         self.self_error_info = None
@@ -78,8 +80,10 @@ class Error(Exception):
            |
            = note: `#[warn(unused_variables)]` on by default
         """
-        lines = self.error_context.split("\n")
-        lines.insert(0, [])
+        line_index = self.line_index
+        if line_index is None:
+            line_index = LineIndex(self.error_context)
+        lines = line_index.get_line
 
         # 对于 EOF 特殊处理
         if self.token.type == TokenType.EOF:
@@ -87,7 +91,7 @@ class Error(Exception):
             self.token.value = " "
 
         context_start_line = max(self.token.line - self.context_range, 1)
-        context_end_line = min(self.token.line + self.context_range, len(lines))
+        context_end_line = min(self.token.line + self.context_range, len(line_index) + 1)
         context = ""
 
         # token 为多行文本的处理
@@ -101,7 +105,7 @@ class Error(Exception):
             token_length -= column
             token_lines.insert(0, current_context_line)
             current_context_line -= 1
-            column = len(lines[current_context_line]) + 1  # +1 是考虑结尾的换行符
+            column = len(lines(current_context_line)) + 1  # +1 是考虑结尾的换行符
 
         # 多行退出时和单行的情况
         if token_length != 0:
@@ -112,13 +116,13 @@ class Error(Exception):
             # print(i, token.lineno)
             if i not in token_lines:
                 context += ttyinfo(" " * left_space_length + " | ", TTYColor.BLUE)
-                context += lines[i] + "\n"
+                context += lines(i) + "\n"
             else:
                 if len(token_lines) == 1:
                     # token 前面的部分
-                    pre_context = lines[i][: self.token.column - token_length]
+                    pre_context = lines(i)[: self.token.column - token_length]
                     # token 后面的部分
-                    end_context = lines[i][self.token.column :]
+                    end_context = lines(i)[self.token.column :]
 
                     context += (
                         ttyinfo(str(i) + " | ", TTYColor.BLUE)
@@ -130,15 +134,15 @@ class Error(Exception):
                 else:
                     if i == token_lines[0]:
                         context += ttyinfo(str(i) + " | ", TTYColor.BLUE)
-                        pre_context = lines[i][: column - token_length]
-                        context += pre_context + ttyinfo(lines[i][column - token_length :], underline=True) + "\n"
+                        pre_context = lines(i)[: column - token_length]
+                        context += pre_context + ttyinfo(lines(i)[column - token_length :], underline=True) + "\n"
                     elif i == token_lines[-1]:
-                        end_context = lines[i][self.token.column + 1 :]
+                        end_context = lines(i)[self.token.column + 1 :]
                         context += ttyinfo(" " * left_space_length + " | ", TTYColor.BLUE)
-                        context += ttyinfo(lines[i][: self.token.column + 1]) + f"{end_context}\n"
+                        context += ttyinfo(lines(i)[: self.token.column + 1]) + f"{end_context}\n"
                     else:
                         context += ttyinfo(" " * left_space_length + " | ", TTYColor.BLUE)
-                        context += ttyinfo(lines[i]) + "\n"
+                        context += ttyinfo(lines(i)) + "\n"
 
         return context
 
@@ -180,8 +184,9 @@ class LexerError(Error):
         error_context: str = None,
         error_message: str = None,
         file_path: str = None,
+        line_index: LineIndex = None,
     ):
-        super().__init__(token, error_code, error_context, error_message, file_path)
+        super().__init__(token, error_code, error_context, error_message, file_path, line_index)
 
 
 class ParserError(Error):
@@ -192,5 +197,6 @@ class ParserError(Error):
         error_context: str = None,
         error_message: str = None,
         file_path: str = None,
+        line_index: LineIndex = None,
     ):
-        super().__init__(token, error_code, error_context, error_message, file_path)
+        super().__init__(token, error_code, error_context, error_message, file_path, line_index)
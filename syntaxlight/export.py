@@ -1,9 +1,13 @@
 import os
-from typing import Dict, List, Union, NewType
+from typing import Dict, List, Union, NewType, Optional
 import json
 from .language import clean_language
+from .stylesheet import minified_css, apply_theme, used_css, load_themes, UsedClasses
 
-def export_css(languages: List[str], export_dir: str = ".", style: str = "vscode"):
+def export_css(languages: List[str], export_dir: str = ".", style: str = "vscode", minify: bool = False):
+    """
+    导出 languages 对应的 css 文件, minify 为 True 时导出与 Parser.to_html(minify=True) 配套的 css
+    """
     syntaxlight_path = os.path.dirname(__file__)
     json_file_path = os.path.join(syntaxlight_path, "css", "themes.json")
     
@@ -27,23 +31,20 @@ def export_css(languages: List[str], export_dir: str = ".", style: str = "vscode
                 exit(1)
             with open(origin_css_file, "r", encoding="utf-8") as f:
                 css_content = f.read()
-            
+
+            # 简写的 class 对应的 css 已经包含了主题的扩展和作用域
+            minified_content = minified_css(language, style) if minify else None
+            if minified_content is not None:
+                css_content = minified_content
             # 应用扩展, 完善 CSS
-            if EXTENSION_NAME in theme:
+            elif EXTENSION_NAME in theme:
                 if language in theme[EXTENSION_NAME]:
                     for class_name, css in theme[EXTENSION_NAME][language].items():
                         css_content += "\n" + class_name + " {\n    " + css + "\n}"
 
             # 使用主题颜色替换 css 文件中的对应类型
-            for type_name, color in theme.items():
-                if type_name == EXTENSION_NAME:
-                    continue
-
-                css_content = css_content.replace(type_name, color)
-            
-            for type_name, color in themes['others'].items():
-                css_content = css_content.replace(type_name, color)
-            
+            css_content = apply_theme(css_content, style, themes)
+
             # 添加对应的作用域
             css_content = css_content.replace('.Token',f'pre[class*="language-{language}"] .Token')
             with open(f'{export_dir}/{language}.css', "w", encoding="utf-8") as f:
@@ -53,3 +54,38 @@ def export_css(languages: List[str], export_dir: str = ".", style: str = "vscode
         print(f"supported style: {list(themes.keys())}")
         exit(1)
 
+
+def export_used_css(used_classes: UsedClasses, style: str = "vscode", minify: bool = False) -> str:
+    """
+    只包含 used_classes 中记录的 span 可能匹配的规则的 css, 可以直接放入页面 <head> 的 <style> 中
+
+    minify 与渲染时的 minify 参数保持一致. 无法判断哪些规则会匹配的语言输出完整的 css
+    """
+    themes = load_themes()
+    css_content = ""
+    # 没有设置 language 的 parser 无法确定 css 文件
+    for language in sorted(language for language in used_classes.classes if language is not None):
+        css_classes = used_classes.classes[language]
+        if minify:
+            content = minified_css(language, style, css_classes)
+        else:
+            content = used_css(language, style, css_classes)
+        if content is None:
+            content = full_language_css(language, style, themes)
+        if content is not None:
+            css_content += apply_theme(content, style, themes)
+    return css_content
+
+
+def full_language_css(language: str, style: str, themes: dict) -> Optional[str]:
+    """
+    与 export_css 导出的内容相同, 没有 language 对应的 css 文件时返回 None
+    """
+    origin_css_file = os.path.join(os.path.dirname(__file__), "css", f"{language}.css")
+    if not os.path.exists(origin_css_file):
+        return None
+    with open(origin_css_file, "r", encoding="utf-8") as f:
+        css_content = f.read()
+    for class_name, css in themes[style].get("extension", {}).get(language, {}).items():
+        css_content += "\n" + class_name + " {\n    " + css + "\n}"
+    return css_content.replace(".Token", f'pre[class*="language-{language}"] .Token')
@@ -1,5 +1,9 @@
-from typing import List, Union, Dict, Tuple, TypedDict
+from typing import List, Union, Dict, Tuple, TypedDict, Deque, Mapping, Iterable
+from collections import deque
 from enum import Enum
+from types import MappingProxyType
+import json
+import os
 
 
 class CSS(Enum):
@@ -26,6 +30,12 @@ class CSS(Enum):
     HIGHLIGHT_LINE = "HighlightLine"
     HIGHLIGHT_TOKEN = "HighlightToken"
 
+EMPTY_PRELUDE: Mapping[str, Enum] = MappingProxyType({})
+PRELUDE_VERSION = 1
+# (文件绝对路径, 修改时间) -> prelude, 同一个快照文件只读取一次
+PRELUDE_CACHE: Dict[Tuple[str, float], Mapping[str, Enum]] = {}
+
+
 class Descriptor(TypedDict):
     type: Enum
     scope: str
@@ -36,39 +46,134 @@ class FuncArgument(TypedDict):
     type: Tuple[str]
 
 
+def remove_descriptor(descriptors: List[Descriptor], descriptor: Descriptor):
+    """
+    从 descriptors 中删除 descriptor 对象本身
+
+    不同作用域中的描述符可能内容相同 (例如同名作用域嵌套时的同名 typedef), 不能按 == 删除
+    """
+    for index in range(len(descriptors) - 1, -1, -1):
+        if descriptors[index] is descriptor:
+            del descriptors[index]
+            return
+
+
 class GlobalDescriptorTable:
-    def __init__(self, default_import_descriptors: List[Tuple[str, Enum]] = None) -> None:
+    """
+    符号表, 由全局描述符表和作用域栈组成
+
+    - _descriptors: 全局作用域
+    - _scopes: 作用域栈, 每个作用域为 (作用域名, 该作用域内的描述符), 由 push_scope/pop_scope 维护
+    - _visible: 名称 -> 所有打开的作用域中该名称的描述符, 最后一个为最内层可见的描述符
+
+    - _prelude: 只读的预置描述符 (名称 -> 类型), 例如由头文件生成的快照, 见 load_prelude
+
+    查找时依次查 _visible, _descriptors, _prelude, 与打开的作用域数量无关
+    """
+
+    def __init__(self, default_import_descriptors: List[Tuple[str, Enum]] = None, log_limit: int = 0) -> None:
         self._default_import_descriptors = default_import_descriptors
         self._descriptors: Dict[str, Descriptor] = {}  # 内部维护的全局描述符表
         self._classname_map = {}
-        self._loginfo = []
+        # 日志默认关闭, log_limit > 0 时只保留最近的 log_limit 条
+        self._log_limit = log_limit
+        self._loginfo: Deque[str] = deque(maxlen=log_limit)
         if self._default_import_descriptors is not None:
             for name, type in self._default_import_descriptors:
                 self.register_id(name, type)
 
-        self._scope_gdt: Dict[str, GlobalDescriptorTable] = {}
+        self._scopes: List[Tuple[str, Dict[str, Descriptor]]] = []
+        self._visible: Dict[str, List[Descriptor]] = {}
+        self._prelude: Mapping[str, Enum] = EMPTY_PRELUDE
+
+    def set_prelude(self, prelude: Mapping[str, Enum] = None):
+        """
+        设置只读的预置描述符, reset 后依然保留
+
+        prelude 不会被修改, 可以在多个 GDT 之间共享; 解析过程中注册的同名 id 会覆盖 prelude
+        """
+        self._prelude = EMPTY_PRELUDE if prelude is None else prelude
+
+    def snapshot(self, types: Iterable[Enum] = None) -> Dict[str, Enum]:
+        """
+        prelude 与全局作用域中的描述符合并后的 (名称 -> 类型), 可以保存为新的 prelude
+
+        types 不为 None 时只保留这些类型的 id
+        """
+        result = dict(self._prelude)
+        for name, descriptor in self._descriptors.items():
+            if descriptor["type"] is None:
+                # prelude 中的 id 被删除
+                result.pop(name, None)
+            else:
+                result[name] = descriptor["type"]
+        if types is not None:
+            types = set(types)
+            result = {name: id_type for name, id_type in result.items() if id_type in types}
+        return result
+
+    def _log(self, info: str, *args):
+        """
+        记录日志, info 中的 {} 在开启日志时才使用 args 格式化
+        """
+        if self._log_limit > 0:
+            self._loginfo.append(info.format(*args))
+
+    def push_scope(self, scope: str):
+        """
+        进入一个新的作用域
+        """
+        self._scopes.append((scope, {}))
+
+    def pop_scope(self, scope: str = None):
+        """
+        离开作用域 scope (默认为最内层的作用域), 删除其中的所有 id, scope 没有打开时忽略
+        """
+        for index in range(len(self._scopes) - 1, -1, -1):
+            if scope is None or self._scopes[index][0] == scope:
+                break
+        else:
+            return
+        _, descriptors = self._scopes.pop(index)
+        for id_name, descriptor in descriptors.items():
+            visible = self._visible[id_name]
+            remove_descriptor(visible, descriptor)
+            if not visible:
+                del self._visible[id_name]
 
-    def _log(self, info: str):
+    def clear_scopes(self):
         """
-        记录日志
+        关闭所有作用域, 只保留全局作用域和 prelude
         """
-        self._loginfo.append(info)
+        self._scopes = []
+        self._visible = {}
 
     def register_id(self, id_name: str, id_type: Enum, scope: str = None):
         """
         将一个 id 注册到 GDT 中
+
+        scope 不为 None 时注册到名为 scope 的最内层作用域中, 该作用域没有打开时先打开
         """
         assert type(id_name) == str
         if scope is None:
             # 允许后面覆盖前面
             if id_name in self._descriptors:
-                self._log(f"[register_id]: cover {id_name}")
+                self._log("[register_id]: cover {}", id_name)
 
             self._descriptors[id_name] = {"type": id_type}
         else:
-            if scope not in self._scope_gdt:
-                self._scope_gdt[scope] = GlobalDescriptorTable()
-            self._scope_gdt[scope].register_id(id_name, id_type)
+            for name, descriptors in reversed(self._scopes):
+                if name == scope:
+                    break
+            else:
+                self.push_scope(scope)
+                descriptors = self._scopes[-1][1]
+            descriptor: Descriptor = {"type": id_type, "scope": scope}
+            visible = self._visible.setdefault(id_name, [])
+            if id_name in descriptors:
+                remove_descriptor(visible, descriptors[id_name])
+            descriptors[id_name] = descriptor
+            visible.append(descriptor)
 
     def register_function(
         self,
@@ -83,7 +188,7 @@ class GlobalDescriptorTable:
         返回值如果存在多个可能的类型, 保存在 Tuple 后传入
         """
         if function_name in self._descriptors:
-            self._log(f"[register_function]: cover {function_name}")
+            self._log("[register_function]: cover {}", function_name)
         self._descriptors[function_name] = {
             "type": type,
             "arguments": arguments,
@@ -91,9 +196,13 @@ class GlobalDescriptorTable:
         }
 
     def delete_id(self, name: str):
-        if name in self._descriptors:
+        if name in self._prelude:
+            # prelude 只读, 记录一个空类型的描述符遮盖 prelude 中的 id
+            self._descriptors[name] = {"type": None}
+            self._log("delete id [{}]", name)
+        elif name in self._descriptors:
             del self._descriptors[name]
-            self._log(f"delete id [{name}]")
+            self._log("delete id [{}]", name)
         else:
             raise ValueError(f"unknown id: {name}")
 
@@ -101,36 +210,75 @@ class GlobalDescriptorTable:
         """
         删除作用域 scope 下的所有 id
         """
-        if scope in self._scope_gdt:
-            del self._scope_gdt[scope]
+        self.pop_scope(scope)
 
     def reset(self):
         self._descriptors = {}
+        self._scopes = []
+        self._visible = {}
         if self._default_import_descriptors is not None:
             for name, type in self._default_import_descriptors:
                 self.register_id(name, type)
-        self._log(f"reset GDT")
+        self._log("reset GDT")
 
     def __getitem__(self, name) -> Enum:
-        '''
+        """
         优先从 scope 中检查
-        '''
-        for scope in self._scope_gdt:
-            if name in self._scope_gdt[scope]:
-                return self._scope_gdt[scope][name]
-            
-        if name not in self._descriptors:
-            return None
-        return self._descriptors[name]["type"]
+        """
+        visible = self._visible.get(name)
+        if visible is not None:
+            return visible[-1]["type"]
+        descriptor = self._descriptors.get(name)
+        if descriptor is None:
+            return self._prelude.get(name)
+        return descriptor["type"]
 
     def __contains__(self, item):
-        '''
+        """
         优先检查所有 scope 中的 id
-        '''
-        for scope in self._scope_gdt:
-            if item in self._scope_gdt[scope]:
-                return True
-        return item in self._descriptors
+        """
+        return self[item] is not None
 
     def __repr__(self) -> str:
         return str(list(self._descriptors.keys()))
+
+
+def dump_prelude(descriptors: Mapping[str, Enum], path: str):
+    """
+    将 (名称 -> 类型) 保存为 json 格式的 prelude 快照, 按类型分组以减小体积
+    """
+    groups: Dict[str, List[str]] = {}
+    for name, id_type in descriptors.items():
+        groups.setdefault(id_type.value, []).append(name)
+    for names in groups.values():
+        names.sort()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": PRELUDE_VERSION, "descriptors": groups}, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_prelude(path: str) -> Mapping[str, Enum]:
+    """
+    读取 dump_prelude 保存的快照, 返回只读的 (名称 -> 类型)
+
+    结果按文件路径和修改时间缓存, 多次解析共享同一个对象; 无法识别的类型会被忽略
+    """
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    prelude = PRELUDE_CACHE.get(key)
+    if prelude is not None:
+        return prelude
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != PRELUDE_VERSION:
+        raise ValueError(f"unsupported prelude version: {data.get('version')}")
+    css_types = {css.value: css for css in CSS}
+    descriptors: Dict[str, Enum] = {}
+    for css_value, names in data["descriptors"].items():
+        id_type = css_types.get(css_value)
+        if id_type is None:
+            continue
+        for name in names:
+            descriptors[name] = id_type
+    prelude = MappingProxyType(descriptors)
+    PRELUDE_CACHE[key] = prelude
+    return prelude
@@ -1,5 +1,5 @@
 
-from .lexer import Lexer, Token, TokenType
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType
 from enum import Enum
 import re
 
@@ -12,74 +12,51 @@ class X86AssemblyTokenType(Enum):
 
 
 class X86AssemblyLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.number(),
+            LexerRule.identifier(first=lambda char: char.isalnum() or char == "_", extend_chars=["@", "_", "."]),
+            LexerRule.custom(".", "get_asm_keyword"),
+            LexerRule.custom("%", "get_register"),
+            LexerRule.comment(),
+            LexerRule.comment("/*", "*/"),
+        ],
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = X86AssemblyTokenType):
         super().__init__(text, LanguageTokenType)
 
-    def get_next_token(self) -> Token:
+    def get_number(self) -> Token:
+        result = ""
         while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char.isdigit():
-                result = ''
-                while self.current_char is not None:
-                    if bool(re.match(r'^[0-9a-fA-FxX]$', self.current_char)):
-                        result += self.current_char
-                        self.advance()
-                    else:
-                        break
-                return Token(TokenType.NUMBER, result, self.line ,self.column-1)
-
-            if self.current_char.isalnum() or self.current_char in ("_"):
-                return self.get_id(extend_chars=["@", "_",'.'])
-
-            if self.current_char == ".":
-                result = "."
+            if bool(re.match(r"^[0-9a-fA-FxX]$", self.current_char)):
+                result += self.current_char
                 self.advance()
-                while self.current_char is not None and self.current_char.isalnum():
-                    result += self.current_char
-                    self.advance()
+            else:
+                break
+        return self.create_token(TokenType.NUMBER, result, self.pos - 1)
 
-                token = Token(X86AssemblyTokenType.ASM_KEYWORD, result, self.line, self.column - 1)
-                return token
+    def get_asm_keyword(self) -> Token:
+        result = "."
+        self.advance()
+        while self.current_char is not None and self.current_char.isalnum():
+            result += self.current_char
+            self.advance()
 
-            if self.current_char == "%":
-                result = "%"
-                self.advance()
-                while self.current_char is not None and self.current_char.isalnum():
-                    result += self.current_char
-                    self.advance()
-
-                token = Token(X86AssemblyTokenType.REGISTER, result, self.line, self.column - 1)
-                return token
-
-            if self.current_char == "#":
-                return self.get_comment()
-            
-            if self.current_char == '/' and self.peek() == '*':
-                return self.get_comment('/*','*/')
-
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
-                self.advance()
-                return token
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
+        token = self.create_token(X86AssemblyTokenType.ASM_KEYWORD, result, self.pos - 1)
+        return token
 
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+    def get_register(self) -> Token:
+        result = "%"
+        self.advance()
+        while self.current_char is not None and self.current_char.isalnum():
+            result += self.current_char
+            self.advance()
+
+        token = self.create_token(X86AssemblyTokenType.REGISTER, result, self.pos - 1)
+        return token
 
 
 class RISCVAssemblyTokenType(Enum):
@@ -94,73 +71,49 @@ class RISCVAssemblyTokenType(Enum):
 
 
 class RISCVAssemblyLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.number(),
+            LexerRule.identifier(first=lambda char: char.isalnum() or char == "_", extend_chars=["@", "_", "."]),
+            LexerRule.custom(".", "get_asm_keyword"),
+            LexerRule.custom("#", "get_include_hash"),
+            LexerRule.comment(),
+            LexerRule.comment("/*", "*/"),
+            LexerRule.string(),
+        ],
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = RISCVAssemblyTokenType):
         super().__init__(text, LanguageTokenType)
 
-    def get_next_token(self) -> Token:
+    def get_number(self) -> Token:
+        result = ""
         while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char.isdigit():
-                
-                result = ''
-                while self.current_char is not None:
-                    if bool(re.match(r'^[0-9a-fA-FxX]$', self.current_char)):
-                        result += self.current_char
-                        self.advance()
-                    else:
-                        break
-
-                return Token(TokenType.NUMBER, result, self.line ,self.column-1)
-
-            if self.current_char.isalnum() or self.current_char in ("_"):
-                return self.get_id(extend_chars=["@", "_", "."])
-
-            if self.current_char == ".":
-                result = "."
-                self.advance()
-                while self.current_char is not None and self.current_char.isalnum():
-                    result += self.current_char
-                    self.advance()
-
-                token = Token(
-                    RISCVAssemblyTokenType.ASM_KEYWORD, result, self.line, self.column - 1
-                )
-                return token
-
-            if self.current_char == "#":
-                if self.peek(7) == "include":
-                    token = Token(TokenType.HASH, self.current_char, self.line, self.column)
-                    self.advance()
-                    return token
-                else:
-                    return self.get_comment()
-                
-            if self.current_char == '/' and self.peek() == '*':
-                return self.get_comment('/*','*/')
-
-            if self.current_char == '"':
-                return self.get_string()
-
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
+            if bool(re.match(r"^[0-9a-fA-FxX]$", self.current_char)):
+                result += self.current_char
                 self.advance()
-                return token
             else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
-
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+                break
+        return self.create_token(TokenType.NUMBER, result, self.pos - 1)
+
+    def get_asm_keyword(self) -> Token:
+        result = "."
+        self.advance()
+        while self.current_char is not None and self.current_char.isalnum():
+            result += self.current_char
+            self.advance()
+
+        token = self.create_token(RISCVAssemblyTokenType.ASM_KEYWORD, result, self.pos - 1)
+        return token
+
+    def get_include_hash(self) -> Token:
+        """
+        #include 中的 #, 其他情况下 # 开头为注释, 返回 None
+        """
+        if self.peek(7) != "include":
+            return None
+        token = self.create_token(TokenType.HASH, self.current_char)
+        self.advance()
+        return token
@@ -1,5 +1,5 @@
 
-from .lexer import Lexer, Token, TokenType, ErrorCode
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType, ErrorCode
 from enum import Enum
 from ..token import TokenSet
 
@@ -9,46 +9,18 @@ class BNFTokenType(Enum):
 
 
 class BNFLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.invisible(),
+            LexerRule.space(),
+            LexerRule.quoted_str(),
+            LexerRule.identifier(first=lambda char: char.isalnum() or char == "_", extend_chars=["_", "-"]),
+            LexerRule.comment("#", "\n"),
+            LexerRule.long_op(),
+        ],
+        long_ops=["::="],
+        unknown_token_type=None,
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = BNFTokenType):
         super().__init__(text, LanguageTokenType)
-        self.build_long_op_dict(["::="])
-
-    def get_next_token(self) -> Token:
-        
-        while self.current_char is not None:
-            
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-            
-            if self.current_char == ' ':
-                return self.skip_whitespace()
-
-            if self.current_char in ("'", '"'):
-                return self.get_str()
-            
-            if self.current_char.isalnum() or self.current_char == '_':
-                return self.get_id(extend_chars=['_','-'])
-            
-            if self.current_char == '#':
-                return self.get_comment("#",'\n')
-            
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
-            
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError: # pragma: no cover
-                token = Token(None, self.current_char, self.line, self.column)
-                self.error(ErrorCode.UNKNOWN_CHARACTER, token)
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
-            
-
-        return Token(type=TokenType.EOF, value='EOF', line=self.line, column=self.column)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from .lexer import Lexer, ErrorCode
+from .lexer import Lexer, LexerSpec, LexerRule, ErrorCode
 from enum import Enum
 from ..token import Token, TokenType
 from ..token import TokenSet
@@ -94,9 +94,19 @@ class CTokenType(Enum):
 
 
 class CLexer(Lexer):
-    def __init__(self, text: str, TokenType: TokenType = CTokenType):
-        super().__init__(text, TokenType)
-        supported_long_op = [
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.comment("//", "\n"),
+            LexerRule.comment("/*", "*/"),
+            LexerRule.number(accept_hex=True, accept_bit=True, end_chars="fFlLUup"),
+            LexerRule.identifier(),
+            LexerRule.string(),
+            LexerRule.custom("'", "get_char"),
+            LexerRule.long_op(),
+        ],
+        long_ops=[
             "<<=",
             ">>=",
             "<<",
@@ -120,8 +130,12 @@ class CLexer(Lexer):
             "&&",
             "->",
             "##",
-        ]
-        self.build_long_op_dict(supported_long_op)
+        ],
+        unknown_token_type=None,
+    )
+
+    def __init__(self, text: str, TokenType: TokenType = CTokenType):
+        super().__init__(text, TokenType)
 
     def get_char(self):
         """
@@ -134,60 +148,13 @@ class CLexer(Lexer):
             result += self.current_char
         self.advance()
         if self.current_char != "'":
-            token = Token(TokenType.CHARACTER, result, self.line, self.column)
+            token = self.create_token(TokenType.CHARACTER, result)
             self.error(ErrorCode.MULTICHARACTER_CONSTANT, token)
         result += "'"
-        token = Token(TokenType.CHARACTER, result, self.line, self.column)
+        token = self.create_token(TokenType.CHARACTER, result)
         self.advance()
         return token
 
-    def get_next_token(self):
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char == "/" and self.peek() == "/":
-                return self.get_comment("//", "\n")
-            if self.current_char == "/" and self.peek() == "*":
-                return self.get_comment("/*", "*/")
-
-            if self.current_char.isdigit():
-                return self.get_number(
-                    accept_hex=True,
-                    accept_bit=True,
-                    end_chars="fFlLUup",
-                )
-
-            if self.current_char.isalpha() or self.current_char == TokenType.UNDERLINE.value:
-                return self.get_id()
-
-            if self.current_char == '"':
-                return self.get_string()
-
-            if self.current_char == "'":
-                return self.get_char()
-
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:
-                self.error()
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
-
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
-
 
 class CTokenSet:
     def __init__(self) -> None:
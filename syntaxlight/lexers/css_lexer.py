@@ -1,5 +1,5 @@
 from syntaxlight.lexers.lexer import Token
-from .lexer import Lexer, Token, TokenType
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType
 from enum import Enum
 
 
@@ -15,70 +15,49 @@ class CSSTokenType(Enum):
 
 
 class CSSLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            # CSS 单位
+            # https://www.zhihu.com/question/602061531/answer/3037149631
+            LexerRule.number(accept_hex=True, end_chars="%svbpxdlminachqtgru"),
+            LexerRule.identifier(first=lambda char: char.isalnum() or char in (".", "_"), extend_chars=["_", "-", "."]),
+            LexerRule.custom("-", "get_dash_id"),
+            LexerRule.comment("/*", "*/"),
+            LexerRule.custom("#", "get_hash"),
+            LexerRule.string(),
+        ],
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = CSSTokenType):
         super().__init__(text, LanguageTokenType)
 
-    def get_next_token(self) -> Token:
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char.isdigit():
-                # CSS 单位
-                # https://www.zhihu.com/question/602061531/answer/3037149631
-                return self.get_number(
-                    accept_hex=True,
-                    end_chars="%svbpxdlminachqtgru",
-                )
-
-            # transform: translate(-50%, -50%);
-            if (self.current_char.isalnum() or self.current_char in (".", "_")) or (
-                self.current_char == "-" and not self.peek().isdigit()
-            ):
-                return self.get_id(extend_chars=["_", "-", "."])
-
-            if self.current_char == "/" and self.peek() == "*":
-                return self.get_comment("/*", "*/")
-
-            if self.current_char == "#":
-                # color or hash
-                result = "#"
+    def get_dash_id(self):
+        """
+        - 开头的 id, 后面是数字时作为负号
+
+        transform: translate(-50%, -50%);
+        """
+        next_char = self.peek()
+        if next_char is not None and next_char.isdigit():
+            return None
+        return self.get_id(extend_chars=["_", "-", "."])
+
+    def get_hash(self):
+        """
+        color or hash
+        """
+        result = "#"
+        self.advance()
+        while self.current_char is not None and self.current_char.isalnum():
+            result += self.current_char
+            self.advance()
+        if self.current_char in ("-", "_"):
+            while self.current_char is not None and (self.current_char in ("-", "_") or self.current_char.isalnum()):
+                result += self.current_char
                 self.advance()
-                while self.current_char is not None and self.current_char.isalnum():
-                    result += self.current_char
-                    self.advance()
-                if self.current_char in ("-", "_"):
-                    while self.current_char is not None and (
-                        self.current_char in ("-", "_") or self.current_char.isalnum()
-                    ):
-                        result += self.current_char
-                        self.advance()
-                    token = Token(CSSTokenType.HASH_ID, result, self.line, self.column - 1)
-                else:
-                    token = Token(CSSTokenType.COLOR, result, self.line, self.column - 1)
-                return token
-
-            if self.current_char == '"':
-                return self.get_string()
-
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
-                self.advance()
-                return token
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
-
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+            token = self.create_token(CSSTokenType.HASH_ID, result, self.pos - 1)
+        else:
+            token = self.create_token(CSSTokenType.COLOR, result, self.pos - 1)
+        return token
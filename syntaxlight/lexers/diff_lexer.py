@@ -24,12 +24,7 @@ class DiffLexer(Lexer):
             token_value += self.current_char
             self.advance()
 
-        token = Token(
-            type=token_type,
-            value=token_value,
-            line=self.line,
-            column=self.column-1,
-        )
+        token = self.create_token(token_type, token_value, self.pos - 1)
         return token
 
     def get_next_token(self) -> Token:
@@ -56,4 +51,4 @@ class DiffLexer(Lexer):
                 return token
 
         # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+        return self.create_token(TokenType.EOF, "EOF")
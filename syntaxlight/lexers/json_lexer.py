@@ -1,4 +1,4 @@
-from .lexer import Lexer, Token, TokenType
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType
 from ..error import ErrorCode
 from enum import Enum
 
@@ -16,44 +16,18 @@ class JsonTokenType(Enum):
 
 
 class JsonLexer(Lexer):
-    def __init__(self, text: str, TokenType: Enum = JsonTokenType):
-        super().__init__(text, TokenType)
-
-    def get_next_token(self):
-        while self.current_char is not None:
+    spec = LexerSpec(
+        rules=[
             # json 仅支持 ""
-            if self.current_char == TokenType.QUOTO.value:
-                return self.get_string()
-
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
+            LexerRule.string(),
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.number(),
+            LexerRule.identifier(first=lambda char: char.isalnum() or char == "_"),
+            LexerRule.comment("//", "\n"),
+        ],
+        unknown_token_type=None,
+    )
 
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char.isdigit():
-                return self.get_number()
-
-            if self.current_char.isalnum() or self.current_char == '_':
-                return self.get_id()
-            
-            if self.current_char == '/' and self.peek() == '/':
-                return self.get_comment('//','\n')
-            
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError: # pragma: no cover
-                token = Token(None, self.current_char, self.line, self.column)
-                self.error(ErrorCode.UNKNOWN_CHARACTER, token)
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
-        
-        # End of File
-        return Token(type=TokenType.EOF, value='EOF', line=self.line, column=self.column)
+    def __init__(self, text: str, TokenType: Enum = JsonTokenType):
+        super().__init__(text, TokenType)
@@ -1,8 +1,262 @@
 from enum import Enum
 from ..error import ErrorCode, LexerError, ParserError
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Tuple, Union, FrozenSet, Mapping, Callable, Optional, Collection
+from types import MappingProxyType
 import re
-from ..token import Token, TokenType, BaseTokenType
+from ..token import Token, TokenType, BaseTokenType, LineIndex
+
+# 基础匹配函数使用的预编译正则, 一次调用匹配整个 lexeme
+SPACE_PATTERN = re.compile(r" *")
+DEC_DIGITS_PATTERN = re.compile(r"[0-9_]*")
+HEX_DIGITS_PATTERN = re.compile(r"[0-9a-fA-F]*")
+BIT_DIGITS_PATTERN = re.compile(r"[01]*")
+# 严格双引号字符串的内容部分, 遇到未转义的 " 或结尾时停止
+STRING_BODY_PATTERN = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+# "" 和 '' 字符串中不包含转义字符和结束符的连续部分
+STR_BODY_PATTERNS = {
+    '"': re.compile(r'[^"\\]*'),
+    "'": re.compile(r"[^'\\]*"),
+}
+# get_id 按照 extend_chars 缓存的正则
+ID_PATTERNS: Dict[Tuple[str, ...], re.Pattern] = {}
+# get_extend_str 按照结束符首字符缓存的正则
+EXTEND_STR_BODY_PATTERNS: Dict[str, re.Pattern] = {}
+
+# 不可见字符, 一般情况下直接忽略即可, 这里考虑到为了不破坏原本的代码格式所以进行保留
+# \n \t \v \r \f \b
+INVISIBLE_CHARACTER_TYPES: Mapping[str, Enum] = MappingProxyType(
+    {
+        token_type.value: token_type
+        for token_type in (
+            TokenType.LF,
+            TokenType.TAB,
+            TokenType.VERTICAL_TAB,
+            TokenType.CR,
+            TokenType.FORM_FEED,
+            TokenType.BACKSPACE,
+        )
+    }
+)
+INVISIBLE_CHARACTERS: FrozenSet[str] = frozenset(INVISIBLE_CHARACTER_TYPES)
+
+# 每种语言的预计算表, 只在该语言的 lexer 第一次实例化时构建, 之后所有实例共享
+# LanguageTokenType -> 保留关键字
+RESERVED_KEYWORDS_CACHE: Dict[Enum, Mapping[str, Enum]] = {}
+# (LanguageTokenType, 长运算符) -> (long_op_dict, long_op_types)
+LONG_OP_TABLES_CACHE: Dict[Tuple[Enum, Tuple[str, ...]], Tuple[Mapping[str, Tuple[str, ...]], Mapping[str, Enum]]] = {}
+
+
+def build_reserved_keywords(LanguageTokenType: Enum) -> Mapping[str, Enum]:
+    """
+    RESERVED_KEYWORD_START 和 RESERVED_KEYWORD_END 之间为保留关键字
+
+    每一个自定义的 TokenType 都应当定义这两个枚举类型
+    """
+    reserved_keywords = RESERVED_KEYWORDS_CACHE.get(LanguageTokenType)
+    if reserved_keywords is None:
+        keywords = {}
+        is_keyword = False
+        for token_type in LanguageTokenType:
+            if token_type.name == "RESERVED_KEYWORD_END":
+                break
+            if is_keyword:
+                keywords[token_type.value] = token_type
+            elif token_type.name == "RESERVED_KEYWORD_START":
+                is_keyword = True
+        else:
+            keywords = {}
+        reserved_keywords = MappingProxyType(keywords)
+        RESERVED_KEYWORDS_CACHE[LanguageTokenType] = reserved_keywords
+    return reserved_keywords
+
+
+def build_long_op_tables(LanguageTokenType: Enum, supported_long_op: Tuple[str, ...]):
+    """
+    构造长运算符的匹配表
+
+    long_op_dict: 首字符 -> 其余部分, 按长度从长到短排列
+    long_op_types: 运算符 -> token 类型, 优先使用语言自定义的 TokenType
+    """
+    key = (LanguageTokenType, supported_long_op)
+    tables = LONG_OP_TABLES_CACHE.get(key)
+    if tables is None:
+        long_op_dict: Dict[str, List[str]] = {}
+        long_op_types: Dict[str, Enum] = {}
+        for long_op in sorted(supported_long_op, key=len, reverse=True):
+            assert len(long_op) >= 2, f"{long_op} should be longer"
+            long_op_dict.setdefault(long_op[0], []).append(long_op[1:])
+            try:
+                long_op_types[long_op] = LanguageTokenType(long_op)
+            except ValueError:
+                # 两者都没有定义的运算符在匹配到时才报错
+                long_op_types[long_op] = TokenType._value2member_map_.get(long_op)
+        for char in long_op_dict:
+            # 只匹配到首字符时按单字符处理
+            long_op_types[char] = TokenType(char)
+        tables = (
+            MappingProxyType({char: tuple(long_ops) for char, long_ops in long_op_dict.items()}),
+            MappingProxyType(long_op_types),
+        )
+        LONG_OP_TABLES_CACHE[key] = tables
+    return tables
+
+
+# 单字符 token, 例如 ';' '.', 代替 TokenType(char) 的异常判断
+SINGLE_CHAR_TYPES: Mapping[str, Enum] = MappingProxyType(
+    {token_type.value: token_type for token_type in TokenType if len(token_type.value) == 1}
+)
+
+
+def is_id_start(char: str) -> bool:
+    return char.isalpha() or char == "_"
+
+
+def is_digit(char: str) -> bool:
+    return char.isdigit()
+
+
+class LexerRule:
+    """
+    LexerSpec 中的一条匹配规则
+
+    first 为可以作为开头的字符(字符串)或判断函数, prefix 不为 None 时还需要匹配完整的前缀,
+    满足条件时调用 lexer 的 method(*args, **kwargs). method 返回 None 表示不匹配, 继续尝试后面的规则
+    """
+
+    def __init__(self, first: Union[str, Callable[[str], bool]], method: str, *args, prefix: str = None, **kwargs):
+        self.first = first
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.prefix = prefix
+
+    def match_first(self, char: str, long_op_dict: Mapping[str, Tuple[str, ...]]) -> bool:
+        if self.method == "get_long_op":
+            return char in long_op_dict
+        if callable(self.first):
+            return self.first(char)
+        return char in self.first
+
+    @staticmethod
+    def space():
+        return LexerRule(TokenType.SPACE.value, "skip_whitespace")
+
+    @staticmethod
+    def invisible():
+        return LexerRule("".join(INVISIBLE_CHARACTERS), "skip_invisiable_character")
+
+    @staticmethod
+    def comment(start_symbol="#", end_symbol="\n"):
+        return LexerRule(start_symbol[0], "get_comment", start_symbol, end_symbol, prefix=start_symbol)
+
+    @staticmethod
+    def string():
+        """
+        "" 包裹的字符串
+        """
+        return LexerRule('"', "get_string")
+
+    @staticmethod
+    def quoted_str(quotes="\"'"):
+        """
+        "" | '' 包裹的字符串
+        """
+        return LexerRule(quotes, "get_str")
+
+    @staticmethod
+    def extend_str(start_symbol: str, end_symbol: str):
+        return LexerRule(start_symbol[0], "get_extend_str", (start_symbol, end_symbol), prefix=start_symbol)
+
+    @staticmethod
+    def number(first: Union[str, Callable[[str], bool]] = is_digit, **kwargs):
+        """
+        kwargs 见 get_number
+        """
+        return LexerRule(first, "get_number", **kwargs)
+
+    @staticmethod
+    def identifier(first: Union[str, Callable[[str], bool]] = is_id_start, **kwargs):
+        """
+        kwargs 见 get_id
+        """
+        return LexerRule(first, "get_id", **kwargs)
+
+    @staticmethod
+    def long_op():
+        """
+        LexerSpec.long_ops 中的长运算符
+        """
+        return LexerRule("", "get_long_op")
+
+    @staticmethod
+    def custom(first: Union[str, Callable[[str], bool]], method: str, *args, prefix: str = None, **kwargs):
+        """
+        自定义的匹配函数, 返回 None 时继续尝试后面的规则
+        """
+        return LexerRule(first, method, *args, prefix=prefix, **kwargs)
+
+
+class LexerSpec:
+    """
+    声明式的词法规则, 每种语言编译一次为按首字符分派的规则表
+
+    rules 按优先级排列, 所有规则都不匹配时作为单字符 token (例如 ';') 处理,
+    不是单字符 token 的字符作为 unknown_token_type 类型的 token, unknown_token_type 为 None 时报错
+    """
+
+    def __init__(self, rules: List[LexerRule], long_ops: List[str] = (), unknown_token_type: Enum = TokenType.TEXT):
+        self.rules = rules
+        self.long_ops = tuple(long_ops)
+        self.unknown_token_type = unknown_token_type
+
+
+class CompiledLexerSpec:
+    """
+    字符 -> 以该字符开头时需要依次尝试的 (prefix, method, args, kwargs)
+
+    ASCII 字符在编译时全部计算, 其他字符在第一次遇到时计算并缓存
+    """
+
+    def __init__(self, lexer_class: type, spec: LexerSpec, long_op_dict: Mapping[str, Tuple[str, ...]]):
+        self.lexer_class = lexer_class
+        self.spec = spec
+        self.long_op_dict = long_op_dict
+        self.dispatch_table: Dict[str, tuple] = {}
+        for code in range(128):
+            self.add_char(chr(code))
+        # parser 的 gap_characters -> (实际跳过的字符, 匹配连续跳过字符的正则), 见 Lexer.set_gap_characters
+        self.gap_patterns: Dict[FrozenSet[str], Tuple[FrozenSet[str], Optional[re.Pattern]]] = {}
+
+    def add_char(self, char: str) -> tuple:
+        rules = []
+        for rule in self.spec.rules:
+            if rule.match_first(char, self.long_op_dict):
+                prefix = rule.prefix if rule.prefix is not None and len(rule.prefix) > 1 else None
+                rules.append((prefix, getattr(self.lexer_class, rule.method), rule.args, rule.kwargs))
+        rules = tuple(rules)
+        self.dispatch_table[char] = rules
+        return rules
+
+    def get_gap_pattern(self, characters: FrozenSet[str]) -> Tuple[FrozenSet[str], Optional[re.Pattern]]:
+        """
+        characters 中首先交给 skip_whitespace / skip_invisiable_character 处理的字符, 以及匹配这些字符的正则
+        """
+        result = self.gap_patterns.get(characters)
+        if result is None:
+            gap_characters = []
+            for char in characters:
+                rules = self.dispatch_table.get(char)
+                if rules is None:
+                    rules = self.add_char(char)
+                if rules and rules[0][0] is None and rules[0][1] in (Lexer.skip_whitespace, Lexer.skip_invisiable_character):
+                    gap_characters.append(char)
+            pattern = re.compile("[%s]*" % re.escape("".join(sorted(gap_characters)))) if gap_characters else None
+            result = self.gap_patterns[characters] = (frozenset(gap_characters), pattern)
+        return result
+
+
+# (lexer 类, LanguageTokenType) -> 编译后的 LexerSpec
+LEXER_SPEC_CACHE: Dict[Tuple[type, Enum], CompiledLexerSpec] = {}
 
 
 class Lexer:
@@ -11,77 +265,73 @@ class Lexer:
 
         可能有些编程语言的处理(比如Lua的字符串)不同, 单独覆盖即可
 
-    继承 Lexer 的子类需要重写其 get_next_token 方法以提供给后续的 parser 解析
+    继承 Lexer 的子类需要提供 spec (见 LexerSpec), 或者重写其 get_next_token 方法以提供给后续的 parser 解析
     """
 
+    spec: LexerSpec = None
+
     def __init__(self, text: str, LanguageTokenType: BaseTokenType):
-        self.text: str = text
-        self.pos: int = 0  # 当前指针指向的字符
-        self.current_char: str = self.text[self.pos]  # 当前指针指向的字符
-        self.line: int = 1
-        self.column: int = 1  # 指向 token 的 value 中最后出现的字符的位置
         self.LanguageTokenType: Enum = LanguageTokenType
-        self.file_path = ""  # 手动修改文件路径, 用于后期错误处理的输出
-        self._status_stack = []  # 状态栈
-
-        tt_list: List[Enum] = list(LanguageTokenType)
-        try:
-            # RESERVED_KEYWORD_START 和 RESERVED_KEYWORD_END 之间为保留关键字
-            # 每一个自定义的 TokenType 都应当定义这两个枚举类型
-            start_index = tt_list.index(LanguageTokenType.RESERVED_KEYWORD_START)
-            end_index = tt_list.index(LanguageTokenType.RESERVED_KEYWORD_END)
-            self.reserved_keywords = {
-                token_type.value: token_type for token_type in tt_list[start_index + 1 : end_index]
-            }
-        except:
-            self.reserved_keywords = {}
-        # 不可见字符, 一般情况下直接忽略即可, 这里考虑到为了不破坏原本的代码格式所以进行保留
-        # \n \t \v \r \f \b
-        self.invisible_characters = [
-            TokenType.LF.value,
-            TokenType.TAB.value,
-            TokenType.VERTICAL_TAB.value,
-            TokenType.CR.value,
-            TokenType.FORM_FEED.value,
-            TokenType.BACKSPACE.value,
-        ]
+        # 以下各表每种语言只构建一次, 所有实例共享, 不应原地修改
+        self.reserved_keywords = build_reserved_keywords(LanguageTokenType)
 
         # 匹配长字符串时使用
         # if self.current_char in self.long_op_dict:
         #     return self.get_long_op()
-        self.long_op_dict: Dict[str, List] = {}
+        self.long_op_dict: Mapping[str, Tuple[str, ...]] = MappingProxyType({})
+        self.long_op_types: Mapping[str, Enum] = MappingProxyType({})
 
-    def build_long_op_dict(self, supported_long_op: List[str]):
+        self._compiled_spec: CompiledLexerSpec = None
+        if self.spec is not None:
+            self.build_long_op_dict(self.spec.long_ops)
+            key = (type(self), LanguageTokenType)
+            self._compiled_spec = LEXER_SPEC_CACHE.get(key)
+            if self._compiled_spec is None:
+                self._compiled_spec = CompiledLexerSpec(type(self), self.spec, self.long_op_dict)
+                LEXER_SPEC_CACHE[key] = self._compiled_spec
+
+        # 不生成 token 而直接跳过的空白字符, 见 set_gap_characters
+        self.gap_characters: FrozenSet[str] = frozenset()
+        self._gap_pattern: re.Pattern = None
+
+        self.reset(text)
+
+    def reset(self, text: str):
         """
-        构造长运算符的匹配模式
+        重新设置待解析的文本, 以便复用同一个 lexer 实例
+
+        子类如果有额外的解析状态, 应重载此方法并调用 super().reset(text)
         """
-        self._long_ops = sorted(supported_long_op, key=len, reverse=True)
-        for long_op in self._long_ops:
-            assert len(long_op) >= 2, f"{long_op} should be longer"
-            if self.long_op_dict.get(long_op[0]) is None:
-                self.long_op_dict[long_op[0]] = []
-            self.long_op_dict[long_op[0]].append(long_op[1:])
+        self.text: str = text
+        self.pos: int = 0  # 当前指针指向的字符
+        self.current_char: str = self.text[self.pos]  # 当前指针指向的字符
+        # 每行起始位置的索引, 行列号不再随 advance 更新, 由 pos 按需计算
+        self.line_index = LineIndex(text)
+        self.file_path = ""  # 手动修改文件路径, 用于后期错误处理的输出
+        self.token_count = 0  # 已经创建的 token 数量, 作为下一个 token 的 id
+        # parser 可以替换为其他集合(例如 C 预处理时不跳过换行), 但不应原地修改
+        self.invisible_characters: FrozenSet[str] = INVISIBLE_CHARACTERS
 
-    def _record(self):
+    def set_gap_characters(self, characters: Collection[str]):
         """
-        用于 parser 中 peek_next_token
+        设置不生成 token 的空白字符, 这些字符只作为 token 之间的间隔 (gap) 保留在原文中, 由 parser 在解析开始前设置
 
-        记录当前 lexer 解析状态, 被 _reset 调用时恢复
+        只有按照 spec 首先交给 skip_whitespace / skip_invisiable_character 处理的字符会被跳过,
+        重写了这两个函数或 get_next_token 的子类仍然为其生成 token
         """
-        # 采用栈的方式保存数据状态, 避免由于 peek_next_token 中的 eat 导致多次嵌套调用覆盖数据
-        self._status_stack.append({"pos": self.pos, "c": self.current_char, "line": self.line, "column": self.column})
+        if self._compiled_spec is None:
+            return
+        self.gap_characters, self._gap_pattern = self._compiled_spec.get_gap_pattern(frozenset(characters))
 
-    def _reset(self):
+    def build_long_op_dict(self, supported_long_op: List[str]):
         """
-        用于 parser 中 peek_next_token
+        构造长运算符的匹配模式
 
-        恢复为 lexer 之前的状态
+        同一种语言的匹配表只构建一次
         """
-        status = self._status_stack.pop()
-        self.pos = status["pos"]
-        self.current_char = status["c"]
-        self.line = status["line"]
-        self.column = status["column"]
+        self.long_op_dict, self.long_op_types = build_long_op_tables(
+            self.LanguageTokenType, tuple(supported_long_op)
+        )
 
     def error(
         self,
@@ -102,41 +352,61 @@ class Lexer:
             error_context=self.text,
             error_message=message,
             file_path=self.file_path,
+            line_index=self.line_index,
         )
 
-    def advance(self):
+    @property
+    def line(self) -> int:
+        """
+        当前指针所在的行号
+        """
+        return self.line_index.line(self.pos)
+
+    @property
+    def column(self) -> int:
+        """
+        当前指针所在的列号
+        """
+        return self.line_index.column(self.pos)
+
+    def create_token(self, token_type: Enum, value: str, pos: int = None) -> Token:
+        """
+        创建一个 token, 其行列号为 pos 处(默认为当前指针)的行列号, 在第一次访问时才计算
+
+        token 的行列号指向其最后一个字符, 因此跳出 token 之后创建时一般传入 self.pos - 1
+        """
+        if pos is None:
+            pos = self.pos
+        self.token_count += 1
+        return Token(token_type, value, pos=pos, line_index=self.line_index, token_id=self.token_count - 1)
+
+    def _goto(self, pos: int):
         """
-        获取下一个字符, 遇到换行则更新 line
+        将指针直接移动到 pos, 等价于多次调用 advance
         """
-        if self.current_char == "\n":
-            self.line += 1
-            self.column = 0
+        self.pos = pos
+        self.current_char = self.text[pos] if pos < len(self.text) else None
 
+    def advance(self):
+        """
+        获取下一个字符
+        """
         self.pos += 1
         if self.pos > len(self.text) - 1:
             self.current_char = None  # 结束
-            self.column += 1
         else:
             self.current_char = self.text[self.pos]
-            self.column += 1
 
     def skip_whitespace(self):
         """
         通常来说直接跳过空格即可, 这里保留空格是为了不破坏原本的代码格式
         """
-        result = ""
-        while self.current_char is not None and self.current_char == " ":
-            result += " "
-            self.advance()
-        return Token(TokenType.SPACE, result, self.line, self.column - 1)
+        start = self.pos
+        self._goto(SPACE_PATTERN.match(self.text, start).end())
+        return self.create_token(TokenType.SPACE, self.text[start : self.pos], self.pos - 1)
 
     def skip_invisiable_character(self):
-        token = Token(
-            TokenType(self.current_char),
-            self.current_char,
-            self.line,
-            self.column,
-        )
+        token = self.create_token(INVISIBLE_CHARACTER_TYPES[self.current_char], self.current_char)
         self.advance()
         return token
 
@@ -162,65 +432,43 @@ class Lexer:
         @accept_hex  : 允许16进制表示 0xfff
         @accept_bit  : 允许二进制表示 0b111
         """
-        bit_matching_status = False
-        hex_matching_status = False
-
-        def is_match_char(char: str) -> bool:
-            if hex_matching_status:
-                return bool(re.match(r"[0-9a-fA-F]", char))
-            elif bit_matching_status:
-                return bool(re.match(r"[01]", char))
-            else:
-                return bool(re.match(r"[0-9_]", char))
-
-        result = ""
-
-        if self.current_char == "0":
-            result += self.current_char
-            self.advance()
-            if accept_bit and self.current_char in ("b", "B"):
-                result += self.current_char
-                self.advance()
-                result += self.current_char
-                self.advance()
-                bit_matching_status = True
-            elif accept_hex and self.current_char in ("x", "X"):
-                result += self.current_char
-                self.advance()
-                result += self.current_char
-                self.advance()
-                hex_matching_status = True
+        text = self.text
+        start = self.pos
+        pos = start
+        digits_pattern = DEC_DIGITS_PATTERN
+
+        if text.startswith("0", pos):
+            pos += 1
+            # 0b/0x 后面的第一个字符直接作为数字的一部分
+            if accept_bit and text[pos : pos + 1] in ("b", "B"):
+                pos += 2
+                digits_pattern = BIT_DIGITS_PATTERN
+            elif accept_hex and text[pos : pos + 1] in ("x", "X"):
+                pos += 2
+                digits_pattern = HEX_DIGITS_PATTERN
+            pos = min(pos, len(text))
 
         # <digits>
-        while self.current_char is not None and is_match_char(self.current_char):
-            result += self.current_char
-            self.advance()
+        pos = digits_pattern.match(text, pos).end()
 
         if accept_float:
             # (.<digits>)?
-            if self.current_char == "." and self.peek() != ".":
-                result += self.current_char
-                self.advance()
-                while self.current_char is not None and is_match_char(self.current_char):
-                    result += self.current_char
-                    self.advance()
+            if text.startswith(".", pos) and not text.startswith(".", pos + 1):
+                pos = digits_pattern.match(text, pos + 1).end()
 
             # (E|e[+-]?<digits>)?
-            if self.current_char == "e" or self.current_char == "E":
-                result += self.current_char
-                self.advance()
-                if self.current_char in (TokenType.MINUS.value, TokenType.PLUS.value):
-                    result += self.current_char
-                    self.advance()
-                while self.current_char is not None and is_match_char(self.current_char):
-                    result += self.current_char
-                    self.advance()
-
-        while self.current_char is not None and self.current_char in end_chars:
-            result += self.current_char
-            self.advance()
-        # column - 1, 因为判断结束需要跳出 number
-        return Token(TokenType.NUMBER, result, self.line, self.column - 1)
+            if text[pos : pos + 1] in ("e", "E"):
+                pos += 1
+                if text[pos : pos + 1] in (TokenType.MINUS.value, TokenType.PLUS.value):
+                    pos += 1
+                pos = digits_pattern.match(text, pos).end()
+
+        while pos < len(text) and text[pos] in end_chars:
+            pos += 1
+
+        self._goto(pos)
+        # pos - 1, 因为判断结束需要跳出 number
+        return self.create_token(TokenType.NUMBER, text[start:pos], self.pos - 1)
 
     def get_string(self):
         """
@@ -228,23 +476,21 @@ class Lexer:
         """
         result = self.current_char
         if result != TokenType.QUOTO.value:
-            token = Token(TokenType.STRING, result, self.line, self.column)
+            token = self.create_token(TokenType.STRING, result)
             self.advance()
             self.error(ErrorCode.UNEXPECTED_TOKEN, token, 'should be strict "')
-        end_character = TokenType.QUOTO.value
-        self.advance()
 
-        while self.current_char is not None and self.current_char != end_character:
-            result += self.current_char
-            if self.current_char == "\\":
-                self.advance()
-                if self.current_char is None:
-                    self.error()
-                result += self.current_char
-            self.advance()
-
-        result += end_character
-        token = Token(TokenType.STRING, result, self.line, self.column)
+        start = self.pos
+        pos = STRING_BODY_PATTERN.match(self.text, start + 1).end()
+        if pos == len(self.text) - 1 and self.text[pos] == "\\":
+            # 结尾处的转义字符
+            self._goto(pos + 1)
+            token = self.create_token(TokenType.STRING, self.text[start:], self.pos - 1)
+            self.error(ErrorCode.UNTERMINATED_STRING, token)
+
+        # 未闭合的字符串同样以 " 结尾
+        self._goto(pos)
+        token = self.create_token(TokenType.STRING, self.text[start:pos] + TokenType.QUOTO.value)
         self.advance()
         return token
 
@@ -254,30 +500,34 @@ class Lexer:
         """
         result = self.current_char
         if result not in ("'", '"'):
-            token = Token(TokenType.STRING, result, self.line, self.column)
+            token = self.create_token(TokenType.STRING, result)
             self.advance()
             self.error(ErrorCode.UNEXPECTED_TOKEN, token, "should be ' or \"")
         end_character = self.current_char  # 结束标志一定是和开始标志相同的
-        self.advance()
-
-        while self.current_char is not None and self.current_char != end_character:
-            if self.current_char == "\\":
-                result += self.current_char
-                self.advance()
-                if self.current_char is None:
-                    self.error(
-                        ErrorCode.UNEXPECTED_TOKEN,
-                        Token(TokenType.STRING, result, self.line, self.column - 1),
-                    )
-                # 对于 '\' 和 "\" 直接结束
-                # print(self.current_char)
-                if self.current_char == end_character and self.peek() in (" ", "\n"):
-                    break
-            result += self.current_char
-            self.advance()
+        body_pattern = STR_BODY_PATTERNS[end_character]
+        text = self.text
+        start = self.pos
+        pos = start + 1
+
+        while True:
+            pos = body_pattern.match(text, pos).end()
+            if pos >= len(text) or text[pos] == end_character:
+                break
+            # 转义字符 \
+            pos += 1
+            if pos >= len(text):
+                self._goto(pos)
+                self.error(
+                    ErrorCode.UNEXPECTED_TOKEN,
+                    self.create_token(TokenType.STRING, text[start:pos], self.pos - 1),
+                )
+            # 对于 '\' 和 "\" 直接结束
+            if text[pos] == end_character and text[pos + 1 : pos + 2] in (" ", "\n"):
+                break
+            pos += 1
 
-        result += end_character
-        token = Token(TokenType.STR, result, self.line, self.column)
+        self._goto(pos)
+        token = self.create_token(TokenType.STR, text[start:pos] + end_character)
         self.advance()
         return token
 
@@ -287,7 +537,7 @@ class Lexer:
         """
         result = self.current_char
         if result != "'":
-            token = Token(TokenType.CHARACTER, result, self.line, self.column)
+            token = self.create_token(TokenType.CHARACTER, result)
             self.advance()
             self.error(ErrorCode.UNEXPECTED_TOKEN, token, "should be a single character")
 
@@ -295,12 +545,12 @@ class Lexer:
         result += self.current_char
         self.advance()
         if self.current_char != "'":
-            token = Token(TokenType.CHARACTER, result, self.line, self.column)
+            token = self.create_token(TokenType.CHARACTER, result)
             self.advance()
             self.error(ErrorCode.UNEXPECTED_TOKEN, token, "should be a single character")
 
         result += self.current_char
-        token = Token(TokenType.CHARACTER, result, self.line, self.column)
+        token = self.create_token(TokenType.CHARACTER, result)
         self.advance()
         return token
 
@@ -314,30 +564,28 @@ class Lexer:
         if len(start_symbol) > 1:
             assert self.peek(len(start_symbol) - 1) == start_symbol[1:]
 
-        result = start_symbol
-        for _ in range(len(start_symbol)):
-            self.advance()
-
-        end_symbol_length = len(end_symbol)
-        while self.current_char is not None:
-            if self.current_char == end_symbol[0] and self.peek(end_symbol_length - 1) == end_symbol[1:]:
+        text = self.text
+        start = self.pos
+        pos = start + len(start_symbol)
+        body_pattern = EXTEND_STR_BODY_PATTERNS.get(end_symbol[0])
+        if body_pattern is None:
+            # 不包含 \ 和结束符首字符的连续部分
+            body_pattern = re.compile("[^\\\\" + re.escape(end_symbol[0]) + "]*")
+            EXTEND_STR_BODY_PATTERNS[end_symbol[0]] = body_pattern
+
+        while True:
+            pos = body_pattern.match(text, pos).end()
+            if pos >= len(text) or text.startswith(end_symbol, pos):
                 break
-            else:
-                if self.current_char == "\\":
-                    result += self.current_char
-                    self.advance()
-                result += self.current_char
-                self.advance()
-
-        if self.current_char is None:
-            token = Token(token_type, result, self.line, self.column - 1)
-        else:
-            result += end_symbol
-            for _ in range(end_symbol_length):
-                self.advance()
-            token = Token(token_type, result, self.line, self.column - 1)
+            if text[pos] == "\\":
+                pos += 1
+            pos += 1
+        pos = min(pos, len(text))
 
-        return token
+        if pos < len(text):
+            pos += len(end_symbol)
+        self._goto(pos)
+        return self.create_token(token_type, text[start:pos], self.pos - 1)
 
     def get_id(self, ignore_case=False, extend_chars: List[str] = ["_"]):
         """
@@ -351,10 +599,9 @@ class Lexer:
 
         此函数应次于 get_number 调用
         """
-        result = ""
-        while self.current_char is not None and (self.current_char.isalnum() or self.current_char in extend_chars):
-            result += self.current_char
-            self.advance()
+        start = self.pos
+        self._goto(self._id_pattern(extend_chars).match(self.text, start).end())
+        result = self.text[start : self.pos]
 
         # 忽略关键字的大小写
         if ignore_case:
@@ -367,10 +614,10 @@ class Lexer:
             token_type = self.reserved_keywords.get(result)
 
         if token_type is None:
-            token = Token(type=TokenType.ID, value=result, line=self.line, column=self.column - 1)
+            token = self.create_token(TokenType.ID, result, self.pos - 1)
         else:
             # 作为保留关键字
-            token = Token(type=token_type, value=result, line=self.line, column=self.column - 1)
+            token = self.create_token(token_type, result, self.pos - 1)
         return token
 
     def get_comment(self, start_symbol="#", end_symbol="\n"):
@@ -386,37 +633,26 @@ class Lexer:
 
         assert start_symbol[0] == self.current_char
 
-        result = start_symbol
-        for _ in range(len(start_symbol)):
+        text = self.text
+        start = self.pos
+        end_index = text.find(end_symbol, start + len(start_symbol))
+
+        if end_index == -1:
+            self._goto(len(text))
+            # 除单行注释外抛异常
+            if end_symbol != "\n":
+                token = self.create_token(TokenType.COMMENT, text[start:], self.pos - 1)
+                self.error(ErrorCode.UNTERMINATED_COMMENT, token)
+            token = self.create_token(TokenType.COMMENT, text[start:])
             self.advance()
-
-        end_symbol_length = len(end_symbol)
-        while self.current_char is not None:
-            if self.current_char == end_symbol[0]:
-                if end_symbol_length == 1:
-                    # 单行注释不包括最后的换行
-                    result += self.current_char
-                    break
-                elif self.peek(end_symbol_length - 1) == end_symbol[1:]:
-                    result += self.current_char
-                    for _ in range(end_symbol_length - 1):
-                        self.advance()
-                        result += self.current_char
-                    break
-            result += self.current_char
-            self.advance()
-
-        # 除单行注释外抛异常
-        if self.current_char is None and end_symbol != "\n":
-            token = Token(TokenType.COMMENT, result, self.line, self.column - 1)
-            self.error(ErrorCode.UNTERMINATED_COMMENT, token)
-
-        # 对于单行注释以 \n 为终止符的, 将最后一个 \n 去掉
-        if end_symbol == "\n" and result[-1] == "\n":
-            result = result[:-1]
-            token = Token(TokenType.COMMENT, result, self.line, self.column - 1)
+        elif end_symbol == "\n":
+            # 单行注释不包含结尾的 \n
+            self._goto(end_index)
+            token = self.create_token(TokenType.COMMENT, text[start:end_index], self.pos - 1)
         else:
-            token = Token(TokenType.COMMENT, result, self.line, self.column)
+            end_index += len(end_symbol)
+            self._goto(end_index - 1)
+            token = self.create_token(TokenType.COMMENT, text[start:end_index])
             self.advance()
         return token
 
@@ -429,53 +665,90 @@ class Lexer:
         默认的一些常用长运算符见 TokenType, 也可以自定义新的长运算符
         """
         assert self.current_char in self.long_op_dict
-        token_type = TokenType(self.current_char)
         result = self.current_char
 
         for long_op in self.long_op_dict[self.current_char]:
-            if self.peek(len(long_op)) == long_op:
+            if self.text.startswith(long_op, self.pos + 1):
                 result = self.current_char + long_op
-                # 优先尝试用户自定义的长运算符
-                try:
-                    token_type = self.LanguageTokenType(result)
-                except:
-                    token_type = TokenType(result)
-                for _ in range(len(long_op)):
-                    self.advance()
                 break
 
-        token = Token(token_type, result, self.line, self.column)
-        self.advance()
-        return token
+        end = self.pos + len(result)
+        self._goto(end)
+        token_type = self.long_op_types[result]
+        if token_type is None:
+            token_type = TokenType(result)
+        return self.create_token(token_type, result, end - 1)
 
-    def get_next_token(self) -> Token:
+    @staticmethod
+    def _id_pattern(extend_chars: List[str]) -> re.Pattern:
         """
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
+        get_id 使用的正则, 按照 extend_chars 缓存
 
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
+        \\w 即 str.isalnum() 的字符加上 _
+        """
+        key = tuple(extend_chars)
+        pattern = ID_PATTERNS.get(key)
+        if pattern is None:
+            extend_pattern = "".join(re.escape(char) for char in extend_chars if char != "_")
+            if "_" in extend_chars:
+                pattern = re.compile(f"[\\w{extend_pattern}]*")
+            elif extend_pattern:
+                pattern = re.compile(f"(?:[^\\W_]|[{extend_pattern}])*")
+            else:
+                pattern = re.compile(r"[^\W_]*")
+            ID_PATTERNS[key] = pattern
+        return pattern
 
-            # your code
+    def get_single_char_token(self, unknown_token_type: Enum = TokenType.TEXT) -> Token:
+        """
+        单字符 token, 例如 ';' '.'
 
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
-                self.advance()
-                return token
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
+        不是单字符 token 的字符作为 unknown_token_type 类型的 token, unknown_token_type 为 None 时报错
+        """
+        token_type = SINGLE_CHAR_TYPES.get(self.current_char)
+        if token_type is None:
+            if unknown_token_type is None:
+                token = self.create_token(None, self.current_char)
+                self.error(ErrorCode.UNKNOWN_CHARACTER, token)
+            token_type = unknown_token_type
+        token = self.create_token(token_type, self.current_char)
+        self.advance()
+        return token
+
+    def get_next_token(self) -> Token:
+        """
+        按照 spec 编译得到的首字符分派表匹配下一个 token, 例如
+
+        spec = LexerSpec(
+            rules=[
+                LexerRule.space(),
+                LexerRule.invisible(),
+                LexerRule.comment("//", "\\n"),
+                LexerRule.number(accept_hex=True),
+                LexerRule.identifier(),
+                LexerRule.string(),
+                LexerRule.long_op(),
+            ],
+            long_ops=["==", "!="],
+        )
 
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+        没有 spec 的子类需要重写此方法
         """
-        raise NotImplementedError
+        if self._compiled_spec is None:
+            raise NotImplementedError(self.__class__.__name__ + " must define spec or override get_next_token")
+        char = self.current_char
+        if char in self.gap_characters:
+            self._goto(self._gap_pattern.match(self.text, self.pos).end())
+            char = self.current_char
+        if char is None:
+            return self.create_token(TokenType.EOF, "EOF")
+
+        rules = self._compiled_spec.dispatch_table.get(char)
+        if rules is None:
+            rules = self._compiled_spec.add_char(char)
+        for prefix, method, args, kwargs in rules:
+            if prefix is None or self.text.startswith(prefix, self.pos):
+                token = method(self, *args, **kwargs)
+                if token is not None:
+                    return token
+        return self.get_single_char_token(self.spec.unknown_token_type)
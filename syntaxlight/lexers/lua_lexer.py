@@ -1,4 +1,4 @@
-from .lexer import Lexer, Token, TokenType, ErrorCode
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType, ErrorCode
 from enum import Enum
 from ..token import TokenSet
 
@@ -38,9 +38,31 @@ class LuaTokenType(Enum):
 
 
 class LuaLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.number(accept_hex=True),
+            LexerRule.identifier(),
+            LexerRule.long_op(),
+            # --[ xxx 短注释
+            # --[[ ... ]] 长注释
+            # --[==[ ... ]==] 长注释
+            # -- [[ 第一行是短注释
+            # ... ]]
+            LexerRule.custom("-", "get_long_comment", prefix="--[["),
+            LexerRule.custom("-", "get_long_comment", prefix="--[="),
+            LexerRule.comment("--", "\n"),
+            LexerRule.quoted_str(),
+            LexerRule.custom("[", "get_literal_str", prefix="[["),
+            LexerRule.custom("[", "get_literal_str", prefix="[="),
+        ],
+        long_ops=["//", ">>", "<<", "..", "...", "<=", ">=", "==", "~=", "::"],
+        unknown_token_type=None,
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = LuaTokenType):
         super().__init__(text, LanguageTokenType)
-        self.build_long_op_dict(["//", ">>", "<<", "..", "...", "<=", ">=", "==", "~=", "::"])
 
     def get_literal_str(self):
         """
@@ -78,10 +100,10 @@ class LuaLexer(Lexer):
                 self.advance()
 
         if is_match is False: # pragma: no cover
-            token = Token(TokenType.STR, result, self.line, self.column-1)
+            token = self.create_token(TokenType.STR, result, self.pos - 1)
             self.error(ErrorCode.UNTERMINATED_STRING, token, f"miss end symbol {end_symbol}")
         else:
-            token = Token(TokenType.STR, result, self.line, self.column - 1)
+            token = self.create_token(TokenType.STR, result, self.pos - 1)
         return token
 
     def get_long_comment(self):
@@ -98,64 +120,6 @@ class LuaLexer(Lexer):
         return token
 
 
-    def get_next_token(self):
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char.isdigit():
-                return self.get_number(accept_hex=True)
-
-            if self.current_char.isalpha() or self.current_char == "_":
-                return self.get_id()
-
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
-
-            if self.current_char == "-":
-                # --[ xxx 短注释
-                # --[[ ... ]] 长注释
-                # --[==[ ... ]==] 长注释
-                # -- [[ 第一行是短注释
-                # ... ]]  
-                next_three_chars = self.peek(3)
-                if next_three_chars[0] == '-':
-                    if next_three_chars[1] == '[' and next_three_chars[2] in ('[','='):
-                        return self.get_long_comment()
-                    else:
-                        return self.get_comment("--", "\n")
-
-            if self.current_char in ("'", '"'):
-                return self.get_str()
-
-            if self.current_char == "[" and self.peek() in ("[", "="):
-                return self.get_literal_str()
-
-            # single-character token
-            try:
-                # get enum member by value, e.g.
-                # TokenType(';') --> TokenType.SEMI
-                token_type = TokenType(self.current_char)
-            except ValueError: # pragma: no cover
-                # no enum member with value equal to self.current_char
-                self.error()
-            else:
-                # create a token with a single-character lexeme as its value
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
-
-        return Token(type=TokenType.EOF, value=None)
-
-
 class LuaTokenSet:
     def __init__(self) -> None:
         self.unop = TokenSet(TokenType.MINUS, TokenType.HASH, TokenType.TILDE, LuaTokenType.NOT)
@@ -1,5 +1,5 @@
 from syntaxlight.lexers.lexer import Token
-from .lexer import Lexer, Token, TokenType, ErrorCode
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType, ErrorCode
 from ..token import TokenSet
 from enum import Enum
 
@@ -25,15 +25,38 @@ class MakefileTokenType(Enum):
 
 
 class MakefileLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.string(),
+            LexerRule.comment(),
+            LexerRule.custom("-", "get_option"),
+            LexerRule.long_op(),
+            LexerRule.number(end_chars="GMKTB"),
+            LexerRule.identifier(
+                first=lambda char: char.isalpha() or char in ("-", "_", ".", "%"),
+                extend_chars=["_", "-", ".", "%", "/"],
+            ),
+            LexerRule.custom("$", "get_auto_variable"),
+        ],
+        long_ops=[":=", "+="],
+        unknown_token_type=None,
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = MakefileTokenType):
         super().__init__(text, LanguageTokenType)
-        self.build_long_op_dict([":=", "+="])
 
     def get_option(self):
         """
         长短选项
         -s --options
+
+        - 后不是字母或 - 时不是选项, 返回 None
         """
+        next_char = self.peek()
+        if next_char is None or not (next_char.isalpha() or next_char == "-"):
+            return None
         result = ""
         while self.current_char is not None:
             if self.current_char.isalnum() or self.current_char in ("-", "_"):
@@ -42,57 +65,17 @@ class MakefileLexer(Lexer):
             else:
                 break
 
-        return Token(MakefileTokenType.OPTION, result, self.line, self.column - 1)
-
-    def get_next_token(self) -> Token:
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char == '"':
-                return self.get_string()
-
-            if self.current_char == TokenType.HASH.value:
-                # match comment
-                return self.get_comment()
-
-            if self.current_char == "-" and (self.peek().isalpha() or self.peek() == "-"):
-                return self.get_option()
-
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
-
-            if self.current_char.isdigit():
-                return self.get_number(end_chars="GMKTB")
+        return self.create_token(MakefileTokenType.OPTION, result, self.pos - 1)
 
-            if self.current_char.isalpha() or self.current_char in ("-", "_", ".", "%"):
-                return self.get_id(extend_chars=["_", "-", ".", "%", "/"])
-
-            if self.current_char == "$" and self.peek() in ["@", "%", "<", "?", "^", "+", "*"]:
-                result = "$"
-                self.advance()
-                result += self.current_char
-                token = Token(MakefileTokenType.AUTO_VARIABLE, result, self.line, self.column)
-                self.advance()
-                return token
-
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(None, self.current_char, self.line, self.column)
-                self.error(ErrorCode.UNKNOWN_CHARACTER, token)
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
-
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+    def get_auto_variable(self):
+        """
+        自动变量 $@ $< $^ ...
+        """
+        if self.peek() not in ["@", "%", "<", "?", "^", "+", "*"]:
+            return None
+        result = "$"
+        self.advance()
+        result += self.current_char
+        token = self.create_token(MakefileTokenType.AUTO_VARIABLE, result)
+        self.advance()
+        return token
@@ -1,4 +1,4 @@
-from .lexer import Lexer, Token, TokenType
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType
 from ..token import TokenSet
 from enum import Enum
 
@@ -50,58 +50,24 @@ class PythonTokenType(Enum):
 
 
 class PythonLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.comment(),
+            LexerRule.extend_str("'''", "'''"),
+            LexerRule.extend_str('"""', '"""'),
+            LexerRule.quoted_str(),
+            LexerRule.number(accept_bit=True, accept_hex=True),
+            LexerRule.long_op(),
+            LexerRule.identifier(),
+        ],
+        long_ops=["+=", "-=", "*=", "@=", "/=", "%=", "&=", "|=", "^=", ">=", "<=", "<<=", ">>=", "**=", "//=", "->"],
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = PythonTokenType):
         super().__init__(text, LanguageTokenType)
-        self.build_long_op_dict(
-            ["+=", "-=", "*=", "@=", "/=", "%=", "&=", "|=", "^=",">=","<=", "<<=", ">>=", "**=", "//=", "->"]
-        )
-
-    def get_next_token(self) -> Token:
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-            
-            if self.current_char == '#':
-                return self.get_comment()
-
-            if self.current_char == "'" and self.peek(2) == "''":
-                return self.get_extend_str(("'''", "'''"))
-            if self.current_char == '"' and self.peek(2) == '""':
-                return self.get_extend_str(('"""', '"""'))
-
-            if self.current_char in ('"', "'"):
-                return self.get_str()
-
-            if self.current_char.isdigit():
-                return self.get_number(accept_bit=True, accept_hex=True)
-            
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
-
-            if self.current_char.isalpha() or self.current_char == "_":
-                return self.get_id()
-
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
-                self.advance()
-                return token
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
 
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
 
 class PythonTokenSet:
     def __init__(self) -> None:
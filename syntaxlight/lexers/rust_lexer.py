@@ -1,5 +1,5 @@
 from enum import Enum
-from .lexer import Lexer, TokenType, Token
+from .lexer import Lexer, LexerSpec, LexerRule, TokenType, Token
 from ..token import TokenSet
 
 
@@ -69,111 +69,86 @@ class RustTokenType(Enum):
     PATTERN_MATCH = '..='
 
 class RustLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.comment("//", "\n"),
+            LexerRule.comment("/*", "*/"),
+            LexerRule.custom("'", "get_lifetime"),
+            LexerRule.string(),
+            LexerRule.custom("'", "get_char"),
+            LexerRule.custom(lambda char: char.isdigit(), "get_number_with_suffix"),
+            LexerRule.identifier(),
+            LexerRule.long_op(),
+        ],
+        long_ops=[
+            "->",
+            "<=",
+            ">=",
+            "#!",
+            "::",
+            "..",
+            "...",
+            "==",
+            "=>",
+            "||",
+            "&&",
+            "!=",
+            "+=",
+            "-=",
+            "*=",
+            "/=",
+            "%=",
+            "&=",
+            "|=",
+            "<<=",
+            ">>=",
+            "<<",
+            ">>",
+            "..=",
+        ],
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = RustTokenType):
         super().__init__(text, LanguageTokenType)
-        self.build_long_op_dict(
-            [
-                "->",
-                "<=",
-                ">=",
-                "#!",
-                "::",
-                "..",
-                "...",
-                "==",
-                "=>",
-                "||",
-                "&&",
-                "!=",
-                "+=",
-                "-=",
-                "*=",
-                "/=",
-                "%=",
-                "&=",
-                "|=",
-                "<<=",
-                ">>=",
-                "<<",
-                ">>",
-                "..="
-            ]
-        )
 
     def get_lifetime(self):
+        """
+        'a 生命周期, 'a' 为字符, 不是生命周期时返回 None
+        """
+        next_char = self.peek()
+        if next_char is None or not next_char.isalnum() or self.text.startswith("'", self.pos + 2):
+            return None
         value = self.current_char
         self.advance()
         while self.current_char is not None and self.current_char.isalnum():
             value += self.current_char
             self.advance()
-        token = Token(RustTokenType.LIFETIME, value, self.line, self.column - 1)
+        token = self.create_token(RustTokenType.LIFETIME, value, self.pos - 1)
         return token
 
-    def get_next_token(self):
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char == "/" and self.peek() == "/":
-                return self.get_comment("//", "\n")
-            if self.current_char == "/" and self.peek() == "*":
-                return self.get_comment("/*", "*/")
-
-            if self.current_char == "'" and self.peek().isalnum() and self.peek(2)[-1] != "'":
-                return self.get_lifetime()
-
-            if self.current_char == '"':
-                return self.get_string()
-            
-            if self.current_char == "'":
-                return self.get_char()
-            
-            if self.current_char.isdigit():
-                token = self.get_number(accept_float=True, accept_hex=True, accept_bit=True)
-                if self.current_char in ["i", "u", "f"]:
-                    if self.peek() == "8" or self.peek(2) in ["16", "32", "64"] or self.peek(3) == "128":
-                        value = token.value + self.current_char
-                        self.advance()
-                        while self.current_char != None and self.current_char.isalnum():
-                            value += self.current_char
-                            self.advance()
-                        token = Token(TokenType.NUMBER, value, token.line, token.column - 1)
-                    elif self.peek(4) == "size":
-                        value = token.value + self.current_char
-                        self.advance()
-                        for _ in range(4):
-                            value += self.current_char
-                            self.advance()
-                        token = Token(TokenType.NUMBER, value, token.line, token.column)
-                return token
-
-            if self.current_char.isalpha() or self.current_char == "_":
-                return self.get_id()
-
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
-
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
+    def get_number_with_suffix(self):
+        """
+        数字以及 i8 u32 f64 usize 等类型后缀
+        """
+        token = self.get_number(accept_float=True, accept_hex=True, accept_bit=True)
+        if self.current_char in ["i", "u", "f"]:
+            if self.peek() == "8" or self.peek(2) in ["16", "32", "64"] or self.peek(3) == "128":
+                value = token.value + self.current_char
                 self.advance()
-                return token
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
+                while self.current_char != None and self.current_char.isalnum():
+                    value += self.current_char
+                    self.advance()
+                token = Token(TokenType.NUMBER, value, token.line, token.column - 1)
+            elif self.peek(4) == "size":
+                value = token.value + self.current_char
                 self.advance()
-                return token
-
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+                for _ in range(4):
+                    value += self.current_char
+                    self.advance()
+                token = Token(TokenType.NUMBER, value, token.line, token.column)
+        return token
 
 
 class RustTokenSet:
@@ -1,4 +1,4 @@
-from .lexer import Lexer, Token, TokenType
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType
 from enum import Enum
 import re
 
@@ -32,15 +32,37 @@ class ShellTokenType(Enum):
 
 
 class ShellLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.number(accept_bit=True, accept_hex=True, end_chars="sMGKBT"),
+            LexerRule.custom(lambda char: char.isalpha() or char in ("_", "."), "get_path_id"),
+            # 只接受双引号, 因为无法判断 can't ... 这种
+            LexerRule.string(),
+            LexerRule.custom("-", "get_option"),
+            LexerRule.comment(),
+            LexerRule.custom("<>", "get_redirect"),
+            LexerRule.long_op(),
+        ],
+        long_ops=["&&", ">>", "<<", "==", "==="],
+        # 考虑一些特殊的情况: test\shell\11.sh
+        unknown_token_type=TokenType.TEXT,
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = ShellTokenType):
         super().__init__(text, LanguageTokenType)
-        self.build_long_op_dict(["&&", ">>", "<<", "==", "==="])
 
     def get_option(self):
         """
         长短选项
         -s --options
+
+        - 后不是字母或 - 时不是选项, 返回 None
         """
+        next_char = self.peek()
+        if next_char is None or not (next_char.isalpha() or next_char == "-"):
+            return None
         result = ""
         while self.current_char is not None:
             if self.current_char.isalnum() or self.current_char in ("-", "_"):
@@ -49,66 +71,28 @@ class ShellLexer(Lexer):
             else:
                 break
 
-        return Token(ShellTokenType.OPTION, result, self.line, self.column - 1)
-
-    def get_next_token(self) -> Token:
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char.isdigit():
-                return self.get_number(accept_bit=True, accept_hex=True, end_chars="sMGKBT")
-
-            if self.current_char.isalpha() or self.current_char in ("_", "."):
-                token = self.get_id(extend_chars=["_", "-", ".", "/", ":", "+", "-", "@", "~"])
-                if bool(re.match(r"^\w+@[\w.-]+:[~\w/]+", token.value)):
-                    if self.current_char in ("#", "$"):
-                        token.value += self.current_char
-                        token.column += 1
-                        self.advance()
-                    token.type = ShellTokenType.LINUX_USER_PATH
-
-                return token
-
-            # 只接受双引号, 因为无法判断 can't ... 这种
-            if self.current_char == '"':
-                return self.get_string()
+        return self.create_token(ShellTokenType.OPTION, result, self.pos - 1)
 
-            if self.current_char == "-":
-                next_char = self.peek()
-                if next_char is not None and (next_char.isalpha() or next_char == "-"):
-                    return self.get_option()
-
-            if self.current_char == "#":
-                return self.get_comment()
-
-            if self.current_char in ("<", ">") and self.peek() != self.current_char:
-                token = Token(ShellTokenType(self.current_char), self.current_char, self.line, self.column)
+    def get_path_id(self):
+        """
+        普通的 id 或者 user@host:path 形式的终端提示符
+        """
+        token = self.get_id(extend_chars=["_", "-", ".", "/", ":", "+", "-", "@", "~"])
+        if bool(re.match(r"^\w+@[\w.-]+:[~\w/]+", token.value)):
+            if self.current_char in ("#", "$"):
+                token.value += self.current_char
+                token.column += 1
                 self.advance()
-                return token
-
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
+            token.type = ShellTokenType.LINUX_USER_PATH
 
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                # 考虑一些特殊的情况: test\shell\11.sh
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
-                self.advance()
-                return token
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
+        return token
 
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+    def get_redirect(self):
+        """
+        单独的 < >, << >> 由 get_long_op 匹配
+        """
+        if self.peek() == self.current_char:
+            return None
+        token = self.create_token(ShellTokenType(self.current_char), self.current_char)
+        self.advance()
+        return token
@@ -1,6 +1,6 @@
 from typing import List
 from syntaxlight.lexers.lexer import Token
-from .lexer import Lexer, Token, TokenType, ErrorCode
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType, ErrorCode
 from ..token import TokenSet
 from enum import Enum
 import re
@@ -136,33 +136,46 @@ class VerilogTokenType(Enum):
 
 
 class VerilogLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.comment("//", "\n"),
+            LexerRule.comment("/*", "*/"),
+            LexerRule.identifier(extend_chars=["_", "$"]),
+            LexerRule.string(),
+            LexerRule.number(first=lambda char: char.isdigit() or char == "'"),
+            LexerRule.custom("$", "get_system_id"),
+            LexerRule.long_op(),
+        ],
+        long_ops=[
+            "<=",
+            "->",
+            "=>",
+            "*>",
+            "<=",
+            "&&&",
+            "~&",
+            "^|",
+            "~^",
+            "^~",
+            "==",
+            "!=",
+            "<=",
+            ">=",
+            "===",
+            "!==",
+            "&&",
+            ">>",
+            "<<",
+            "||",
+            "++",
+            "--",
+        ],
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = VerilogTokenType):
         super().__init__(text, LanguageTokenType)
-        self.build_long_op_dict(
-            [
-                "<=",
-                "->",
-                "=>",
-                "*>",
-                "<=",
-                "&&&",
-                "~&",
-                "^|",
-                "~^",
-                "^~",
-                "==",
-                "!=",
-                "<=",
-                ">=",
-                "===",
-                "!==",
-                "&&",
-                ">>",
-                "<<",
-                "||",
-                "++",'--'
-            ]
-        )
 
     def get_number(self) -> Token:
         """
@@ -190,81 +203,29 @@ class VerilogLexer(Lexer):
             else:
                 result += self.current_char
                 self.advance()
-                token = Token(TokenType.NUMBER, result, self.line, self.column)
+                token = self.create_token(TokenType.NUMBER, result)
                 self.error(ErrorCode.UNKNOWN_CHARACTER, token, "Expected one of 'bBoOdDhH'")
 
         while self.current_char is not None and bool(re.match(r"[0-9a-fA-FxXzZ\?]", self.current_char)):
             result += self.current_char
             self.advance()
 
-        token = Token(TokenType.NUMBER, result, self.line, self.column - 1)
+        token = self.create_token(TokenType.NUMBER, result, self.pos - 1)
         return token
 
-    def get_next_token(self) -> Token:
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char == "/":
-                if self.peek() == "/":
-                    return self.get_comment("//", "\n")
-                elif self.peek() == "*":
-                    return self.get_comment("/*", "*/")
-
-            if self.current_char.isalpha() or self.current_char == "_":
-                token = self.get_id(extend_chars=["_", "$"])
-                # if len(token.value) == 1:
-                #     if token.value in VerilogTokenType.EDGE_SYMBOL.value:
-                #         token.type = VerilogTokenType.EDGE_SYMBOL
-                #     elif token.value in VerilogTokenType.LEVEL_SYMBOL.value:
-                #         token.type = VerilogTokenType.LEVEL_SYMBOL
-
-                return token
-
-            if self.current_char == '"':
-                return self.get_string()
-
-            if self.current_char.isdigit() or self.current_char == "'":
-                token = self.get_number()
-                # if len(token.value) == 1 and token.value in ("0", "1"):
-                #     token.type = VerilogTokenType.LEVEL_SYMBOL
-                return token
-
-            if self.current_char == "$" and self.peek() != " ":
-                token_value = "$"
-                self.advance()
-                while self.current_char is not None and (
-                    self.current_char.isalnum() or self.current_char in ("$", "_")
-                ):
-                    token_value += self.current_char
-                    self.advance()
-                token = Token(VerilogTokenType.SYSTEM_ID, token_value, self.line, self.column - 1)
-                return token
-
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
-
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
-                self.advance()
-                return token
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
-
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+    def get_system_id(self):
+        """
+        $display 等系统任务, $ 后为空格时不匹配
+        """
+        if self.peek() == " ":
+            return None
+        token_value = "$"
+        self.advance()
+        while self.current_char is not None and (self.current_char.isalnum() or self.current_char in ("$", "_")):
+            token_value += self.current_char
+            self.advance()
+        token = self.create_token(VerilogTokenType.SYSTEM_ID, token_value, self.pos - 1)
+        return token
 
 
 class VerilogTokenSet:
@@ -1,4 +1,4 @@
-from .lexer import Lexer, Token, TokenType, ErrorCode
+from .lexer import Lexer, Token, TokenType
 from ..token import TokenSet
 from enum import Enum
 
@@ -20,6 +20,9 @@ class XmlTokenType(Enum):
 class XmlLexer(Lexer):
     def __init__(self, text: str, LanguageTokenType: Enum = XmlTokenType):
         super().__init__(text, LanguageTokenType)
+
+    def reset(self, text: str):
+        super().reset(text)
         self.content_matching = False
 
     def get_next_token(self) -> Token:
@@ -30,7 +33,7 @@ class XmlLexer(Lexer):
                     result += self.current_char
                     self.advance()
                 self.content_matching = False
-                return Token(XmlTokenType.CONTENT, result, self.line, self.column - 1)
+                return self.create_token(XmlTokenType.CONTENT, result, self.pos - 1)
 
             if self.current_char == TokenType.SPACE.value:
                 return self.skip_whitespace()
@@ -45,35 +48,33 @@ class XmlLexer(Lexer):
                     self.advance()
                     self.advance()
                     self.advance()
-                    token = Token(XmlTokenType.PROLOG_START, result, self.line, self.column)
+                    token = self.create_token(XmlTokenType.PROLOG_START, result)
                     self.advance()
                     return token
                 elif self.peek(3) == "!--":
                     return self.get_comment("<!--", "-->")
                 elif self.peek() == "/":
                     self.advance()
-                    token = Token(XmlTokenType.TAG_COMPLETE_BEGIN, "</", self.line, self.column)
+                    token = self.create_token(XmlTokenType.TAG_COMPLETE_BEGIN, "</")
                     self.advance()
                     return token
                 else:
-                    token = Token(
-                        XmlTokenType.TAG_START_BEGIN, self.current_char, self.line, self.column
-                    )
+                    token = self.create_token(XmlTokenType.TAG_START_BEGIN, self.current_char)
                     self.advance()
                     return token
             if self.current_char == "/" and self.peek() == ">":
                 self.advance()
-                token = Token(XmlTokenType.TAG_SELF_END, "/>", self.line, self.column)
+                token = self.create_token(XmlTokenType.TAG_SELF_END, "/>")
                 self.advance()
                 return token
             if self.current_char == ">":
-                token = Token(XmlTokenType.TAG_END, self.current_char, self.line, self.column)
+                token = self.create_token(XmlTokenType.TAG_END, self.current_char)
                 self.content_matching = True
                 self.advance()
                 return token
             if self.current_char == "?" and self.peek() == ">":
                 self.advance()
-                token = Token(XmlTokenType.PROLOG_END, "?>", self.line, self.column)
+                token = self.create_token(XmlTokenType.PROLOG_END, "?>")
                 self.advance()
                 return token
             
@@ -90,25 +91,12 @@ class XmlLexer(Lexer):
                     result += self.current_char
                     self.advance()
 
-                return Token(XmlTokenType.NAME, result, self.line, self.column - 1)
+                return self.create_token(XmlTokenType.NAME, result, self.pos - 1)
 
             if self.current_char in ('"', "'"):
                 return self.get_str()
 
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(None, self.current_char, self.line, self.column)
-                self.error(ErrorCode.UNKNOWN_CHARACTER, token)
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
+            return self.get_single_char_token(None)
 
         # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
+        return self.create_token(TokenType.EOF, "EOF")
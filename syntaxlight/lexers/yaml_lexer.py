@@ -1,7 +1,7 @@
 
 
 
-from .lexer import Lexer, Token, TokenType, ErrorCode
+from .lexer import Lexer, LexerSpec, LexerRule, Token, TokenType, ErrorCode
 from enum import Enum
 
 class YamlTokenType(Enum):
@@ -24,48 +24,32 @@ class YamlTokenType(Enum):
     ENV_VAR = 'Env-var'
 
 class YamlLexer(Lexer):
+    spec = LexerSpec(
+        rules=[
+            LexerRule.space(),
+            LexerRule.invisible(),
+            LexerRule.comment("#", "\n"),
+            LexerRule.number(end_chars="GMKTB/"),
+            LexerRule.custom(".", "get_decimal"),
+            LexerRule.identifier(
+                first=lambda char: char.isalpha() or char in ("_", "/", "."),
+                extend_chars=["_", ".", "@", "-", "/", "?", "|"],
+                ignore_case=True,
+            ),
+            LexerRule.quoted_str(),
+            LexerRule.long_op(),
+        ],
+        long_ops=["<<"],
+    )
+
     def __init__(self, text: str, LanguageTokenType: Enum = YamlTokenType):
         super().__init__(text, LanguageTokenType)
-        self.build_long_op_dict(['<<'])
-
-    def get_next_token(self) -> Token:
-        while self.current_char is not None:
-            if self.current_char == TokenType.SPACE.value:
-                return self.skip_whitespace()
-
-            if self.current_char in self.invisible_characters:
-                return self.skip_invisiable_character()
-
-            if self.current_char == '#':
-                return self.get_comment('#','\n')
-            
-            if self.current_char.isdigit() or (self.current_char == '.' and self.peek().isdigit()):
-                return self.get_number(end_chars='GMKTB/')
-
-            if self.current_char.isalpha() or self.current_char in ('_','/','.'):
-                return self.get_id(extend_chars=['_','.','@','-','/','?','|'], ignore_case=True)
-            
-            if self.current_char in ('"',"'"):
-                return self.get_str()
-
-            if self.current_char in self.long_op_dict:
-                return self.get_long_op()
-
-            try:
-                token_type = TokenType(self.current_char)
-            except ValueError:  # pragma: no cover
-                token = Token(TokenType.TEXT, self.current_char, self.line, self.column)
-                self.advance()
-                return token
-            else:
-                token = Token(
-                    type=token_type,
-                    value=token_type.value,  # e.g. ';', '.', etc
-                    line=self.line,
-                    column=self.column,
-                )
-                self.advance()
-                return token
 
-        # End of File
-        return Token(type=TokenType.EOF, value="EOF", line=self.line, column=self.column)
\ No newline at end of file
+    def get_decimal(self):
+        """
+        . 开头的小数, 例如 .5
+        """
+        next_char = self.peek()
+        if next_char is None or not next_char.isdigit():
+            return None
+        return self.get_number(end_chars="GMKTB/")
@@ -31,6 +31,9 @@ class X86AssemblyParser(Parser):
 
 
 class RISCVAssmemblyParser(Parser):
+    # 通过 token_list[-2] 查看前一个 token, 需要保留所有空白 token
+    gap_characters = frozenset()
+
     def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
         super().__init__(lexer, skip_invis_chars, skip_space)
         # https://zhuanlan.zhihu.com/p/295439950
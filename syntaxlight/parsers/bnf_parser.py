@@ -1,5 +1,5 @@
 from .parser import Parser
-from ..lexers import TokenType
+from ..lexers import TokenType, TokenSet
 from ..error import ErrorCode
 from ..asts.ast import String, AST, Identifier, Expression, NodeVisitor, Punctuator, add_ast_type
 from enum import Enum
@@ -44,16 +44,18 @@ class Item(AST):
         self.op = None
 
 class BNFParser(Parser):
+    gap_characters = frozenset(" ")
+    punctuator_first_set = TokenSet(TokenType.PLUS, TokenType.MUL, TokenType.QUESTION)
+    term_first_set = TokenSet(
+        TokenType.STR,
+        TokenType.LANGLE_BRACE,
+        TokenType.LPAREN,
+        TokenType.LCURLY_BRACE,
+        TokenType.ID,
+    )
+
     def __init__(self, lexer, skip_invis_chars=False, skip_space=True):
         super().__init__(lexer, skip_invis_chars, skip_space)
-        self.punctuator_first_set = [TokenType.PLUS, TokenType.MUL, TokenType.QUESTION]
-        self.term_first_set = [
-            TokenType.STR,
-            TokenType.LANGLE_BRACE,
-            TokenType.LPAREN,
-            TokenType.LCURLY_BRACE,
-            TokenType.ID,
-        ]
 
     def parse(self):
         self.skip_crlf()
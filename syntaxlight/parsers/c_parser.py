@@ -9,7 +9,7 @@
 
 import re
 
-from .parser import Parser
+from .parser import Parser, operator_precedence
 from ..lexers import TokenType, CTokenType, CTokenSet, Token
 from ..error import ErrorCode
 from ..asts.ast import (
@@ -25,14 +25,13 @@ from ..asts.ast import (
     Char,
     add_ast_type,
     delete_ast_type,
+    resolve_ast_types,
 )
 from ..asts.c_ast import *
-from typing import List
+from typing import List, Generator
 from enum import Enum
 from ..gdt import *
 
-GDT = GlobalDescriptorTable()
-
 
 class C_CSS(Enum):
     BASE_TYPE = "BaseType"
@@ -49,9 +48,13 @@ class C_CSS(Enum):
 
 
 class CParser(Parser):
+    # 预处理命令以换行结束, 需要保留换行 token
+    gap_characters = Parser.gap_characters - {TokenType.LF.value}
+    # first set 只读, 导入时构建一次, 所有实例共享
+    cfirst_set = CTokenSet()
+
     def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
         super().__init__(lexer, skip_invis_chars, skip_space)
-        self.cfirst_set = CTokenSet()
         self.in_preprocessing = False  # 进入预处理阶段, 影响 after_eat
         self.preprocessing_keywords = [
             "ifdef",
@@ -65,14 +68,14 @@ class CParser(Parser):
             "error",
             "pragma",
         ]
-        self.after_eat()
 
     def parse(self):
+        # 第一个 token 可能是预处理命令, 也可能是 prelude 中的类型, 在解析开始时再处理
+        self.after_eat()
         self.root = self.translation_unit()
         self.skip_crlf()
         if self.current_token.type != TokenType.EOF:
             self.error(error_code=ErrorCode.UNEXPECTED_TOKEN, message="should match EOF")
-        GDT.reset()
         return self.root
 
     def translation_unit(self):
@@ -81,7 +84,12 @@ class CParser(Parser):
         """
         declarations = []
         while self.current_token.type in self.cfirst_set.external_declaration:
-            declarations.append(self.external_declaration())
+            declaration = self.external_declaration()
+            if self.build_ast:
+                declarations.append(declaration)
+            else:
+                # 顶层节点不再保留, 先处理其中记录的类名
+                resolve_ast_types()
         return TranslationUnit(declarations)
 
     def external_declaration(self):
@@ -318,22 +326,20 @@ class CParser(Parser):
     def after_eat(self):
         if self.current_token.type == TokenType.ID:
             # 对于已经在 GDT 中的元素直接标记为 TYPEDEF
-            if self.current_token.value in GDT:
-                if GDT[self.current_token.value] == CSS.TYPEDEF:
-                    self.current_token.type = CTokenType.TYPEDEF_ID
-                elif GDT[self.current_token.value] == CSS.MACRO_DEFINE:
-                    self.current_token.add_css(CSS.MACRO_DEFINE)
-                elif GDT[self.current_token.value] == CSS.MACRO_FUNCTION:
-                    self.current_token.add_css(CSS.MACRO_FUNCTION)
+            id_type = self.gdt[self.current_token.value]
+            if id_type == CSS.TYPEDEF:
+                self.current_token.type = CTokenType.TYPEDEF_ID
+            elif id_type == CSS.MACRO_DEFINE:
+                self.current_token.add_css(CSS.MACRO_DEFINE)
+            elif id_type == CSS.MACRO_FUNCTION:
+                self.current_token.add_css(CSS.MACRO_FUNCTION)
             if self.current_token.value.startswith("__"):
-                next_token_types = [TokenType.ID, TokenType.MUL]
-                next_token_type = self.peek_next_token().type
-                if next_token_type in self.cfirst_set.declaration_specifier or next_token_type in next_token_types:
+                if self._declaration_follows(self._lookahead_index(0)):
                     # 双下划线开头的变量特殊处理, 可能是宏. 见 44.c
                     # __init __always_inline
                     self.current_token.type = CTokenType.TYPEDEF_ID
                     self.current_token.add_css(CSS.MACRO_DEFINE)
-                    GDT.register_id(self.current_token.value, CSS.MACRO_DEFINE)
+                    self.gdt.register_id(self.current_token.value, CSS.MACRO_DEFINE)
 
         if self.in_preprocessing:
             if self.current_token.type == CTokenType.IF:
@@ -348,6 +354,42 @@ class CParser(Parser):
             # TODO: 考虑如何格式化
             self.group()
 
+    def classify_lookahead_token(self, token: Token, index: int) -> Token:
+        """
+        与 after_eat 相同的类型修正, 但不修改 token 和 GDT
+        """
+        token_type = token.type
+        if token_type == TokenType.ID:
+            if self.gdt[token.value] == CSS.TYPEDEF:
+                token_type = CTokenType.TYPEDEF_ID
+            if token.value.startswith("__") and self._declaration_follows(self._lookahead_index(index + 1)):
+                token_type = CTokenType.TYPEDEF_ID
+
+        if self.in_preprocessing:
+            if token_type == CTokenType.IF:
+                token_type = CTokenType.IF_P
+            elif token_type == CTokenType.ELSE:
+                token_type = CTokenType.ELSE_P
+            elif token.value in self.preprocessing_keywords:
+                token_type = CTokenType(token.value)
+
+        if token_type == token.type:
+            return token
+        return Token(token_type, token.value, token.line, token.column)
+
+    def _declaration_follows(self, index: int) -> bool:
+        """
+        缓冲区中下标 index 的 token 是否可以跟在类型/宏之后, 即声明说明符, ID 或 *
+
+        ID 无论是否会被修正为 TYPEDEF_ID 都满足条件, 只有预处理关键字需要修正后再判断.
+        因此连续的 __always_inline __must_check ... 只需要查看下一个 token, 不需要递归地修正后面所有的 token
+        """
+        token = self._lookahead[index]
+        if token.type == TokenType.ID and not (self.in_preprocessing and token.value in self.preprocessing_keywords):
+            return True
+        token_type = self.classify_lookahead_token(token, index).type
+        return token_type in self.cfirst_set.declaration_specifier or token_type in (TokenType.ID, TokenType.MUL)
+
     def struct_declarator_list(self) -> List[AST]:
         """
         <struct-declarator-list> ::= <struct-declarator> ("," <struct-declarator>)*
@@ -441,9 +483,9 @@ class CParser(Parser):
         if self.current_token.type == TokenType.ID:
             node.update(id=self.get_identifier())
             # 对于初始化的变量去掉其 DefineName 的 tag
-            if node.id.id in GDT and GDT[node.id.id] == CSS.MACRO_DEFINE:
+            if node.id.id in self.gdt and self.gdt[node.id.id] == CSS.MACRO_DEFINE:
                 delete_ast_type(node.id, CSS.MACRO_DEFINE)
-                GDT.delete_id(node.id.id)
+                self.gdt.delete_id(node.id.id)
         elif self.current_token.type == TokenType.LPAREN and self.peek_next_token().type in self.cfirst_set.declarator:
             node.register_token(self.eat(TokenType.LPAREN))
             node.update(declarator=self.declarator())
@@ -491,14 +533,14 @@ class CParser(Parser):
                     node.is_function = True
                     add_ast_type(node, CSS.FUNCTION_NAME)
                     # TODO: 注册函数到 GDT
-                    GDT.register_id(node.id.id, CSS.FUNCTION_NAME)
+                    self.gdt.register_id(node.id.id, CSS.FUNCTION_NAME)
                 if node.declarator is not None:
                     # 函数指针 "(" <declarator> ")"
                     add_ast_type(node, CSS.FUNCTION_POINTER)
                     # 找到最底层的函数指针的名字, 标记为 FUNCTION_POINTER
                     declarator_id = self._find_declaractor_id(node)
                     if declarator_id is not None:
-                        GDT.register_id(declarator_id.id, CSS.FUNCTION_POINTER)
+                        self.gdt.register_id(declarator_id.id, CSS.FUNCTION_POINTER)
 
                 node.register_token(self.eat(TokenType.LPAREN))
                 self._unknown_typedef_id_guess()
@@ -601,101 +643,61 @@ class CParser(Parser):
         """
         <conditional-expression> ::= <logical-or-expression> ("?" <expression> ":" <conditional-expression>)?
         """
-        node = ConditionalExpression()
-        node.update(condition_expr=self.logical_or_expression())
-        if self.current_token.type == TokenType.QUESTION:
-            node.register_token(self.eat(TokenType.QUESTION))
-            node.update(value_true=self.expression())
-            node.register_token(self.eat(TokenType.COLON))
-            node.update(value_false=self.conditional_expression())
-        return node
-
-    def _binary_expression(self, token_types: List[Enum], func):
-        """
-        方便后面优先级运算符调用
+        return self.run_nested(self._conditional_expression())
 
-        为了避免大量的AST嵌套, 简化过程, 如果没有 expr_rights 则直接返回 expr_left
-        """
-        expr_left = func()
-        if self.current_token.type not in token_types:
-            return expr_left
+    def _conditional_expression(self):
+        return self.chain_expression(self._conditional_operand, self._conditional_operator)
 
-        node = BinaryOp()
-        node.update(expr_left=expr_left)
-        expr_rights = []
-        while self.current_token.type in token_types:
-            if self.current_token.type == TokenType.LANGLE_BRACE:
-                self.current_token.type = TokenType.LT
-            elif self.current_token.type == TokenType.RANGLE_BRACE:
-                self.current_token.type = TokenType.GT
-            node.register_token(self.eat(self.current_token.type))
-            expr_rights.append(func())
-        node.update(expr_rights=expr_rights)
+    def _conditional_operand(self):
+        node = ConditionalExpression()
+        node.update(condition_expr=(yield from self.logical_or_expression()))
         return node
 
+    def _conditional_operator(self, node: ConditionalExpression):
+        if self.current_token.type != TokenType.QUESTION:
+            return None
+        node.register_token(self.eat(TokenType.QUESTION))
+        node.update(value_true=self.expression())
+        node.register_token(self.eat(TokenType.COLON))
+        return "value_false"
+
+    # 双目运算符, 优先级由低到高
+    binary_operator_precedence = operator_precedence(
+        [TokenType.OR],
+        [TokenType.AND],
+        [TokenType.PIPE],
+        [TokenType.CARET],
+        [TokenType.AMPERSAND],
+        [TokenType.EQ, TokenType.NE],
+        [TokenType.LANGLE_BRACE, TokenType.RANGLE_BRACE, TokenType.LE, TokenType.GE],
+        [TokenType.SHL, TokenType.SHR],
+        [TokenType.PLUS, TokenType.MINUS],
+        [TokenType.MUL, TokenType.DIV, TokenType.MOD],
+    )
+
     def logical_or_expression(self):
         """
         <logical-or-expression> ::= <logical-and-expression> ("||" <logical-and-expression>)*
-        """
-        return self._binary_expression([TokenType.OR], self.logical_and_expression)
-
-    def logical_and_expression(self):
-        """
         <logical-and-expression> ::= <inclusive-or-expression> ("&&" <inclusive-or-expression>)*
-        """
-        return self._binary_expression([TokenType.AND], self.inclusive_or_expression)
-
-    def inclusive_or_expression(self):
-        """
         <inclusive-or-expression> ::= <exclusive-or-expression> ("|" <exclusive-or-expression>)*
-        """
-        return self._binary_expression([TokenType.PIPE], self.exclusive_or_expression)
-
-    def exclusive_or_expression(self):
-        """
         <exclusive-or-expression> ::= <and-expression> ("^" <and-expression>)*
-        """
-        return self._binary_expression([TokenType.CARET], self.and_expression)
-
-    def and_expression(self):
-        """
         <and-expression> ::= <equality-expression> ("&" <equality-expression>)*
-        """
-        return self._binary_expression([TokenType.AMPERSAND], self.equality_expression)
-
-    def equality_expression(self):
-        """
         <equality-expression> ::= <relational-expression> (("=="|"!=") <relational-expression>)*
-        """
-        return self._binary_expression([TokenType.EQ, TokenType.NE], self.relational_expression)
-
-    def relational_expression(self):
-        """
         <relational-expression> ::= <shift-expression> (("<"|">"|"<="|">=") <shift-expression>)*
-        """
-
-        return self._binary_expression(
-            [TokenType.LANGLE_BRACE, TokenType.RANGLE_BRACE, TokenType.LE, TokenType.GE],
-            self.shift_expression,
-        )
-
-    def shift_expression(self):
-        """
         <shift-expression> ::= <additive-expression> (("<<" | ">>") <additive-expression>)*
-        """
-        return self._binary_expression([TokenType.SHL, TokenType.SHR], self.additive_expression)
-
-    def additive_expression(self):
-        """
         <additive-expression> ::= <multiplicative-expression> (("+"|"-") <multiplicative-expression>)*
-        """
-        return self._binary_expression([TokenType.PLUS, TokenType.MINUS], self.multiplicative_expression)
-
-    def multiplicative_expression(self):
-        """
         <multiplicative-expression> ::= <cast-expression> (("*"|"/"|"%") <cast-expression>)*
+
+        为了避免大量的AST嵌套, 简化过程, 没有运算符的一层不生成 BinaryOp, 见 Parser.binary_expression
         """
-        return self._binary_expression([TokenType.MUL, TokenType.DIV, TokenType.MOD], self.cast_expression)
+        return self.binary_expression(self.binary_operator_precedence, self.cast_expression, self._binary_operator)
+
+    def _binary_operator(self, node: BinaryOp):
+        if self.current_token.type == TokenType.LANGLE_BRACE:
+            self.current_token.type = TokenType.LT
+        elif self.current_token.type == TokenType.RANGLE_BRACE:
+            self.current_token.type = TokenType.GT
+        node.register_token(self.eat(self.current_token.type))
 
     def cast_expression(self):
         """
@@ -718,12 +720,12 @@ class CParser(Parser):
                 node.register_token(self.eat(TokenType.LPAREN))
                 # 对于未知符号强制类型的情况将其修改为 TYPEDEF_ID
                 self.current_token.type = CTokenType.TYPEDEF_ID
-                GDT.register_id(self.current_token.value, CSS.TYPEDEF)
+                self.gdt.register_id(self.current_token.value, CSS.TYPEDEF)
                 type_names.append(self.type_name())
                 node.register_token(self.eat(TokenType.RPAREN))
         node.update(type_names=type_names)
         if self.current_token.type in self.cfirst_set.unary_expression:
-            node.update(expr=self.unary_expression())
+            node.update(expr=(yield from self.unary_expression()))
 
         elif self.current_token.type == TokenType.LCURLY_BRACE:
             # @修改文法
@@ -748,6 +750,9 @@ class CParser(Parser):
         (uint8 *) <unary-expression>
         (uint8 ****) <unary-expression>
         """
+        return self.memoize("is_type_cast", self._is_type_cast)
+
+    def _is_type_cast(self):
         if self.peek_next_token().type == TokenType.ID:
             if (
                 self.peek_next_token(2).type == TokenType.RPAREN
@@ -766,7 +771,7 @@ class CParser(Parser):
 
         return False
 
-    def unary_expression(self) -> Union[PostfixExpression, UnaryExpression]:
+    def unary_expression(self) -> Generator[Generator, AST, UnaryExpression]:
         """
         <unary-expression> ::= <postfix-expression>
                              | "++" <unary-expression>
@@ -785,11 +790,11 @@ class CParser(Parser):
         """
         node = UnaryExpression()
         if self.current_token.type in self.cfirst_set.postfix_expression:
-            node.update(expr=self.postfix_expression())
+            node.update(expr=(yield from self.postfix_expression()))
         elif self.current_token.type in (TokenType.INC, TokenType.DEC):
             unary_expr = UnaryOp(op=self.current_token.value)
             unary_expr.register_token(self.eat(self.current_token.type))
-            unary_expr.update(expr=self.unary_expression())
+            unary_expr.update(expr=(yield self.unary_expression()))
             node.update(expr=unary_expr)
         elif self.current_token.type in self.cfirst_set.unary_operator:
             if self.current_token.type == TokenType.MUL:
@@ -800,7 +805,7 @@ class CParser(Parser):
             # @EXTEND-GRAMMAR: 可能没有 cast_expression
             # time_t (*)(time_t *)
             if self.current_token.type != TokenType.RPAREN:
-                unary_expr.update(expr=self.cast_expression())
+                unary_expr.update(expr=(yield self.cast_expression()))
             node.update(expr=unary_expr)
         elif self.current_token.type == CTokenType.SIZEOF:
             node.update(keyword=self.get_keyword(CTokenType.SIZEOF))
@@ -815,14 +820,14 @@ class CParser(Parser):
                 self.current_token.type in self.cfirst_set.unary_expression
                 and self.current_token.type != TokenType.LPAREN
             ):
-                node.update(expr=self.unary_expression())
+                node.update(expr=(yield self.unary_expression()))
             elif self.current_token.type == TokenType.LPAREN:
                 node.register_token(self.eat(TokenType.LPAREN))
                 if self.current_token.type in self.cfirst_set.type_name:
                     node.update(expr=self.type_name())
                     node.register_token(self.eat(TokenType.RPAREN))
                 elif self.current_token.type in self.cfirst_set.expression:
-                    node.update(expr=self.expression())
+                    node.update(expr=(yield self._expression()))
                     node.register_token(self.eat(TokenType.RPAREN))
                 else:
                     self.error(ErrorCode.UNEXPECTED_TOKEN, "should be type name or expression")
@@ -868,7 +873,7 @@ class CParser(Parser):
         ):
             # TokenType.LCURLY_BRACE => GNU C Extension
             # https://github.com/luzhixing12345/syntaxlight/issues/13
-            node.update(primary_expr=self.primary_expression())
+            node.update(primary_expr=(yield from self.primary_expression()))
         else:
             node.register_token(self.eat(TokenType.LPAREN))
             node.update(type_name=self.type_name())
@@ -882,7 +887,7 @@ class CParser(Parser):
         # 检查是不是宏定义
         if node.primary_expr is not None:
             if isinstance(node.primary_expr.sub_node, Identifier):
-                if node.primary_expr.sub_node.id in GDT or bool(
+                if node.primary_expr.sub_node.id in self.gdt or bool(
                     re.match(r"^[A-Z_][0-9A-Z_]+$", node.primary_expr.sub_node.id)
                 ):
                     if self.current_token.type == TokenType.LPAREN:
@@ -893,7 +898,7 @@ class CParser(Parser):
         while self.current_token.type in self.cfirst_set.postfix_expression_inside:
             if self.current_token.type == TokenType.LSQUAR_PAREN:
                 node.register_token(self.eat(TokenType.LSQUAR_PAREN))
-                sub_nodes.append(self.expression())
+                sub_nodes.append((yield self._expression()))
                 node.register_token(self.eat(TokenType.RSQUAR_PAREN))
             elif self.current_token.type == TokenType.LPAREN:
                 node.register_token(self.eat(TokenType.LPAREN))
@@ -921,7 +926,7 @@ class CParser(Parser):
                                 delete_ast_type(node.primary_expr, CSS.FUNCTION_CALL)
                                 node.primary_expr.sub_node._tokens[0].type = CTokenType.TYPEDEF_ID
                                 add_ast_type(node.primary_expr, CSS.TYPEDEF)
-                                GDT.register_id(node.primary_expr.sub_node.id, CSS.TYPEDEF)
+                                self.gdt.register_id(node.primary_expr.sub_node.id, CSS.TYPEDEF)
 
                                 self._unknown_typedef_id_guess()
                                 sub_nodes.append(self.parameter_list())
@@ -931,7 +936,7 @@ class CParser(Parser):
                     # len(sub_nodes) == 0
                     func_node = node.primary_expr.sub_node
                 
-                if type(func_node) == Identifier and GDT[func_node.id] == CSS.FUNCTION_POINTER:
+                if type(func_node) == Identifier and self.gdt[func_node.id] == CSS.FUNCTION_POINTER:
                     # 对于函数指针, 不视为 FunctionCall
                     pass
                 else:
@@ -940,10 +945,10 @@ class CParser(Parser):
                     add_ast_type(func_node, CSS.FUNCTION_CALL)
 
                 if self.current_token.type in self.cfirst_set.assignment_expression:
-                    sub_nodes.append(self.assignment_expression())
+                    sub_nodes.append((yield self._assignment_expression()))
                     while self.current_token.type == TokenType.COMMA:
                         node.register_token(self.eat(TokenType.COMMA))
-                        sub_nodes.append(self.assignment_expression())
+                        sub_nodes.append((yield self._assignment_expression()))
 
                 node.register_token(self.eat(TokenType.RPAREN))
             elif self.current_token.type == TokenType.DOT:
@@ -1010,7 +1015,7 @@ class CParser(Parser):
             if self.current_token.type in self.cfirst_set.compound_statement:
                 sub_node = self.compound_statement()
             else:
-                sub_node = self.expression()
+                sub_node = yield self._expression()
             node.register_token(self.eat(TokenType.RPAREN))
         elif self.current_token.type in self.cfirst_set.generic_selection:
             sub_node = self.generic_selection()
@@ -1092,12 +1097,18 @@ class CParser(Parser):
     def expression(self):
         """
         <expression> ::= <assignment-expression> ("," <assignment-expression>)*
+
+        从 assignment-expression 到 primary-expression 的各层都是由 run_nested 运行的生成器,
+        括号/下标/函数参数中嵌套的表达式层数不受递归深度限制
         """
+        return self.run_nested(self._expression())
+
+    def _expression(self):
         node = Expression()
-        exprs = [self.assignment_expression()]
+        exprs = [(yield from self._assignment_expression())]
         while self.current_token.type == TokenType.COMMA:
             node.register_token(self.eat(TokenType.COMMA))
-            exprs.append(self.assignment_expression())
+            exprs.append((yield from self._assignment_expression()))
         node.update(exprs=exprs)
         return node
 
@@ -1108,30 +1119,33 @@ class CParser(Parser):
         """
         # <conditional-expression> => <cast-expression> => ("(" <type-name> ")")* <unary-expression>
         # 无法 LL1 判断, 需要额外处理
+        return self.run_nested(self._assignment_expression())
+
+    def _assignment_expression(self):
+        return self.chain_expression(self._assignment_operand, self._assignment_operator)
+
+    def _assignment_operand(self):
         if self.current_token.type not in self.cfirst_set.assignment_expression:
             self.error(ErrorCode.UNEXPECTED_TOKEN, "should be unary expression or conditional expression")
 
         node = AssignmentExpression()
-        expr = self.conditional_expression()
-        if isinstance(expr.condition_expr, BinaryOp):
-            # 含双目运算符, 必为 conditional expression
-            node.update(expr=expr)
-        elif isinstance(expr.condition_expr, CastExpression):
-            # CastExpression 含 type_names 必为 conditional expression
-            if len(expr.condition_expr.type_names) != 0:
-                node.update(expr=expr)
-            else:
-                # 纯 unary expression
-                node.update(expr=expr)
-                if self.current_token.type in self.cfirst_set.assignment_operator:
-                    # 有赋值运算符, 是产生式A
-                    node.update(assign_op=self.assignment_operator())
-                    node.update(assignment_expr=self.assignment_expression())
-        else:
+        expr = yield from self._conditional_expression()
+        if not isinstance(expr.condition_expr, (BinaryOp, CastExpression)):
             self.error(ErrorCode.UNEXPECTED_TOKEN, "should be conditional expr or unary expr")
-
+        node.update(expr=expr)
         return node
 
+    def _assignment_operator(self, node: AssignmentExpression):
+        # 含双目运算符或 CastExpression 含 type_names 必为 conditional expression
+        condition_expr = node.expr.condition_expr
+        if isinstance(condition_expr, BinaryOp) or len(condition_expr.type_names) != 0:
+            return None
+        # 纯 unary expression, 有赋值运算符, 是产生式A
+        if self.current_token.type not in self.cfirst_set.assignment_operator:
+            return None
+        node.update(assign_op=self.assignment_operator())
+        return "assignment_expr"
+
     def assignment_operator(self):
         """
         <assignment-operator> ::= "="
@@ -1272,7 +1286,7 @@ class CParser(Parser):
             node.update(id=self.get_identifier())
             delete_ast_type(node.id, CSS.MACRO_DEFINE)
             add_ast_type(node.id, CSS.ENUM_ID)
-            GDT.register_id(node.id.id, CSS.ENUM_ID)
+            self.gdt.register_id(node.id.id, CSS.ENUM_ID)
         if self.current_token.type == TokenType.LCURLY_BRACE:
             node.register_token(self.eat(TokenType.LCURLY_BRACE))
             enumerators = [self.enumerator()]
@@ -1306,7 +1320,7 @@ class CParser(Parser):
         node = Enumerator()
         node.update(id=self.get_identifier())
         add_ast_type(node.id, CSS.ENUMERATOR)
-        GDT.register_id(node.id.id, CSS.ENUMERATOR)
+        self.gdt.register_id(node.id.id, CSS.ENUMERATOR)
         if self.current_token.type == TokenType.ASSIGN:
             node.register_token(self.eat(TokenType.ASSIGN))
             node.update(const_expr=self.constant_expression())
@@ -1365,7 +1379,7 @@ class CParser(Parser):
                         declarator_id = self._find_declaractor_id(init_declarator.declarator.direct_declarator)
                         declarator_id._tokens[0].type = CTokenType.TYPEDEF_ID
                         add_ast_type(declarator_id, CSS.TYPEDEF)
-                        GDT.register_id(declarator_id.id, CSS.TYPEDEF)
+                        self.gdt.register_id(declarator_id.id, CSS.TYPEDEF)
 
                 return node
             elif self._is_C_function(init_declarator_list) and (
@@ -1612,7 +1626,7 @@ class CParser(Parser):
             node.update(id=self.get_identifier())
             # goto 的标签
             add_ast_type(node.id, C_CSS.GOTO_LABEL)
-            GDT.register_id(node.id.id, C_CSS.GOTO_LABEL)
+            self.gdt.register_id(node.id.id, C_CSS.GOTO_LABEL)
         elif self.current_token.type == CTokenType.CASE:
             node.update(keyword=self.get_keyword(CTokenType.CASE))
             node.update(const_expr=self.constant_expression())
@@ -1794,12 +1808,12 @@ class CParser(Parser):
         node.register_token(self.eat(TokenType.ID))
 
         # 判断一下 ID 的 class_name
-        if token_value in GDT:
-            add_ast_type(node, GDT[token_value])
+        if token_value in self.gdt:
+            add_ast_type(node, self.gdt[token_value])
         elif bool(re.match(r"^[A-Z0-9_]+$", token_value)):
             # ID 全部为 大写/数字/下划线, 很可能为宏
             add_ast_type(node, CSS.MACRO_DEFINE)
-            GDT.register_id(node.id, CSS.MACRO_DEFINE)
+            self.gdt.register_id(node.id, CSS.MACRO_DEFINE)
 
         return node
 
@@ -1828,7 +1842,8 @@ class CParser(Parser):
         self._end_preprocessing()
 
         # 添加至 sub_roots
-        self.sub_roots.append(node)
+        if self.build_ast:
+            self.sub_roots.append(node)
         return node
 
     def _begin_preprocessing(self):
@@ -1836,16 +1851,14 @@ class CParser(Parser):
         开始预处理
         """
         # 考虑换行
-        if TokenType.LF.value in self.lexer.invisible_characters:
-            self.lexer.invisible_characters.remove(TokenType.LF.value)
+        self.lexer.invisible_characters = self.lexer.invisible_characters - {TokenType.LF.value}
         self.in_preprocessing = True
 
     def _end_preprocessing(self):
         """
         终止预处理
         """
-        if TokenType.LF.value not in self.lexer.invisible_characters:
-            self.lexer.invisible_characters.append(TokenType.LF.value)
+        self.lexer.invisible_characters = self.lexer.invisible_characters | {TokenType.LF.value}
         self.in_preprocessing = False
         if self.current_token.type == CTokenType.IF_P:
             self.current_token.type = CTokenType.IF
@@ -1911,7 +1924,7 @@ class CParser(Parser):
             node.update(keyword=self.get_keyword(css_type=CSS.PREPROCESS))
             node.update(id=self.get_identifier())
             add_ast_type(node.id, CSS.MACRO_DEFINE)
-            GDT.register_id(node.id.id, CSS.MACRO_DEFINE)
+            self.gdt.register_id(node.id.id, CSS.MACRO_DEFINE)
         else:
             self.error(ErrorCode.UNEXPECTED_TOKEN, "should be if ifdef ifndef")
         self.eat_lf()
@@ -1981,9 +1994,7 @@ class CParser(Parser):
             # define A(a,b) 1
             # define A (a,b)
             #
-            # 这里禁用skip_space和skip_invisible_characters以单步匹配下一个 token
-            self.skip_space = False
-            self.skip_invis_chars = False
+            # 空格不生成 token, 根据 token 在原文中的位置判断
 
             # token 第一个 token 可能在 after_eat 中被标记为 TYPEDEF_ID, define 匹配时需要恢复
             # #define ____cacheline_aligned_in_smp ____cacheline_aligned
@@ -1991,10 +2002,9 @@ class CParser(Parser):
             if self.current_token.type == CTokenType.TYPEDEF_ID:
                 self.current_token.type = TokenType.ID
 
+            id_index = len(self.token_list)
             node.update(id=self.get_identifier())
-            self.skip_invis_chars = True
-            self.skip_space = True
-            if self.current_token.type == TokenType.LPAREN:
+            if self.current_token.type == TokenType.LPAREN and self._no_gap_since(id_index):
                 # 有 () 说明是宏函数定义
                 node.register_token(self.eat(TokenType.LPAREN))
                 if self.current_token.type in self.cfirst_set.identifier_list:
@@ -2034,11 +2044,14 @@ class CParser(Parser):
                 arguments = []
                 for i_node in node.parameters:
                     arguments.append(FuncArgument(name=i_node.id, type=None))
-                GDT.register_function(node.id.id, arguments, (), CSS.MACRO_FUNCTION)
+                self.gdt.register_function(node.id.id, arguments, (), CSS.MACRO_FUNCTION)
             else:
                 # 常规宏定义变量
                 add_ast_type(node.id, CSS.MACRO_DEFINE)
-                GDT.register_id(node.id.id, CSS.MACRO_DEFINE)
+                self.gdt.register_id(node.id.id, CSS.MACRO_DEFINE)
+            if node.keyword.name == "undef":
+                # 之后不再作为宏, 同时遮盖 prelude 中的同名 id
+                self.gdt.delete_id(node.id.id)
 
         self.eat_lf()
         self._end_preprocessing()
@@ -2069,6 +2082,18 @@ class CParser(Parser):
             node.register_token(self.eat())
             return node
 
+    def _no_gap_since(self, index: int) -> bool:
+        """
+        token_list[index:] 与 current_token 在原文中是否首尾相连, 中间没有空白
+        """
+        end = None
+        for token in self.token_list[index:] + [self.current_token]:
+            span = token.source_span(self.lexer.line_index)
+            if span is None or (end is not None and span[0] != end):
+                return False
+            end = span[1]
+        return True
+
     def header_name(self):
         """
         < h-char-sequence >
@@ -2143,22 +2168,20 @@ class CParser(Parser):
         https://github.com/luzhixing12345/syntaxlight/issues/12
         test/c/45.c
         """
-        next_token_types = [TokenType.ID, TokenType.MUL]
-
         if self.current_token.type == TokenType.ID:
-            next_token_type = self.peek_next_token().type
-            if always_match or next_token_type in next_token_types:
+            # always_match 时不需要向后查看
+            if always_match or self.peek_next_token().type in (TokenType.ID, TokenType.MUL):
                 self.current_token.type = CTokenType.TYPEDEF_ID
-                GDT.register_id(self.current_token.value, CSS.TYPEDEF)
+                self.gdt.register_id(self.current_token.value, CSS.TYPEDEF)
 
     def _is_macro(self):
         return re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', self.current_token.value) or self._is_macro_def() or self._is_macro_func()
 
     def _is_macro_def(self):
-        return self.current_token.type in [TokenType.ID, CTokenType.TYPEDEF_ID] and CSS.MACRO_DEFINE.value in self.current_token.class_list
+        return self.current_token.type in [TokenType.ID, CTokenType.TYPEDEF_ID] and CSS.MACRO_DEFINE.value in self.current_token.classes
         
     def _is_macro_func(self):
-        return self.current_token.type in [TokenType.ID, CTokenType.TYPEDEF_ID] and CSS.MACRO_FUNCTION.value in self.current_token.class_list
+        return self.current_token.type in [TokenType.ID, CTokenType.TYPEDEF_ID] and CSS.MACRO_FUNCTION.value in self.current_token.classes
 
     def _skip_macro_def(self):
         """
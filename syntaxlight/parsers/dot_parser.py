@@ -12,9 +12,7 @@ class DotCSS(Enum):
 
 
 class DotParser(Parser):
-    def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
-        super().__init__(lexer, skip_invis_chars, skip_space)
-        self.first_set = DotTokenSet()
+    first_set = DotTokenSet()
 
     def parse(self):
         self.root = self.graph()
@@ -40,15 +38,17 @@ class DotParser(Parser):
 
         node.register_token(self.eat(token_type=TokenType.LCURLY_BRACE))
         if self.current_token.type in self.first_set.stmt_list:
-            node.update(stmt_list=self.stmt_list())
+            node.update(stmt_list=self.run_nested(self.stmt_list()))
         node.register_token(self.eat(token_type=TokenType.RCURLY_BRACE))
         return node
 
     def stmt_list(self):
         """
         <stmt_list> ::= <stmt> (';' <stmt>)* ';'?
+
+        stmt_list/stmt/edge_stmt/edgeRHS/subgraph 可以互相嵌套, 都是由 run_nested 运行的生成器
         """
-        result = [self.stmt()]
+        result = [(yield self.stmt())]
 
         while self.current_token.type in (TokenType.SEMI, self.first_set.stmt):
             if self.current_token.type == TokenType.SEMI:
@@ -56,9 +56,9 @@ class DotParser(Parser):
                 if self.current_token.type not in self.first_set.stmt:
                     break
                 else:
-                    result.append(self.stmt())
+                    result.append((yield self.stmt()))
             else:
-                result.append(self.stmt())
+                result.append((yield self.stmt()))
 
         return result
 
@@ -89,7 +89,7 @@ class DotParser(Parser):
             else:
                 sub_node = self.node_id()
                 if self.current_token.type in self.first_set.edgeop:
-                    node.update(edge_stmt=self.edge_stmt(sub_node))
+                    node.update(edge_stmt=(yield self.edge_stmt(sub_node)))
                 else:
                     node.update(node_stmt=self.node_stmt(sub_node))
 
@@ -103,9 +103,9 @@ class DotParser(Parser):
             # <edge_stmt> ::= (<node_id> | <subgraph>) <edgeRHS> <attr_list>?
             # ----------------------
             # <stmt> ::=<subgraph>
-            sub_node = self.subgraph()
+            sub_node = yield self.subgraph()
             if self.current_token.type in self.first_set.edgeop:
-                node.update(edge_stmt=self.edge_stmt(sub_node))
+                node.update(edge_stmt=(yield self.edge_stmt(sub_node)))
             else:
                 node = sub_node
 
@@ -162,7 +162,7 @@ class DotParser(Parser):
         else:
             # SubGraph
             node.update(subgraph=sub_node)
-        node.update(edgeRHS=self.edgeRHS())
+        node.update(edgeRHS=(yield self.edgeRHS()))
         if self.current_token.type == TokenType.LSQUAR_PAREN:
             node.update(attr_list=self.attr_list())
         return node
@@ -180,7 +180,7 @@ class DotParser(Parser):
             if self.current_token.type == TokenType.ID:
                 node.update(node_id=self.node_id())
             else:
-                node.update(subgraph=self.subgraph())
+                node.update(subgraph=(yield self.subgraph()))
             result.append(node)
         return result
 
@@ -227,7 +227,7 @@ class DotParser(Parser):
             if self.current_token.type == TokenType.ID:
                 node.update(id=self.get_identifier())
         node.register_token(self.eat(token_type=TokenType.LCURLY_BRACE))
-        node.update(stmt_list=self.stmt_list())
+        node.update(stmt_list=(yield self.stmt_list()))
         node.register_token(self.eat(token_type=TokenType.RCURLY_BRACE))
         return node
 
@@ -1,24 +1,24 @@
 from .parser import Parser
-from ..lexers import TokenType, JsonTokenType
+from ..lexers import TokenType, TokenSet, JsonTokenType
 from ..error import ErrorCode
 from ..asts.ast import Object, Array, Pair, String, Number, Keyword, UnaryOp
 
 
 class JsonParser(Parser):
+    value_first_set = TokenSet(
+        TokenType.STRING,
+        TokenType.MINUS,
+        TokenType.NUMBER,
+        TokenType.LSQUAR_PAREN,
+        TokenType.LCURLY_BRACE,
+        JsonTokenType.TRUE,
+        JsonTokenType.FALSE,
+        JsonTokenType.NULL,
+    )
+
     def __init__(self, lexer):
         super().__init__(lexer)
 
-        self.value_first_set = [
-            TokenType.STRING,
-            TokenType.MINUS,
-            TokenType.NUMBER,
-            TokenType.LSQUAR_PAREN,
-            TokenType.LCURLY_BRACE,
-            JsonTokenType.TRUE,
-            JsonTokenType.FALSE,
-            JsonTokenType.NULL,
-        ]
-
     def parse(self):
         self.root = self.json()
         if self.current_token.type != TokenType.EOF:
@@ -32,15 +32,17 @@ class JsonParser(Parser):
                  | <Array>
         """
         if self.current_token.type == TokenType.LCURLY_BRACE:
-            return self.object()
+            return self.run_nested(self.object())
         elif self.current_token.type == TokenType.LSQUAR_PAREN:
-            return self.array()
+            return self.run_nested(self.array())
         else:
             self.error(ErrorCode.UNEXPECTED_TOKEN, message="should be object or array")
 
     def object(self):
         """
         <Object> ::= '{' <Pair>? ( ',' <Pair> )* '}'
+
+        object/array/pair/value 可以互相嵌套, 都是由 run_nested 运行的生成器
         """
 
         node = Object()
@@ -48,7 +50,7 @@ class JsonParser(Parser):
 
         pairs = []
         if self.current_token.type == TokenType.STRING:
-            pairs.append(self.pair())
+            pairs.append((yield self.pair()))
             while self.current_token.type == TokenType.COMMA:
                 comma = self.current_token
                 node.register_token(self.eat(TokenType.COMMA))
@@ -58,7 +60,7 @@ class JsonParser(Parser):
                 # }                             trailing comma
                 if self.current_token.type == TokenType.RCURLY_BRACE:
                     self.error(ErrorCode.TRAILING_COMMA, token=comma, message='should not be a trailing comma')
-                pairs.append(self.pair())
+                pairs.append((yield self.pair()))
 
             # { pair1   pair2}
             #         |
@@ -79,13 +81,13 @@ class JsonParser(Parser):
 
         elements = []
         if self.current_token.type in self.value_first_set:
-            elements.append(self.value())
+            elements.append((yield self.value()))
             while self.current_token.type == TokenType.COMMA:
                 comma = self.current_token
                 node.register_token(self.eat(TokenType.COMMA))
                 if self.current_token.type == TokenType.RSQUAR_PAREN:
                     self.error(ErrorCode.TRAILING_COMMA, token=comma, message='should not be a trailing comma')
-                elements.append(self.value())
+                elements.append((yield self.value()))
 
             if self.current_token.type != TokenType.RSQUAR_PAREN:
                 self.error(ErrorCode.MISS_EXPECTED_TOKEN, message=TokenType.COMMA.value)
@@ -105,7 +107,7 @@ class JsonParser(Parser):
 
         node.update(key=key)
         node.register_token(self.eat(TokenType.COLON))
-        node.update(value=self.value())
+        node.update(value=(yield self.value()))
         return node
 
     def value(self):
@@ -150,9 +152,9 @@ class JsonParser(Parser):
             return node
 
         if self.current_token.type == TokenType.LCURLY_BRACE:
-            return self.object()
+            return (yield self.object())
 
         if self.current_token.type in self.value_first_set:
-            return self.array()
+            return (yield self.array())
 
         # should never arrive here
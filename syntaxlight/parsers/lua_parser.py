@@ -14,9 +14,7 @@ class LuaCSS(Enum):
 
 
 class LuaParser(Parser):
-    def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
-        super().__init__(lexer, skip_invis_chars, skip_space)
-        self.luafirst_set = LuaTokenSet()
+    luafirst_set = LuaTokenSet()
 
     def parse(self):
         self.root = self.chunk()
@@ -265,12 +263,18 @@ class LuaParser(Parser):
 
         <functioncall> ::= <prefixexp> (':' <ID>)? <args>
         """
+        return self.run_nested(self._var())
+
+    def _var(self):
+        """
+        var/prefixexp/exp 可以互相嵌套, 都是由 run_nested 运行的生成器, 见 exp
+        """
         node = Variable()
         if self.current_token.type == TokenType.ID:
             node.update(id=self.get_identifier())
         elif self.current_token.type == TokenType.LPAREN:
             node.register_token(self.eat(TokenType.LPAREN))
-            node.update(exp=self.exp())
+            node.update(exp=(yield self._exp()))
             node.register_token(self.eat(TokenType.RPAREN))
         else:  # pragma: no cover
             self.error(ErrorCode.UNEXPECTED_TOKEN, "error in var, should be id or (")
@@ -288,7 +292,7 @@ class LuaParser(Parser):
             sub_node = VarSuffix()
             if self.current_token.type == TokenType.LSQUAR_PAREN:
                 sub_node.register_token(self.eat(TokenType.LSQUAR_PAREN))
-                sub_node.update(exp=self.exp())
+                sub_node.update(exp=(yield self._exp()))
                 sub_node.register_token(self.eat(TokenType.RSQUAR_PAREN))
                 sub_node.suffix_type = VarSuffixType.INDEX_ID
 
@@ -383,7 +387,16 @@ class LuaParser(Parser):
                 | <tableconstructor>
                 | <exp> <binop> <exp>
                 | <unop> <exp>
+
+        不区分运算符优先级, <exp> <binop> <exp> 按右递归匹配, 见 Parser.chain_expression.
+        括号和单目运算符中嵌套的 exp 由 run_nested 运行, 嵌套层数不受递归深度限制
         """
+        return self.run_nested(self._exp())
+
+    def _exp(self):
+        return self.chain_expression(self._exp_operand, self._exp_operator)
+
+    def _exp_operand(self):
         if self.current_token.type in (LuaTokenType.NIL, LuaTokenType.FALSE, LuaTokenType.TRUE):
             node = self.get_keyword()
         elif self.current_token.type == TokenType.NUMBER:
@@ -402,30 +415,31 @@ class LuaParser(Parser):
             node.update(functiondef=self.functiondef())
         elif self.current_token.type in self.luafirst_set.prefixexp:
             node = Expression()
-            node.update(prefixexp=self.prefixexp())
+            node.update(prefixexp=(yield from self.prefixexp()))
         elif self.current_token.type in self.luafirst_set.tableconstructor:
             node = Expression()
             node.update(tableconstructor=self.tableconstructor())
         elif self.current_token.type in self.luafirst_set.unop:
             node = Expression()
             node.update(unop=self.unop())
-            node.update(exp=self.exp())
+            node.update(exp=(yield self._exp()))
         else:  # pragma: no cover
             self.error(ErrorCode.UNEXPECTED_TOKEN, "error in exp")
-
-        if self.current_token.type in self.luafirst_set.binop:
-            node.update(binop=self.binop())
-            node.update(next_exp=self.exp())
-
         return node
 
+    def _exp_operator(self, node: AST):
+        if self.current_token.type not in self.luafirst_set.binop:
+            return None
+        node.update(binop=self.binop())
+        return "next_exp"
+
     def prefixexp(self):
         """
         <prefixexp> ::= <var>
                       | <functioncall>
                       | '(' <exp> ')'
         """
-        node = self.var()
+        node = yield from self._var()
         self._is_functioncall(node)
         return node
 
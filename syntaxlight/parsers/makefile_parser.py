@@ -13,6 +13,9 @@ class MakefileCSS(Enum):
 
 
 class MakefileParser(Parser):
+    # 通过 token_list 中相邻的 token 判断 include/函数, 需要保留所有空白 token
+    gap_characters = frozenset()
+
     def __init__(self, lexer, skip_invis_chars=False, skip_space=True):
         super().__init__(lexer, skip_invis_chars, skip_space)
 
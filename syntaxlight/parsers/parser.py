@@ -1,35 +1,97 @@
-from ..lexers.lexer import Lexer, Token, TokenType
+from ..lexers.lexer import Lexer, Token, TokenType, INVISIBLE_CHARACTERS
 from ..error import ParserError, ErrorCode, ttyinfo, TTYColor
 from enum import Enum
-from ..asts.ast import AST, Keyword, add_ast_type, Identifier, Punctuator, WrapString, Number, String
-from typing import List, Callable, Union, Tuple
+from ..asts.ast import (
+    AST,
+    Keyword,
+    add_ast_type,
+    resolve_ast_types,
+    Identifier,
+    Punctuator,
+    WrapString,
+    Number,
+    String,
+    BinaryOp,
+)
+from typing import List, Callable, Union, Tuple, Deque, Optional, Dict, Collection, Generator, TypeVar, Hashable, FrozenSet, Iterator, TextIO
+from collections import deque
 import sys
 import html
 import traceback
 import re
-from ..gdt import CSS
+from ..gdt import CSS, GlobalDescriptorTable
+from ..context import ParseContext
 from ..token import TokenSet
+from ..token_stream import TokenStream
+from ..stylesheet import style_key, class_alias, resolved_style, prune_class, UsedClasses
+
+T = TypeVar("T")
 
 
 DEBUG = False
 # DEBUG = True
 
+# html.escape 会转义的字符, 大部分 token (关键字, 运算符, 标识符) 不包含这些字符, 不需要转义
+HTML_SPECIAL_CHARACTERS = frozenset("&<>\"'")
+# 以前空白也会生成 token: 连续的空格为一个 SPACE token, 其他空白字符各为一个 token.
+# highlight_tokens 仍然按照这种方式为 gap 中的空白编号, 见 Parser.iter_html
+GAP_TOKEN_PATTERN = re.compile(" +|[%s]" % re.escape("".join(sorted(INVISIBLE_CHARACTERS))))
+
+
+def escape_html(value: str) -> str:
+    if HTML_SPECIAL_CHARACTERS.isdisjoint(value):
+        return value
+    return html.escape(value)
+
+
+def operator_precedence(*levels: Collection[Enum]) -> Dict[Enum, int]:
+    """
+    由低到高每一层的运算符 token 类型 -> {token 类型: 所在的层}, 用于 Parser.binary_expression
+    """
+    return {token_type: level for level, token_types in enumerate(levels) for token_type in token_types}
+
 
 class Parser:
+    # 每次解析开始时 GDT 中预先注册的 (名称, 类型)
+    default_descriptors: List[Tuple[str, Enum]] = None
+    # lexer 不为这些空白字符生成 token, 它们只作为 token 之间的间隔 (gap) 保留在原文中, 由 to_html 补回.
+    # 需要看到换行/空格的 parser (例如 TOML 的换行) 从中去掉对应的字符, 见 Lexer.set_gap_characters
+    gap_characters: FrozenSet[str] = frozenset(" ") | INVISIBLE_CHARACTERS
+    # 代码语言, 由 get_parser 设置, 用于查找 css/<language>.css
+    language: str = None
+
     def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
         self.lexer: Lexer = lexer
+        self.lexer.set_gap_characters(self.gap_characters)
+        # 本次解析的所有可变状态, 不与其他 parser 共享
+        self.context = ParseContext(self.default_descriptors)
         self.skip_invis_chars = skip_invis_chars
         self.skip_space = skip_space
 
-        self.current_token: Token = self.lexer.get_next_token()
+        # 已经由 lexer 解析但尚未被 eat 的 token, 由 peek_next_token 填充
+        # 缓冲区长度不超过 peek 的最远距离, 每个 token 只会被 lexer 解析一次
+        self._lookahead: Deque[Token] = deque()
+        self.token_position = -1  # current_token 是 lexer 解析出的第几个 token, 从 0 开始
+        self.current_token: Token = self._next_token()
 
-        self.token_list: List[Token] = []  # lexer 解析后经过 parser 确定类型后的 tokens
+        self.token_list: Union[List[Token], TokenStream] = []  # lexer 解析后经过 parser 确定类型后的 tokens
         self.status_stack = []  # 状态栈
         self.root: AST = None  # 主根节点
         self.sub_roots: List[AST] = []  # 其他根节点, 例如预处理命令
 
         self._skip()
 
+    @property
+    def gdt(self) -> GlobalDescriptorTable:
+        return self.context.gdt
+
+    @property
+    def build_ast(self) -> bool:
+        """
+        为 False 时只为 token 添加类名, 顶层节点解析完成后不再保留, 见 syntax_parse.parse
+        """
+        return self.context.build_ast
+
     def error(
         self,
         error_code: ErrorCode,
@@ -67,6 +129,8 @@ class Parser:
         匹配一个 token_type 类型的 token, 并获取下一个 token 更新 current_token
 
         token_type 默认值为 None, 表示匹配当前 current_token.type
+
+        返回 token_list 中本次注册的一段, 即匹配的 token 及其后被跳过的空白和注释
         """
         # print(token_type, self.current_token)
         # traceback.print_exc()
@@ -75,11 +139,15 @@ class Parser:
         #     frame = inspect.currentframe().f_back
         #     lineno = frame.f_lineno
         #     print(f"The 'eat' method was called from line {lineno}.")
-        tokens = [self.current_token]
-        if token_type is None or self.current_token.type == token_type:
-            self._register_token()
-            self.current_token = self.lexer.get_next_token()
-            tokens.extend(self._skip())
+        token = self.current_token
+        if token_type is None or token.type == token_type:
+            token_list = self.token_list
+            start = len(token_list)
+            token_list.append(token)
+            self.current_token = self._next_token()
+            self._skip()
+            # after_eat 可能继续注册 token (例如 C 的预处理命令), 需要在此之前截取
+            tokens = token_list[start:]
             self.after_eat()
             return tokens
         else:
@@ -95,7 +163,7 @@ class Parser:
         """
         正常情况下调用 eat 获取下一个 token, 如果需要合并多个 token 并生成一个新的 token 时可调用此函数
         """
-        self.current_token = self.lexer.get_next_token()
+        self.current_token = self._next_token()
         self._skip()
         self.after_eat()
 
@@ -113,40 +181,23 @@ class Parser:
         """
         return
 
-    def _skip(self) -> List[Token]:
-        """
-        跳过不可见字符和空格
-
-        由 self.skip_invis_chars 与 self.skip_space 控制
-        """
-        tokens = []
-        if self.skip_invis_chars and self.skip_space:
-            while (
-                self.current_token.value in self.lexer.invisible_characters
-                or self.current_token.type == TokenType.SPACE
-            ):
-                self._register_token()
-                tokens.append(self.current_token)
-                self.current_token = self.lexer.get_next_token()
-
-        elif self.skip_invis_chars and not self.skip_space:
-            while self.current_token.value in self.lexer.invisible_characters:
-                self._register_token()
-                tokens.append(self.current_token)
-                self.current_token = self.lexer.get_next_token()
-        elif not self.skip_invis_chars and self.skip_space:
-            while self.current_token.type == TokenType.SPACE:
-                self._register_token()
-                tokens.append(self.current_token)
-                self.current_token = self.lexer.get_next_token()
-
-        if self.current_token.type == TokenType.COMMENT:
-            self._register_token()
-            tokens.append(self.current_token)
-            self.current_token = self.lexer.get_next_token()
-            tokens.extend(self._skip())
-
-        return tokens
+    def _skip(self):
+        """
+        跳过不可见字符, 空格和注释, 并注册到 token_list 当中
+
+        由 self.skip_invis_chars 与 self.skip_space 控制, 规则与 _is_skippable 一致.
+        连续的注释和空白在同一个循环中处理, 不随其长度递归
+        """
+        token = self.current_token
+        skip_space = self.skip_space
+        invisible_characters = self.lexer.invisible_characters if self.skip_invis_chars else ()
+        while (
+            token.type == TokenType.COMMENT
+            or (skip_space and token.type == TokenType.SPACE)
+            or token.value in invisible_characters
+        ):
+            self.token_list.append(token)
+            token = self.current_token = self._next_token()
 
     def skip_crlf(self):
         """
@@ -169,23 +220,87 @@ class Parser:
 
     def peek_next_token(self, n=1) -> Token:
         """
-        查看下一个 token 的类型
+        查看后面第 n 个有效 token
+
+        token 只会被 lexer 解析一次并缓存在 _lookahead 中, peek 不会调用 eat/after_eat, 没有副作用.
+        返回值经过 classify_lookahead_token 修正类型, 仅用于判断, 不应被修改
+        """
+        if self.context.packrat_window:
+            # 同一位置向后查看的有效 token 下标只计算一次, 依次 peek(1), peek(2) ... peek(n) 的总代价为 O(n)
+            # 跳过哪些 token 由 skip_invis_chars/skip_space 和 lexer.invisible_characters 决定, 一并作为键
+            # (例如 C 预处理时 invisible_characters 中不包含换行)
+            rule = ("peek", self.skip_invis_chars, self.skip_space, self.lexer.invisible_characters)
+            indexes: List[int] = self.memoize(rule, list)
+            while len(indexes) < n:
+                indexes.append(self._lookahead_index(indexes[-1] + 1 if indexes else 0))
+            index = indexes[n - 1]
+        else:
+            index = -1
+            for _ in range(n):
+                index = self._lookahead_index(index + 1)
+        return self.classify_lookahead_token(self._lookahead[index], index)
+
+    def classify_lookahead_token(self, token: Token, index: int) -> Token:
+        """
+        peek_next_token 返回前的类型修正, 默认直接返回缓冲区中的 token
+
+        如果继承类在 after_eat 中修改了 current_token 的类型, 应在此处给出相同的判断结果,
+        但不能修改 token 本身或 parser 的状态, 需要时返回一个新的 Token. index 为 token 在缓冲区中的下标
+        """
+        return token
+
+    def _next_token(self) -> Token:
+        """
+        获取下一个 token, 优先从 lookahead 缓冲区中取
+        """
+        self.token_position += 1
+        if self._lookahead:
+            return self._lookahead.popleft()
+        return self.lexer.get_next_token()
+
+    def _lookahead_index(self, index: int) -> int:
+        """
+        从缓冲区下标 index 开始(包含)跳过空白和注释, 返回下一个有效 token 的下标
+
+        跳过规则与 _skip 一致
+        """
+        while True:
+            while len(self._lookahead) <= index:
+                self._lookahead.append(self.lexer.get_next_token())
+            token = self._lookahead[index]
+            if token.type == TokenType.EOF or not self._is_skippable(token):
+                return index
+            index += 1
+
+    def memoize(self, rule: Hashable, match: Callable[[], T]) -> T:
         """
-        # 保存程序状态
-        self.lexer._record()
-        token_list_length = len(self.token_list)
-        sub_roots_length = len(self.sub_roots)
-        current_token = self.current_token
+        packrat: 以 (rule, token_position) 为键缓存 match() 的结果, 同一位置再次判断时直接返回
 
-        for _ in range(n):
-            self.eat()
-        next_token = self.current_token
+        用于只向后查看而不 eat 的判断 (例如强制类型转换), 缓存的结果不应依赖于此后才会修改的状态.
+        默认不缓存, 由 parse(packrat_window=...) 开启, 只保留当前位置之前 packrat_window 个 token 以内的结果
+        """
+        window = self.context.packrat_window
+        if not window:
+            return match()
+        memo = self.context.packrat_memo
+        key = (rule, self.token_position)
+        if key in memo:
+            return memo[key]
+        result = memo[key] = match()
+        # token_position 只增不减, 最早插入的就是最早的位置
+        while next(iter(memo))[1] < self.token_position - window:
+            memo.popitem(last=False)
+        return result
 
-        self.lexer._reset()
-        self.token_list = self.token_list[:token_list_length]
-        self.sub_roots = self.sub_roots[:sub_roots_length]
-        self.current_token = current_token
-        return next_token
+    def _is_skippable(self, token: Token) -> bool:
+        """
+        token 是否会被 _skip 跳过
+        """
+        if token.type == TokenType.COMMENT:
+            return True
+        if self.skip_space and token.type == TokenType.SPACE:
+            return True
+        return self.skip_invis_chars and token.value in self.lexer.invisible_characters
 
     def _register_token(self, token=None):
         """
@@ -198,9 +313,104 @@ class Parser:
         # print(token)
         self.token_list.append(token)
 
-    def to_html(self, highlight_lines: List[int] = [], highlight_tokens: List[int] = []):
+    def resolve_ast_types(self):
+        """
+        解析完成后统一处理 add_ast_type / delete_ast_type 记录的类名, 并去除 token 中重复的类名
+        """
+        with self.context:
+            resolve_ast_types()
+        for token in self.token_list:
+            token.unique_class()
+
+    def compact_token_list(self):
+        """
+        解析完成后将 token_list 转换为按列存储的 TokenStream, 释放 token 对象以节省内存
+
+        之后 brace_matching / to_html 直接运行在 TokenStream 上
+        """
+        if not isinstance(self.token_list, TokenStream):
+            self.token_list = TokenStream.from_tokens(self.lexer.text, self.token_list, self.lexer.line_index)
+
+    def to_html(
+        self,
+        highlight_lines: List[int] = [],
+        highlight_tokens: List[int] = [],
+        merge_spans: bool = False,
+        minify: bool = False,
+        inline_style: str = None,
+        used_classes: UsedClasses = None,
+        prune_classes: bool = False,
+    ):
         """
         将一个解析完成的 AST node 输出其 token 流的 HTML 格式
+
+        merge_spans 为 True 时相邻的显示效果相同 (匹配的 css 规则相同) 的 token 合并到第一个 token 的 span 中,
+        空白 token 不再单独包裹 span. 没有 language 对应的 css 时只合并 class 完全相同的 token
+
+        minify 为 True 时 class 替换为简写 (例如 "a5 a7"), 需要配合 export_css(minify=True) 导出的 css 使用
+
+        highlight_tokens 为要高亮的 token 的编号. 空白不再生成 token, 但仍然按照以前的方式编号 (连续的空格为一个 token,
+        其他空白字符各为一个 token), 因此编号与以前的版本一致, 编号对应的空白包裹在 class 为 "Token HighlightToken" 的 span 中
+
+        inline_style 为主题名 (例如 "vscode") 时不输出 class, 而是输出该主题下计算好的 style 属性, 不需要外部 css
+
+        used_classes 不为 None 时记录输出的所有 span 的 class, 用于 export_used_css 导出只包含用到的规则的 css
+
+        prune_classes 为 True 时只输出 language 的 css 选择器中出现过的 class, 显示效果不变
+        """
+        return "".join(
+            self.iter_html(
+                highlight_lines,
+                highlight_tokens,
+                merge_spans=merge_spans,
+                minify=minify,
+                inline_style=inline_style,
+                used_classes=used_classes,
+                prune_classes=prune_classes,
+            )
+        )
+
+    def write_html(
+        self,
+        sink: TextIO,
+        highlight_lines: List[int] = [],
+        highlight_tokens: List[int] = [],
+        merge_spans: bool = False,
+        minify: bool = False,
+        inline_style: str = None,
+        used_classes: UsedClasses = None,
+        prune_classes: bool = False,
+    ):
+        """
+        将 HTML 分段写入 sink, sink 可以是文件, io.StringIO 等任何有 write 方法的对象
+        """
+        write = sink.write
+        for chunk in self.iter_html(
+            highlight_lines,
+            highlight_tokens,
+            merge_spans=merge_spans,
+            minify=minify,
+            inline_style=inline_style,
+            used_classes=used_classes,
+            prune_classes=prune_classes,
+        ):
+            write(chunk)
+
+    def iter_html(
+        self,
+        highlight_lines: List[int] = [],
+        highlight_tokens: List[int] = [],
+        chunk_tokens: int = 1024,
+        merge_spans: bool = False,
+        minify: bool = False,
+        inline_style: str = None,
+        used_classes: UsedClasses = None,
+        prune_classes: bool = False,
+    ) -> Iterator[str]:
+        """
+        逐段生成 HTML, 大约每 chunk_tokens 个 token 生成一段, 可以直接作为 WSGI/ASGI 的响应体
+
+        第一段在渲染完前 chunk_tokens 个 token 后就会生成, 不需要等待全部 token 渲染完成
         """
         # 对于括号的后处理
         self.brace_matching()
@@ -209,14 +419,216 @@ class Parser:
         while len(self.token_list) > 0 and self.token_list[-1].type in (TokenType.CR, TokenType.LF, TokenType.SPACE):
             self.token_list.pop()
 
-        html_str = ""
-        for i, token in enumerate(self.token_list):
-            if token.line in highlight_lines:
+        line_index = self.lexer.line_index
+        text = line_index.text
+        highlight_tokens = set(highlight_tokens)
+        # 高亮行中 gap 的开始标签
+        gap_class = "Token " + CSS.HIGHLIGHT_LINE.value
+        gap_tag = self._span_tag(gap_class, minify, inline_style, prune_classes)[0]
+        if used_classes is not None and highlight_lines:
+            used_classes.add(self.language, gap_class)
+        # 高亮的 gap 中的空白的开始标签, 是否位于高亮行 -> 开始标签
+        gap_token_tags = None
+        if highlight_tokens:
+            gap_token_classes = (
+                "Token " + CSS.HIGHLIGHT_TOKEN.value,
+                "Token " + CSS.HIGHLIGHT_LINE.value + " " + CSS.HIGHLIGHT_TOKEN.value,
+            )
+            gap_token_tags = tuple(
+                self._span_tag(gap_token_class, minify, inline_style, prune_classes)[0]
+                for gap_token_class in gap_token_classes
+            )
+            if used_classes is not None:
+                for gap_token_class in gap_token_classes:
+                    used_classes.add(self.language, gap_token_class)
+        # (class 组合, token 类型) -> (<span class="..."> 开始标签, merge_spans 时判断能否合并的 key, class 字符串)
+        span_tags: Dict[tuple, Tuple[str, object, str]] = {}
+        is_safe = HTML_SPECIAL_CHARACTERS.isdisjoint
+        parts: List[str] = []
+        # 还没有输出的 gap, 等下一个 token 确定是否与前一个 token 合并后再决定放在 span 内还是 span 外
+        pending: List[str] = []
+        # merge_spans 时当前还没有闭合的 span 的开始标签和合并的 key
+        open_tag = None
+        open_key = None
+        # 上一个 token 在原文中的结束位置, 两个 token 之间的原文 (gap) 原样输出. 为 None 时不知道上一个 token 的位置
+        offset = 0
+        # 已经输出的原文的结束位置, offset 为 None 之后重新同步时不会越过此位置
+        last_end = 0
+        # 当前 token 的编号, 见 highlight_tokens
+        index = 0
+        for token in self.token_list:
+            span = token.source_span(line_index)
+            # 当前 token 之前的 gap 的结束位置
+            gap_end = None
+            if span is None:
+                if offset is not None:
+                    # parser 拆分/合并出的 token 没有记录位置, 跳过空白后与原文比较
+                    start = offset
+                    while start < len(text) and text[start] in self.gap_characters:
+                        start += 1
+                    if text.startswith(token.value, start):
+                        span = (start, start + len(token.value))
+                    else:
+                        # 无法确定位置时 token 放在紧跟着的空白之后
+                        gap_end = start
+            elif offset is None:
+                # 前面有无法确定位置的 token, 从当前 token 重新同步, 紧挨着当前 token 的空白仍然是 gap
+                offset = span[0]
+                while offset > last_end and text[offset - 1] in self.gap_characters:
+                    offset -= 1
+            if span is not None:
+                gap_end = span[0]
+            if gap_end is not None and gap_end > offset:
+                if open_tag is not None and not text[offset:gap_end].isspace():
+                    # lexer 跳过的非空白字符不能放进前一个 token 的 span 中
+                    parts.append("</span>")
+                    open_tag = None
+                if gap_token_tags is None:
+                    pending.append(self._gap_html(offset, gap_end, highlight_lines, gap_tag))
+                else:
+                    gap_html, index = self._gap_token_html(
+                        offset, gap_end, highlight_lines, gap_tag, index, highlight_tokens, gap_token_tags
+                    )
+                    pending.append(gap_html)
+            if span is not None:
+                offset = last_end = span[1]
+            elif offset is not None:
+                offset = None
+                last_end = gap_end
+            highlighted = False
+            if highlight_lines and token.line in highlight_lines:
                 token.add_css(CSS.HIGHLIGHT_LINE)
-            if i in highlight_tokens:
+                highlighted = True
+            if index in highlight_tokens:
                 token.add_css(CSS.HIGHLIGHT_TOKEN)
-            html_str += f'<span class="{token.get_css_class()}">{html.escape(token.value)}</span>'
-        return html_str
+                highlighted = True
+            index += 1
+            value = token.value
+            if merge_spans and not highlighted and value.isspace():
+                # 没有背景色的空白与 gap 一样输出为纯文本
+                pending.append(value)
+                continue
+            key = (token.classes, token.type)
+            span_info = span_tags.get(key)
+            if span_info is None:
+                css_class = token.get_css_class()
+                span_tag, declarations = self._span_tag(css_class, minify, inline_style, prune_classes)
+                merge_key = None
+                if merge_spans:
+                    # inline_style 时最终样式相同即可合并
+                    merge_key = declarations if declarations is not None else style_key(self.language, css_class)
+                if merge_key is None:
+                    merge_key = css_class
+                span_info = span_tags[key] = (span_tag, merge_key, css_class)
+            span_tag, merge_key, css_class = span_info
+            if open_tag is None or merge_key != open_key:
+                if open_tag is not None:
+                    parts.append("</span>")
+                if pending:
+                    parts.extend(pending)
+                parts.append(span_tag)
+                if used_classes is not None:
+                    used_classes.add(self.language, css_class)
+            elif pending:
+                parts.extend(pending)
+            pending.clear()
+            parts.append(value if is_safe(value) else html.escape(value))
+            if merge_spans:
+                open_tag = span_tag
+                open_key = merge_key
+            else:
+                parts.append("</span>")
+            if len(parts) >= chunk_tokens * 3:
+                yield "".join(parts)
+                parts.clear()
+        if open_tag is not None:
+            parts.append("</span>")
+        parts.extend(pending)
+        if offset is not None:
+            # 与上面剔除的 token 一致, 结尾的 tab 等其他空白字符保留
+            tail = text[offset:].rstrip(" \r\n")
+            if tail and gap_token_tags is None:
+                parts.append(self._gap_html(offset, offset + len(tail), highlight_lines, gap_tag))
+            elif tail:
+                gap_html, index = self._gap_token_html(
+                    offset, offset + len(tail), highlight_lines, gap_tag, index, highlight_tokens, gap_token_tags
+                )
+                parts.append(gap_html)
+        if parts:
+            yield "".join(parts)
+
+    def _span_tag(
+        self, css_class: str, minify: bool, inline_style: Optional[str], prune_classes: bool = False
+    ) -> Tuple[str, Optional[str]]:
+        """
+        class 为 css_class 的 span 的开始标签, 以及 inline_style 时计算出的 style 属性
+
+        inline_style 优先于 minify, minify 优先于 prune_classes, 无法计算样式或简写时使用原本的 class
+        """
+        if self.language:
+            if inline_style:
+                declarations = resolved_style(self.language, css_class, inline_style)
+                if declarations is not None:
+                    return f'<span style="{declarations}">', declarations
+            elif minify:
+                alias = class_alias(self.language, css_class)
+                if alias == "":
+                    # 只匹配 .Token 的 span, 样式来自 minified_css 中的 code span
+                    return "<span>", None
+                if alias is not None:
+                    return f'<span class="{alias}">', None
+            elif prune_classes:
+                css_class = prune_class(self.language, css_class)
+        return f'<span class="{css_class}">', None
+
+    def _gap_html(self, start: int, end: int, highlight_lines: List[int], span_tag: str) -> str:
+        """
+        原文 [start, end) 的空白, 位于 highlight_lines 中的部分与 token 一样添加 HighlightLine, 开始标签为 span_tag
+        """
+        gap = self.lexer.text[start:end]
+        if not highlight_lines:
+            return escape_html(gap)
+        line = self.lexer.line_index.line(start)
+        result = ""
+        for i, part in enumerate(gap.split("\n")):
+            if i > 0:
+                result += "\n"
+                line += 1
+            if part and line in highlight_lines:
+                result += f"{span_tag}{escape_html(part)}</span>"
+            else:
+                result += escape_html(part)
+        return result
+
+    def _gap_token_html(
+        self,
+        start: int,
+        end: int,
+        highlight_lines: List[int],
+        span_tag: str,
+        index: int,
+        highlight_tokens: Collection[int],
+        token_tags: Tuple[str, str],
+    ) -> Tuple[str, int]:
+        """
+        与 _gap_html 相同, 同时从 index 开始为 gap 中的空白编号, 编号在 highlight_tokens 中的空白使用 token_tags 中的开始标签
+        (token_tags[1] 用于高亮行中的空白). 返回 html 和下一个编号
+        """
+        text = self.lexer.text
+        result = ""
+        # 还没有输出的不需要高亮的空白的起始位置
+        plain_start = start
+        for match in GAP_TOKEN_PATTERN.finditer(text, start, end):
+            if index in highlight_tokens:
+                if plain_start < match.start():
+                    result += self._gap_html(plain_start, match.start(), highlight_lines, span_tag)
+                in_highlight_line = bool(highlight_lines) and self.lexer.line_index.line(match.start()) in highlight_lines
+                result += f"{token_tags[in_highlight_line]}{escape_html(match.group())}</span>"
+                plain_start = match.end()
+            index += 1
+        if plain_start < end:
+            result += self._gap_html(plain_start, end, highlight_lines, span_tag)
+        return result, index
 
     def brace_matching(self):
         """
@@ -243,18 +655,18 @@ class Parser:
             if token.type in left_brace_list:
                 # 左括号直接加入到 stack 当中
                 brace_stack.append(token.type)
-                token.class_list.append(f"BraceDepth-{brace_depth%brace_max_depth}")
+                token.add_class(f"BraceDepth-{brace_depth%brace_max_depth}")
                 brace_depth += 1
             elif token.type in right_brace_list:
                 if len(brace_stack) == 0:
                     # 栈为空且当前符号为右括号, 直接置 0
-                    token.class_list.append(f"BraceDepth-0")
+                    token.add_class(f"BraceDepth-0")
                 else:
                     if left_brace_list.index(brace_stack[-1]) == right_brace_list.index(token.type):
                         # 如果左右括号类型匹配
                         brace_stack.pop()
                         brace_depth -= 1
-                        token.class_list.append(f"BraceDepth-{brace_depth%brace_max_depth}")
+                        token.add_class(f"BraceDepth-{brace_depth%brace_max_depth}")
                     else:
                         # 如果括号类型不匹配, 不断弹出栈内元素直到可以匹配
                         while True:
@@ -265,7 +677,7 @@ class Parser:
                             if left_brace_list.index(brace_stack[-1]) == right_brace_list.index(token.type):
                                 brace_stack.pop()
                                 brace_depth -= 1
-                                token.class_list.append(f"BraceDepth-{brace_depth%brace_max_depth}")
+                                token.add_class(f"BraceDepth-{brace_depth%brace_max_depth}")
                                 break
 
     def parse(self):
@@ -385,6 +797,110 @@ class Parser:
             nodes.append(func(*func_args))
         return nodes
 
+    def run_nested(self, generator: Generator[Generator, AST, AST]) -> AST:
+        """
+        运行可以任意嵌套的匹配函数
+
+        嵌套的文法 (例如 json 的 object/array) 写作生成器, 匹配子结构时 yield 子结构的生成器并得到它的返回值
+
+            node.update(value=(yield self.value()))
+
+        所有生成器保存在显式的栈中依次运行, Python 调用栈不随嵌套深度增长, 嵌套层数不受递归深度限制
+        """
+        stack = [generator]
+        value = None
+        while True:
+            try:
+                sub_generator = stack[-1].send(value)
+            except StopIteration as e:
+                stack.pop()
+                if not stack:
+                    return e.value
+                value = e.value
+            else:
+                stack.append(sub_generator)
+                value = None
+
+    def binary_expression(
+        self,
+        precedence: Dict[Enum, int],
+        operand: Callable[[], Generator[Generator, AST, AST]],
+        register_operator: Callable[[AST], None] = None,
+    ) -> Generator[Generator, AST, AST]:
+        """
+        按运算符优先级表匹配双目运算表达式, 每个优先级对应文法中的一层
+
+        <expr_0> ::= <expr_1> (<op_0> <expr_1>)*
+        ...
+        <expr_n-1> ::= <operand> (<op_n-1> <operand>)*
+
+        @precedence: 运算符 token 类型 -> 所在的层, 由 operator_precedence 生成
+        @operand: 返回匹配最高优先级的操作数的生成器
+        @register_operator: 将当前 token 作为运算符注册到 BinaryOp 中, 默认直接 eat
+
+        结果与逐层递归匹配相同: 出现运算符的层生成一个 BinaryOp(expr_left, expr_rights), 没有运算符的层直接返回下一层的结果.
+        只有遇到过运算符的层保存在 frames 中, 循环匹配, 调用深度与优先级层数和表达式长度无关
+
+        由 run_nested 运行的生成器, 操作数中嵌套的表达式 (例如括号) 同样 yield 其生成器, 嵌套层数不受递归深度限制
+        """
+        if register_operator is None:
+            register_operator = lambda node: node.register_token(self.eat(self.current_token.type))
+
+        # 正在构造的 (层, BinaryOp, expr_rights), 层由低到高
+        frames: List[Tuple[int, BinaryOp, List[AST]]] = []
+        while True:
+            value = yield from operand()
+            level = precedence.get(self.current_token.type, -1)
+            # 比当前运算符优先级高的层已经匹配完成, 由高到低依次结束
+            while frames and frames[-1][0] > level:
+                _, node, expr_rights = frames.pop()
+                expr_rights.append(value)
+                node.update(expr_rights=expr_rights)
+                value = node
+            if level == -1:
+                return value
+            if frames and frames[-1][0] == level:
+                frames[-1][2].append(value)
+            else:
+                node = BinaryOp()
+                node.update(expr_left=value)
+                frames.append((level, node, []))
+            register_operator(frames[-1][1])
+
+    def chain_expression(
+        self,
+        operand: Callable[[], Generator[Generator, AST, AST]],
+        operator: Callable[[AST], Optional[str]],
+        first: AST = None,
+    ) -> Generator[Generator, AST, AST]:
+        """
+        匹配右递归的运算符链
+
+        <expr> ::= <operand> (<op> <expr>)?
+
+        @operand: 返回匹配一个操作数的生成器
+        @operator: 当前 token 为运算符时将其注册到操作数节点中, 并返回连接后面表达式的属性名, 否则返回 None
+        @first: 已经匹配好的第一个操作数, 默认调用 operand
+
+        结果与递归匹配相同, 每个操作数节点的属性指向后面的表达式, 但循环匹配, 长表达式不会超过递归深度限制.
+        与 binary_expression 一样是由 run_nested 运行的生成器, 括号中的表达式嵌套层数也不受递归深度限制
+        """
+        node = (yield from operand()) if first is None else first
+        nodes = [node]
+        keys = []
+        while True:
+            key = operator(node)
+            if key is None:
+                break
+            keys.append(key)
+            node = yield from operand()
+            nodes.append(node)
+
+        # 与递归匹配相同, 从最后一个操作数开始依次连接
+        for index in range(len(keys) - 1, -1, -1):
+            nodes[index].update(**{keys[index]: nodes[index + 1]})
+        return nodes[0]
+
     def string_inside_format(
         self,
         token: Token = None,
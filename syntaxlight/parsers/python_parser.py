@@ -2,12 +2,13 @@ from .parser import Parser
 from ..lexers import TokenType, PythonTokenType
 import re
 
-from ..gdt import CSS, GlobalDescriptorTable
-
-GDT = GlobalDescriptorTable()
+from ..gdt import CSS
 
 
 class PythonParser(Parser):
+    # 解析过程中会关闭 skip_space/skip_invis_chars, 需要保留所有空白 token
+    gap_characters = frozenset()
+
     def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
         super().__init__(lexer, skip_invis_chars, skip_space)
 
@@ -41,11 +42,11 @@ class PythonParser(Parser):
                     self.eat()
                     self.eat()
                     self.current_token.add_css(CSS.IMPORT_LIBNAME)
-                    GDT.register_id(self.current_token.value, CSS.IMPORT_LIBNAME)
+                    self.gdt.register_id(self.current_token.value, CSS.IMPORT_LIBNAME)
 
             elif self.current_token.type == TokenType.ID:
-                if self.current_token.value in GDT:
-                    self.current_token.add_css(GDT[self.current_token.value])
+                if self.current_token.value in self.gdt:
+                    self.current_token.add_css(self.gdt[self.current_token.value])
                 elif self.peek_next_token().type == TokenType.LPAREN:
                     if self.current_token.value[0].isupper():
                         self.current_token.add_css(CSS.CLASS_INSTANTIATION)
@@ -60,7 +61,7 @@ class PythonParser(Parser):
                                 if base_class.value[0].isupper():
                                     base_class.add_css(CSS.CLASS_INSTANTIATION)
                                 else:
-                                    self.current_token.class_list.pop()
+                                    self.current_token.pop_class()
 
             elif self.current_token.type == TokenType.COLON:
                 self.skip_invis_chars = False
@@ -1,10 +1,10 @@
 import re
 from .parser import Parser
-from ..lexers import TokenType, RustTokenSet, RustTokenType
+from ..lexers import TokenType, TokenSet, RustTokenSet, RustTokenType
 from ..error import ErrorCode
 from ..asts.rust_ast import *
-from ..asts.ast import add_ast_type, Token, String
-from ..gdt import CSS, GlobalDescriptorTable
+from ..asts.ast import add_ast_type, resolve_ast_types, Token, String
+from ..gdt import CSS
 from enum import Enum
 
 # 默认预导入的 rust 的标准库
@@ -40,8 +40,6 @@ DEFAULT_RUST_LIB = [
     ("Err", CSS.ENUM_ID),
 ]
 
-GDT = GlobalDescriptorTable(DEFAULT_RUST_LIB)
-
 
 class RustCSS(Enum):
     MUTABLE_VAR = "MutableVar"  # 可变变量
@@ -57,48 +55,46 @@ class RustCSS(Enum):
 
 
 class RustParser(Parser):
-    def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
-        super().__init__(lexer, skip_invis_chars, skip_space)
-        self.rust_first_set = RustTokenSet()
-
-        self.binary_op_set = [
-            # 基础
-            TokenType.PLUS,
-            TokenType.MINUS,
-            TokenType.MUL,
-            TokenType.DIV,
-            TokenType.MOD,
-            TokenType.SHL,
-            TokenType.SHR,
-            TokenType.PIPE,
-            TokenType.AMPERSAND,
-            TokenType.ASSIGN,
-            # assign
-            TokenType.ADD_ASSIGN,
-            TokenType.SUB_ASSIGN,
-            TokenType.MUL_ASSIGN,
-            TokenType.DIV_ASSIGN,
-            TokenType.MOD_ASSIGN,
-            TokenType.SHL_ASSIGN,
-            TokenType.SHR_ASSIGN,
-            TokenType.AND_ASSIGN,
-            TokenType.OR_ASSIGN,
-            # binop
-            TokenType.EQ,
-            TokenType.NE,
-            TokenType.LANGLE_BRACE,
-            TokenType.LE,
-            TokenType.RANGLE_BRACE,
-            TokenType.GE,
-            TokenType.CARET,
-            TokenType.OR,
-            TokenType.AND,
-            TokenType.CONCAT,
-        ]
+    default_descriptors = DEFAULT_RUST_LIB
+    rust_first_set = RustTokenSet()
+
+    binary_op_set = TokenSet(
+        # 基础
+        TokenType.PLUS,
+        TokenType.MINUS,
+        TokenType.MUL,
+        TokenType.DIV,
+        TokenType.MOD,
+        TokenType.SHL,
+        TokenType.SHR,
+        TokenType.PIPE,
+        TokenType.AMPERSAND,
+        TokenType.ASSIGN,
+        # assign
+        TokenType.ADD_ASSIGN,
+        TokenType.SUB_ASSIGN,
+        TokenType.MUL_ASSIGN,
+        TokenType.DIV_ASSIGN,
+        TokenType.MOD_ASSIGN,
+        TokenType.SHL_ASSIGN,
+        TokenType.SHR_ASSIGN,
+        TokenType.AND_ASSIGN,
+        TokenType.OR_ASSIGN,
+        # binop
+        TokenType.EQ,
+        TokenType.NE,
+        TokenType.LANGLE_BRACE,
+        TokenType.LE,
+        TokenType.RANGLE_BRACE,
+        TokenType.GE,
+        TokenType.CARET,
+        TokenType.OR,
+        TokenType.AND,
+        TokenType.CONCAT,
+    )
 
     def parse(self):
         self.root = self.rustFiles()
-        GDT.reset()
         return self.root
 
     def rustFiles(self):
@@ -113,7 +109,12 @@ class RustParser(Parser):
 
         item_with_attrs = []
         while self.current_token.type in self.rust_first_set.item_with_attrs:
-            item_with_attrs.append(self.item_with_attrs())
+            item_with_attr = self.item_with_attrs()
+            if self.build_ast:
+                item_with_attrs.append(item_with_attr)
+            else:
+                # 顶层节点不再保留, 先处理其中记录的类名
+                resolve_ast_types()
         node.update(item=item_with_attrs)
 
         self.skip_crlf()
@@ -253,7 +254,7 @@ class RustParser(Parser):
         node.update(use=self.get_keyword(token_type=RustTokenType.USE))
         node.update(path_glob=self.path_glob())
         # 将 path_glob 的最后一个 id 注册到 GDT 中
-        node.path_glob.register_gdt(GDT)
+        node.path_glob.register_gdt(self.gdt)
         node.register_token(self.eat(TokenType.SEMI))
         return node
 
@@ -335,7 +336,7 @@ class RustParser(Parser):
         node.update(const=self.get_keyword(token_type=RustTokenType.CONST))
         node.update(id=self.get_identifier())
         add_ast_type(node.id, CSS.CONSTANT)
-        GDT.register_id(node.id.id, CSS.CONSTANT)
+        self.gdt.register_id(node.id.id, CSS.CONSTANT)
         node.register_token(self.eat(TokenType.COLON))
         node.update(ty=self.ty())
         node.register_token(self.eat(TokenType.ASSIGN))
@@ -351,7 +352,7 @@ class RustParser(Parser):
         node.update(type=self.get_keyword(token_type=RustTokenType.TYPE))
         node.update(id=self.get_identifier())
         add_ast_type(node.id, CSS.TYPEDEF)
-        GDT.register_id(node.id.id, CSS.TYPEDEF)
+        self.gdt.register_id(node.id.id, CSS.TYPEDEF)
         node.register_token(self.eat(TokenType.ASSIGN))
         node.update(ty=self.ty())
         node.register_token(self.eat(TokenType.SEMI))
@@ -439,7 +440,7 @@ class RustParser(Parser):
 
     def _register_fn_param(self, fn_params: List[FnParam], scope: str):
         """
-        将参数中的 mut 注册到 GDT 中
+        将参数中的 mut 注册到 GDT 的函数作用域中
         """
         if fn_params is None:
             return
@@ -447,14 +448,14 @@ class RustParser(Parser):
             if fn_param.ty_sum is not None:
                 if fn_param.ty_sum.ty.mut is not None:
                     if fn_param.pat.path is not None:
-                        GDT.register_id(fn_param.pat.path.id.id, RustCSS.MUTABLE_ARG, scope)
+                        self.gdt.register_id(fn_param.pat.path.id.id, RustCSS.MUTABLE_ARG, scope)
                         fn_param.pat.path.id._tokens[0].add_css(RustCSS.MUTABLE_ARG)
 
     def _unregister_fn_param(self, scope: str):
         """
         离开作用域时, 从 GDT 中删除参数中的 mut
         """
-        GDT.delete_scope(scope)
+        self.gdt.pop_scope(scope)
 
     def ret_ty(self):
         """
@@ -498,7 +499,7 @@ class RustParser(Parser):
         node.update(struct=self.get_keyword(token_type=RustTokenType.STRUCT))
         node.update(id=self.get_identifier())
         add_ast_type(node.id, CSS.CLASS_NAME)
-        GDT.register_id(node.id.id, CSS.CLASS_NAME)
+        self.gdt.register_id(node.id.id, CSS.CLASS_NAME)
         if self.current_token.type in self.rust_first_set.generic_params:
             node.update(generic_params=self.generic_params())
 
@@ -576,7 +577,7 @@ class RustParser(Parser):
         node.update(enum=self.get_keyword(token_type=RustTokenType.ENUM))
         node.update(id=self.get_identifier())
         add_ast_type(node.id, CSS.ENUMERATOR)
-        GDT.register_id(node.id.id, CSS.ENUMERATOR)
+        self.gdt.register_id(node.id.id, CSS.ENUMERATOR)
         if self.current_token.type in self.rust_first_set.generic_params:
             node.update(generic_params=self.generic_params())
         node.update(enum_body=self.enum_body())
@@ -606,7 +607,7 @@ class RustParser(Parser):
             node.update(visibility=self.visibility())
         node.update(id=self.get_identifier())
         add_ast_type(node.id, CSS.ENUM_ID)
-        GDT.register_id(node.id.id, CSS.ENUM_ID)
+        self.gdt.register_id(node.id.id, CSS.ENUM_ID)
         if self.current_token.type in self.rust_first_set.record_struct_body:
             node.update(record_struct_body=self.record_struct_body())
         elif self.current_token.type in self.rust_first_set.tuple_struct_body:
@@ -683,7 +684,7 @@ class RustParser(Parser):
             if node.member_fn_params.self_param is not None:
                 if node.member_fn_params.self_param.mut is not None:
                     add_ast_type(node.id, RustCSS.MUTABLE_FUNCTION)
-                    GDT.register_id("self", RustCSS.MUTABLE_SELF, node.id.id)
+                    self.gdt.register_id("self", RustCSS.MUTABLE_SELF, node.id.id)
 
             if self.current_token.type in self.rust_first_set.ret_ty:
                 node.update(ret_ty=self.ret_ty())
@@ -883,7 +884,7 @@ class RustParser(Parser):
         elif self.current_token.type == RustTokenType.MUT:
             node.update(mut=self.get_keyword(token_type=RustTokenType.MUT))
             node.update(id=self.get_identifier())
-            GDT.register_id(node.id.id, RustCSS.MUTABLE_VAR)
+            self.gdt.register_id(node.id.id, RustCSS.MUTABLE_VAR)
             node.id._tokens[0].add_css(RustCSS.MUTABLE_VAR)
 
         elif self.current_token.type == RustTokenType.REF:
@@ -893,7 +894,7 @@ class RustParser(Parser):
             node.update(id=self.get_identifier())
             
             if node.mut is not None:
-                GDT.register_id(node.id.id, RustCSS.MUTABLE_VAR)
+                self.gdt.register_id(node.id.id, RustCSS.MUTABLE_VAR)
                 node.id._tokens[0].add_css(RustCSS.MUTABLE_VAR)
         elif self.current_token.type == TokenType.LPAREN:
             if self.peek_next_token().type == TokenType.RPAREN:
@@ -1059,7 +1060,7 @@ class RustParser(Parser):
         node = TypePathSegment()
         if self.current_token.type == TokenType.ID:
             node.update(id=self.get_identifier())
-            GDT.register_id(node.id.id, RustCSS.TYPE_BOUND)
+            self.gdt.register_id(node.id.id, RustCSS.TYPE_BOUND)
             node.id._tokens[0].add_css(RustCSS.TYPE_BOUND)
         elif self.current_token.type == RustTokenType.SSELF:
             node.update(sself=self.get_keyword(token_type=RustTokenType.SSELF))
@@ -1168,32 +1169,43 @@ class RustParser(Parser):
                --- expr match ---
 
                | ref_group -- expr suffix
+
+        不区分运算符优先级, expr op expr 按右递归匹配, 见 Parser.chain_expression.
+        unary_group/primary_group 中嵌套的 expr 由 run_nested 运行, 嵌套层数不受递归深度限制
         """
+        return self.run_nested(self._expr(is_match_expr))
+
+    def _expr(self, is_match_expr=False):
+        first = yield from self._expr_operand(is_match_expr)
+        return (yield from self.chain_expression(self._expr_operand, self._expr_operator, first))
+
+    def _expr_operand(self, is_match_expr=False):
         node = Expr()
         # unary_group.borrow_expr 和 primary_group.paren_expr 有重叠, 但是不影响匹配, 可以直接在这里过 unary_group, 交由下一组匹配 expr
         if self.current_token.type in self.rust_first_set.unary_group:
-            node.update(expr=self.unary_group(is_match_expr))
+            node.update(expr=(yield from self.unary_group(is_match_expr)))
         elif self.current_token.type == TokenType.ID and self.peek_next_token().type == TokenType.BANG:
             node.update(expr=self.macro_expr(is_match_expr))
         elif self.current_token.type in self.rust_first_set.primary_group:
-            node.update(expr=self.primary_group(is_match_expr))
+            node.update(expr=(yield from self.primary_group(is_match_expr)))
         else:
             self.error(ErrorCode.UNEXPECTED_TOKEN, message="should be unary group or primary group or macro expr")
 
         while self.current_token.type in self.rust_first_set.ref_group:
             self.ref_group(node)
-
-        if self.current_token.type in self.binary_op_set or self.current_token.type == RustTokenType.AS:
-            if self.current_token.type == RustTokenType.AS:
-                node.update(kw_as=self.get_keyword(token_type=RustTokenType.AS))
-            else:
-                node.update(op=self.get_punctuator())
-                if len(node.op.op) > 1 and node.op.op[-1] == '=' and node.op.op not in ['<=','>=']:
-                    node.op._tokens[0].add_css(RustCSS.MUTABLE_OP)
-
-            node.update(next_expr=self.expr())
         return node
 
+    def _expr_operator(self, node: Expr):
+        if self.current_token.type == RustTokenType.AS:
+            node.update(kw_as=self.get_keyword(token_type=RustTokenType.AS))
+        elif self.current_token.type in self.binary_op_set:
+            node.update(op=self.get_punctuator())
+            if len(node.op.op) > 1 and node.op.op[-1] == '=' and node.op.op not in ['<=','>=']:
+                node.op._tokens[0].add_css(RustCSS.MUTABLE_OP)
+        else:
+            return None
+        return "next_expr"
+
     def unary_group(self, is_match_expr=False):
         """
         unary_group ::= box_expr
@@ -1218,7 +1230,7 @@ class RustParser(Parser):
                 node.update(kw=self.get_keyword(token_type=RustTokenType.MUT))
         else:
             self.error(ErrorCode.UNEXPECTED_TOKEN, message="should be box, *, & or -")
-        node.update(expr=self.expr(is_match_expr))
+        node.update(expr=(yield self._expr(is_match_expr)))
         return node
 
     def macro_expr(self, is_match_expr=False):
@@ -1331,12 +1343,19 @@ class RustParser(Parser):
                 node.update(struct_fields=self.list_items(self.struct_field, trailing_set=[TokenType.ID]))
                 if self.current_token.type == TokenType.CONCAT:
                     node.register_token(self.eat(TokenType.CONCAT))
-                    node.update(expr=self.expr())
+                    node.update(expr=(yield self._expr()))
                 node.register_token(self.eat(TokenType.RCURLY_BRACE))
         elif self.current_token.type == TokenType.LPAREN:
             if self.peek_next_token().type != TokenType.RPAREN:
                 node.register_token(self.eat(TokenType.LPAREN))
-                node.update(exprs=self.list_items(self.expr, trailing_set=self.rust_first_set.expr))
+                # 与 list_items(self.expr, trailing_set=...) 相同, 但 yield 每一项的生成器
+                exprs = [(yield self._expr())]
+                while self.current_token.type == TokenType.COMMA:
+                    self.eat(TokenType.COMMA)
+                    if self.current_token.type not in self.rust_first_set.expr:
+                        break
+                    exprs.append((yield self._expr()))
+                node.update(exprs=exprs)
                 node.register_token(self.eat(TokenType.RPAREN))
             else:
                 node.update(lit=self.lit())
@@ -1345,15 +1364,15 @@ class RustParser(Parser):
         elif self.current_token.type == TokenType.LSQUAR_PAREN:
             node.register_token(self.eat(TokenType.LSQUAR_PAREN))
             if self.current_token.type in self.rust_first_set.expr:
-                node.update(expr=self.expr())
+                node.update(expr=(yield self._expr()))
                 if self.current_token.type == TokenType.SEMI:
                     node.register_token(self.eat(TokenType.SEMI))
-                    node.update(next_expr=self.expr())
+                    node.update(next_expr=(yield self._expr()))
                 elif self.current_token.type == TokenType.COMMA:
                     node.register_token(self.eat(TokenType.COMMA))
                     exprs = []
                     while self.current_token.type in self.rust_first_set.expr:
-                        exprs.append(self.expr())
+                        exprs.append((yield self._expr()))
                         if self.current_token.type == TokenType.COMMA:
                             node.register_token(self.eat(TokenType.COMMA))
                         else:
@@ -1367,7 +1386,7 @@ class RustParser(Parser):
         elif self.current_token.type == RustTokenType.RETURN:
             node.update(kw=self.get_keyword(token_type=RustTokenType.RETURN))
             if self.current_token.type in self.rust_first_set.expr:
-                node.update(expr=self.expr())
+                node.update(expr=(yield self._expr()))
         elif self.current_token.type in self.rust_first_set.statement_like_expr:
             node.update(statement_like_expr=self.statement_like_expr())
         elif self.current_token.type == RustTokenType.CONTINUE:
@@ -1375,7 +1394,7 @@ class RustParser(Parser):
         elif self.current_token.type == RustTokenType.BREAK:
             node.update(kw=self.get_keyword(token_type=RustTokenType.BREAK))
             if self.current_token.type in self.rust_first_set.expr:
-                node.update(expr=self.expr())
+                node.update(expr=(yield self._expr()))
             elif self.current_token.type == RustTokenType.LIFETIME:
                 self.current_token.type = RustTokenType.LABEL
                 node.register_token(self.eat(RustTokenType.LABEL))
@@ -1643,7 +1662,7 @@ class RustParser(Parser):
             self.current_token.type = RustTokenType.LABEL
             node.update(label=self.get_identifier(RustTokenType.LABEL))
             add_ast_type(node.label, RustCSS.LABEL)
-            GDT.register_id(node.label.id, RustCSS.LABEL)
+            self.gdt.register_id(node.label.id, RustCSS.LABEL)
         else:
             self.error(ErrorCode.UNEXPECTED_TOKEN, message="should be lifetime")
 
@@ -1688,14 +1707,14 @@ class RustParser(Parser):
         return node
 
     def after_eat(self):
-        if self.current_token.type == TokenType.ID and self.current_token.value in GDT:
-            if GDT[self.current_token.value] == RustCSS.MUTABLE_ARG:
+        if self.current_token.type == TokenType.ID and self.current_token.value in self.gdt:
+            if self.gdt[self.current_token.value] == RustCSS.MUTABLE_ARG:
                 self.current_token.add_css(RustCSS.MUTABLE_VAR)
             else:
-                self.current_token.add_css(GDT[self.current_token.value])
+                self.current_token.add_css(self.gdt[self.current_token.value])
 
         if self.current_token.type == RustTokenType.SELF:
-            if "self" in GDT:
+            if "self" in self.gdt:
                 self.current_token.add_css(RustCSS.MUTABLE_SELF)
 
     def get_string(self):
@@ -1,5 +1,5 @@
 from .parser import Parser
-from ..lexers import TokenType, TomlTokenType, Token
+from ..lexers import TokenType, TokenSet, TomlTokenType, Token
 from ..error import ErrorCode
 from ..asts.ast import (
     AST,
@@ -11,9 +11,10 @@ from ..asts.ast import (
     Keyword,
     Expression,
     UnaryOp,
+    resolve_ast_types,
 )
 
-from typing import List
+from typing import List, Generator
 
 
 class Toml(AST):
@@ -97,20 +98,22 @@ class TomlParser(Parser):
     TOML do not skip invisible character `\\r\\n`
     """
 
+    gap_characters = frozenset(" ")
+    value_first_set = TokenSet(
+        TokenType.STR,
+        TokenType.MINUS,
+        TokenType.PLUS,
+        TokenType.NUMBER,
+        TomlTokenType.DATE,
+        TomlTokenType.TRUE,
+        TomlTokenType.FALSE,
+        TokenType.LSQUAR_PAREN,
+        TokenType.LCURLY_BRACE,
+    )
+    path_first_set = TokenSet(TokenType.ID, TokenType.STR)
+
     def __init__(self, lexer, skip_invis_chars=False, skip_space=True):
         super().__init__(lexer, skip_invis_chars, skip_space)
-        self.value_first_set = [
-            TokenType.STR,
-            TokenType.MINUS,
-            TokenType.PLUS,
-            TokenType.NUMBER,
-            TomlTokenType.DATE,
-            TomlTokenType.TRUE,
-            TomlTokenType.FALSE,
-            TokenType.LSQUAR_PAREN,
-            TokenType.LCURLY_BRACE,
-        ]
-        self.path_first_set = [TokenType.ID, TokenType.STR]
 
     def parse(self):
         self.root = self.toml()
@@ -130,7 +133,12 @@ class TomlParser(Parser):
             TokenType.ID,  # key - value
             TokenType.LSQUAR_PAREN,  # [] | [[]]
         ]:
-            expressions.append(self.expression())
+            expression = self.expression()
+            if self.build_ast:
+                expressions.append(expression)
+            else:
+                # 顶层节点不再保留, 先处理其中记录的类名
+                resolve_ast_types()
 
         return Toml(expressions)
 
@@ -140,7 +148,7 @@ class TomlParser(Parser):
         """
         exprs = []
         if self.current_token.type in (TokenType.ID, TokenType.STR):
-            exprs.append(self.pair())
+            exprs.append(self.run_nested(self.pair()))
             self.eat_lf()
             self.skip_crlf()
         elif self.current_token.type == TokenType.LSQUAR_PAREN:
@@ -148,14 +156,16 @@ class TomlParser(Parser):
 
         return Expression(exprs)
 
-    def pair(self) -> Pair:
+    def pair(self) -> Generator[Generator, AST, Pair]:
         """
         <pair> ::= <path> '=' <value>
+
+        pair/value/array/inline_table 可以互相嵌套, 都是由 run_nested 运行的生成器
         """
         path = self.path()
         node = Pair(path)
         node.register_token(self.eat(TokenType.ASSIGN))
-        value = self.value()
+        value = yield self.value()
         node.update(value=value)
         return node
 
@@ -224,7 +234,7 @@ class TomlParser(Parser):
         pairs = []
         accepted_token_types = [TokenType.ID, TokenType.STR]
         while self.current_token.type in accepted_token_types:
-            pairs.append(self.pair())
+            pairs.append(self.run_nested(self.pair()))
             self.eat_lf()
             self.skip_crlf()
 
@@ -268,10 +278,10 @@ class TomlParser(Parser):
             node.register_token(self.eat(self.current_token.type))
 
         elif self.current_token.type == TokenType.LSQUAR_PAREN:
-            node = self.array()
+            node = yield self.array()
 
         elif self.current_token.type == TokenType.LCURLY_BRACE:
-            node = self.inline_table()
+            node = yield self.inline_table()
 
         else:  # pragma: no cover
             # should never reach here
@@ -291,7 +301,7 @@ class TomlParser(Parser):
         self.skip_crlf()
         elements: List[AST] = []
         while self.current_token.type in self.value_first_set:
-            elements.append(self.value())
+            elements.append((yield self.value()))
             self.skip_crlf()
             if self.current_token.type == TokenType.COMMA:
                 node.register_token(self.eat(TokenType.COMMA))
@@ -313,7 +323,7 @@ class TomlParser(Parser):
 
         pairs = []
         while self.current_token.type in self.path_first_set:
-            pairs.append(self.pair())
+            pairs.append((yield self.pair()))
             if self.current_token.type == TokenType.COMMA:
                 node.register_token(self.eat(TokenType.COMMA))
             elif self.current_token.type in self.path_first_set:
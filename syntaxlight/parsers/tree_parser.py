@@ -25,6 +25,8 @@ def add_file_css(token: Token):
         token.add_css(FileCSS.SH)
 
 class TreeParser(Parser):
+    gap_characters = frozenset()
+
     def __init__(self, lexer, skip_invis_chars=False, skip_space=False):
         super().__init__(lexer, skip_invis_chars, skip_space)
 
@@ -50,6 +52,7 @@ class TreeParser(Parser):
         |   |   `-- hellox.c
         '''
         depth = 0
+        id_depths = {}  # ID token -> 所在的目录深度
         depth_chars = ["\xa0", "─", "├", "└", "│", " ", "|", '-', '`']
         while self.current_token.type != TokenType.EOF:
             if self.current_token.type == TokenType.LF:
@@ -60,14 +63,14 @@ class TreeParser(Parser):
                 depth += 1
             
             if self.current_token.type == TokenType.ID:
-                self.current_token.depth = int(depth / 4)
+                id_depths[self.current_token] = int(depth / 4)
 
             self.eat()
 
         dir_chars = ["├", "└", "|",'`']
         for i, token in enumerate(self.token_list):
             if token.type == TokenType.ID:
-                depth = token.depth
+                depth = id_depths[token]
                 pos = i + 1 + depth * 4 + 1
                 if pos < len(self.token_list) and self.token_list[pos].value in dir_chars:
                     token.add_css(TreeCSS.DIR)
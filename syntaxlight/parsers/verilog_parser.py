@@ -2,7 +2,7 @@ from .parser import Parser
 from ..lexers import TokenType, VerilogTokenType, Token, VerilogTokenSet
 from ..error import ErrorCode
 from ..gdt import CSS
-from ..asts.ast import add_ast_type, Number
+from ..asts.ast import add_ast_type, resolve_ast_types, Number
 from ..asts.verilog_ast import *
 from enum import Enum
 import re
@@ -20,9 +20,10 @@ class VerilogCSS(Enum):
 
 
 class VerilogParser(Parser):
+    verilog_first_set = VerilogTokenSet()
+
     def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
         super().__init__(lexer, skip_invis_chars, skip_space)
-        self.verilog_first_set = VerilogTokenSet()
 
         self.module_map = {
             VerilogTokenType.PARAMETER: self.parameter_declaration,
@@ -59,7 +60,12 @@ class VerilogParser(Parser):
         node = Verilog()
         descriptions = []
         while self.current_token.type in self.verilog_first_set.description:
-            descriptions.append(self.description())
+            description = self.description()
+            if self.build_ast:
+                descriptions.append(description)
+            else:
+                # 顶层节点不再保留, 先处理其中记录的类名
+                resolve_ast_types()
         node.update(descriptions=descriptions)
         return node
 
@@ -654,27 +660,41 @@ class VerilogParser(Parser):
                      ||= <expression> <BINARY_OPERATOR> <expression>
                      ||= <expression> <QUESTION_MARK> <expression> : <expression>
                      ||= <STRING>
+
+        不区分运算符优先级, 双目运算和条件运算按右递归匹配, 见 Parser.chain_expression.
+        primary 中嵌套的 expression 由 run_nested 运行, 嵌套层数不受递归深度限制
         """
+        return self.run_nested(self._expression())
+
+    def _expression(self):
+        return self.chain_expression(self._expression_operand, self._expression_operator)
+
+    def _expression_operand(self):
         node = Expression()
         if self.current_token.type in self.verilog_first_set.unary_operator:
             node.update(op=self.get_punctuator())
-            node.update(primary=self.primary())
+            node.update(primary=(yield from self.primary()))
         elif self.current_token.type in self.verilog_first_set.primary:
-            node.update(primary=self.primary())
+            node.update(primary=(yield from self.primary()))
         elif self.current_token.type == TokenType.STRING:
             return self.get_string()
         else:
             self.error(ErrorCode.UNEXPECTED_TOKEN, "should be unary_operator or primary or string")
+        return node
 
+    def _expression_operator(self, node: AST):
+        if not isinstance(node, Expression):
+            # <STRING> 后面不再匹配运算符
+            return None
         if self.current_token.type in self.verilog_first_set.binary_operator:
             node.update(bin_op=self.get_punctuator())
-            node.update(expr=self.expression())
+            return "expr"
         elif self.current_token.type == TokenType.QUESTION:
             node.register_token(self.eat(TokenType.QUESTION))
             node.update(expr1=self.expression())
             node.register_token(self.eat(TokenType.COLON))
-            node.update(expr2=self.expression())
-        return node
+            return "expr2"
+        return None
 
     def primary(self):
         """
@@ -685,6 +705,8 @@ class VerilogParser(Parser):
                   ||= <concatenation> | <multiple_concatenation>
                   ||= <function_call>
                   ||= ( <mintypmax_expression> )
+
+        primary/expression/mintypmax_expression 可以互相嵌套, 都是由 run_nested 运行的生成器
         """
         if self.current_token.type == TokenType.NUMBER:
             return self.get_number()
@@ -697,10 +719,10 @@ class VerilogParser(Parser):
                 node.update(id=self.get_identifier())
                 if self.current_token.type == TokenType.LSQUAR_PAREN:
                     node.register_token(self.eat(TokenType.LSQUAR_PAREN))
-                    node.update(expr1=self.expression())
+                    node.update(expr1=(yield self._expression()))
                     if self.current_token.type == TokenType.COLON:
                         node.register_token(self.eat(TokenType.COLON))
-                        node.update(expr2=self.expression())
+                        node.update(expr2=(yield self._expression()))
                     node.register_token(self.eat(TokenType.RSQUAR_PAREN))
                 return node
         elif self.current_token.type in self.verilog_first_set.concatenation:
@@ -710,7 +732,7 @@ class VerilogParser(Parser):
         elif self.current_token.type == TokenType.LPAREN:
             node = Primary()
             node.register_token(self.eat(TokenType.LPAREN))
-            node.update(expr=self.mintypmax_expression())
+            node.update(expr=(yield self._mintypmax_expression()))
             node.register_token(self.eat(TokenType.RPAREN))
             return node
         else:
@@ -799,13 +821,16 @@ class VerilogParser(Parser):
             ::= <expression>
             ||= <expression> : <expression> : <expression>
         """
+        return self.run_nested(self._mintypmax_expression())
+
+    def _mintypmax_expression(self):
         node = MintypmaxExpression()
-        node.update(expr1=self.expression())
+        node.update(expr1=(yield from self._expression()))
         if self.current_token.type == TokenType.COLON:
             node.register_token(self.eat())
-            node.update(expr2=self.expression())
+            node.update(expr2=(yield self._expression()))
             node.register_token(self.eat(TokenType.COLON))
-            node.update(expr3=self.expression())
+            node.update(expr3=(yield self._expression()))
         return node
 
     def range(self):
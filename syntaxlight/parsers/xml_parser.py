@@ -31,7 +31,7 @@ class XmlParser(Parser):
         if self.current_token.type == XmlTokenType.PROLOG_START:
             node.update(prolog=self.prolog())
         if self.current_token.type == XmlTokenType.TAG_START_BEGIN:
-            node.update(element=self.element())
+            node.update(element=self.run_nested(self.element()))
         return node
 
     def prolog(self):
@@ -56,6 +56,8 @@ class XmlParser(Parser):
         <STag>    ::= "<" <Name> (S <Attribute>)* S? ">"
         <content> ::= (.* <element> .*)*
         <ETag>    ::= "</" <Name> S? ">"
+
+        嵌套的 element 由 run_nested 运行, 嵌套层数不受递归深度限制
         """
         node = Tag()
         node.register_token(self.eat(XmlTokenType.TAG_START_BEGIN))
@@ -80,7 +82,7 @@ class XmlParser(Parser):
                     content.register_token(self.eat(XmlTokenType.CONTENT))
                     elements.append(content)
                 elif self.current_token.type == XmlTokenType.TAG_START_BEGIN:
-                    elements.append(self.element())
+                    elements.append((yield self.element()))
             node.update(elements=elements)
 
             node.register_token(self.eat(XmlTokenType.TAG_COMPLETE_BEGIN))
@@ -3,6 +3,9 @@ from ..lexers import TokenType, YamlTokenType, Token
 
 
 class YamlParser(Parser):
+    # 解析 url/时间时会关闭 skip_invis_chars 以查找换行
+    gap_characters = frozenset(" ")
+
     def __init__(self, lexer, skip_invis_chars=True, skip_space=True):
         super().__init__(lexer, skip_invis_chars, skip_space)
 
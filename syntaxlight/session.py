@@ -0,0 +1,94 @@
+import os
+from enum import Enum
+from typing import Dict, Mapping, Union
+from .gdt import GlobalDescriptorTable
+from .language import SUPPORTED_SYNTAX, guess_language, clean_language
+from .syntax_parse import ParseResult, get_parser, get_prelude, run_parser
+
+
+class Session:
+    """
+    在同一个文档的多次解析之间共享符号表
+
+    一个 markdown 页面中通常有多个相同语言的代码段, 后面的代码段会使用前面定义的类型/函数/宏.
+    parse 每次都从空的符号表开始, Session 则为每种语言保存一个 GDT, 依次解析的代码段共享其中的全局定义,
+    因此前面代码段中的 typedef 在后面的代码段中可以直接识别, 不再依赖启发式的猜测
+
+    lexer 的关键字表/分派表本身就在模块中缓存, 所有解析共享
+
+    Session 用于顺序解析, 不要在多个线程中同时使用同一个 Session
+    """
+
+    def __init__(
+        self,
+        language: str = None,
+        build_ast: bool = True,
+        token_stream: bool = False,
+        prelude: Union[str, Mapping[str, Enum]] = None,
+        packrat_window: int = 0,
+    ):
+        """
+        :param language: 默认的代码语言, 默认为 None
+        :param build_ast: 是否保留抽象语法树, 见 parse, 默认为 True
+        :param token_stream: 是否将 token 转换为 TokenStream, 见 parse, 默认为 False
+        :param prelude: 预置的 (名称 -> 类型) 或快照文件路径, 见 build_prelude, 默认为 None
+        :param packrat_window: 缓存向后查看的判断结果, 见 parse, 默认为 0
+        """
+        self.language = None if language is None else clean_language(language)
+        self.build_ast = build_ast
+        self.token_stream = token_stream
+        self.prelude = None if prelude is None else get_prelude(prelude)
+        self.packrat_window = packrat_window
+        self._gdts: Dict[str, GlobalDescriptorTable] = {}
+
+    def get_gdt(self, language: str) -> GlobalDescriptorTable:
+        """
+        language 对应的共享 GDT, 第一次使用时创建
+        """
+        gdt = self._gdts.get(language)
+        if gdt is None:
+            gdt = GlobalDescriptorTable(SUPPORTED_SYNTAX[language]["parser"].default_descriptors)
+            gdt.set_prelude(self.prelude)
+            self._gdts[language] = gdt
+        return gdt
+
+    def parse(self, text: str, language=None, file_path=None, token_stream: bool = None) -> ParseResult:
+        """
+        解析文本, 使用并更新 language 对应的共享 GDT
+
+        :param text: 待解析的文本
+        :param language: 代码语言, 默认为 Session 的 language
+        :param file_path: 文件路径, 默认为 None
+        :param token_stream: 是否将 token 转换为 TokenStream, 默认为 Session 的 token_stream
+        :return: 返回一个 ParseResult 对象, 包含解析结果和错误信息
+        """
+        if len(text) == 0:
+            text = " "
+        language = self.language if language is None else clean_language(language)
+        parser = get_parser(text, language)
+        parser.context.build_ast = self.build_ast
+        parser.context.packrat_window = self.packrat_window
+        gdt = self.get_gdt(language)
+        # 上一个代码段解析失败时可能残留未关闭的作用域
+        gdt.clear_scopes()
+        parser.context.gdt = gdt
+        if token_stream is None:
+            token_stream = self.token_stream
+        return run_parser(parser, file_path=file_path, token_stream=token_stream)
+
+    def parse_file(self, file_path: str, language=None, token_stream: bool = None) -> ParseResult:
+        if not os.path.exists(file_path):
+            print(f"{file_path} file not exsist")
+
+        with open(file_path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+        if language is None:
+            language = self.language if self.language is not None else guess_language(file_path)
+        return self.parse(text, language=language, file_path=file_path, token_stream=token_stream)
+
+    def reset(self):
+        """
+        清空所有语言的 GDT, prelude 保留
+        """
+        self._gdts = {}
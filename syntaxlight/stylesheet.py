@@ -0,0 +1,306 @@
+import os
+import re
+import json
+import html
+import threading
+from typing import Dict, List, Tuple, FrozenSet, NamedTuple, Optional, Set, Collection
+
+CSS_DIR = os.path.join(os.path.dirname(__file__), "css")
+
+# .Token.A.B 形式的选择器, 可以只根据 span 的 class 判断是否匹配
+CLASS_SELECTOR_PATTERN = re.compile(r"^(\.[\w-]+)+$")
+# export_css 添加的作用域, 例如 pre[class*="language-c"]
+SCOPE_SELECTOR_PATTERN = re.compile(r"^pre\[class\*=\"language-[\w-]*\"\]$")
+# 所有 token 的 span 共有的 class
+BASE_CLASS = "Token"
+
+
+class CSSRule(NamedTuple):
+    selector: str
+    classes: FrozenSet[str]  # 选择器要求 span 具有的所有 class
+    declarations: str
+    theme: Optional[str]  # themes.json 中添加该规则的主题, css 文件中的规则为 None
+    selector_id: int  # 选择器的编号, 选择器相同的规则编号相同, 用于 class_alias
+
+
+class LanguageStyle(NamedTuple):
+    rules: Tuple[CSSRule, ...]
+    # 存在无法只根据 class 判断的 .Token 选择器 (例如后代选择器) 时为 False
+    resolvable: bool
+    # pre[class*="language-xxx"] 等作用于代码块本身的规则, (选择器, 声明块)
+    scope_rules: Tuple[Tuple[str, str], ...]
+    # 所有选择器中出现的 class, 存在按 class 属性匹配的选择器 (例如 [class*=...]) 时无法确定, 为 None
+    class_names: Optional[FrozenSet[str]]
+
+
+LANGUAGE_STYLES: Dict[str, LanguageStyle] = {}
+# (language, span 的 class 字符串) -> 匹配的规则编号
+STYLE_KEY_CACHE: Dict[Tuple[str, str], Optional[Tuple[int, ...]]] = {}
+# (language, span 的 class 字符串) -> 简写的 class
+CLASS_ALIAS_CACHE: Dict[Tuple[str, str], Optional[str]] = {}
+# (language, 主题, span 的 class 字符串) -> 层叠计算后的 style 属性
+RESOLVED_STYLE_CACHE: Dict[Tuple[str, str, str], Optional[str]] = {}
+_STYLE_LOCK = threading.Lock()
+
+
+def parse_css(css_content: str) -> List[Tuple[str, str]]:
+    """
+    将 css 文本拆分为 (选择器, 声明块), 选择器列表拆分为多项
+    """
+    css_content = re.sub(r"/\*.*?\*/", "", css_content, flags=re.S)
+    result = []
+    for selectors, declarations in re.findall(r"([^{}]+)\{([^{}]*)\}", css_content):
+        for selector in selectors.split(","):
+            result.append((" ".join(selector.split()), declarations.strip()))
+    return result
+
+
+def get_language_style(language: str) -> LanguageStyle:
+    """
+    css/<language>.css 以及 themes.json 中所有主题对 language 的扩展中作用于 token 的规则
+    """
+    style = LANGUAGE_STYLES.get(language)
+    if style is not None:
+        return style
+    # (选择器, 声明块, 主题)
+    items: List[Tuple[str, str, Optional[str]]] = []
+    css_file = os.path.join(CSS_DIR, f"{language}.css")
+    if os.path.exists(css_file):
+        with open(css_file, "r", encoding="utf-8") as f:
+            items.extend((selector, declarations, None) for selector, declarations in parse_css(f.read()))
+    for theme_name, theme in load_themes().items():
+        for class_name, css in theme.get("extension", {}).get(language, {}).items():
+            items.extend((selector, declarations, theme_name) for selector, declarations in parse_css(class_name + " {" + css + "}"))
+
+    rules: List[CSSRule] = []
+    scope_rules: List[Tuple[str, str]] = []
+    selector_ids: Dict[FrozenSet[str], int] = {}
+    resolvable = bool(items)
+    class_names = set() if items else None
+    for selector, declarations, theme_name in items:
+        if class_names is not None:
+            if "[class" in selector and not SCOPE_SELECTOR_PATTERN.match(selector):
+                class_names = None
+            else:
+                class_names.update(re.findall(r"\.([\w-]+)", selector))
+        if CLASS_SELECTOR_PATTERN.match(selector):
+            classes = frozenset(selector[1:].split("."))
+            selector_id = selector_ids.setdefault(classes, len(selector_ids))
+            rules.append(CSSRule(selector, classes, declarations, theme_name, selector_id))
+        elif SCOPE_SELECTOR_PATTERN.match(selector):
+            if theme_name is None:
+                scope_rules.append((selector, declarations))
+        else:
+            resolvable = False
+    style = LanguageStyle(
+        tuple(rules), resolvable, tuple(scope_rules), frozenset(class_names) if class_names is not None else None
+    )
+    with _STYLE_LOCK:
+        LANGUAGE_STYLES.setdefault(language, style)
+    return LANGUAGE_STYLES[language]
+
+
+def prune_class(language: str, css_class: str) -> str:
+    """
+    去掉 css_class 中没有出现在 language 的任何选择器中的 class, 这些 class 不影响显示效果
+    """
+    class_names = get_language_style(language).class_names
+    if class_names is None:
+        return css_class
+    return " ".join(class_name for class_name in css_class.split() if class_name in class_names)
+
+
+def load_themes() -> Dict[str, dict]:
+    with open(os.path.join(CSS_DIR, "themes.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def apply_theme(css_content: str, theme_name: str, themes: Dict[str, dict] = None) -> str:
+    """
+    使用主题颜色替换 css 中的 --type 等变量
+    """
+    if themes is None:
+        themes = load_themes()
+    if theme_name not in themes:
+        raise ValueError(f"unknown style {theme_name}, supported style: {list(themes.keys())}")
+    for type_name, color in themes[theme_name].items():
+        if type_name == "extension":
+            continue
+        css_content = css_content.replace(type_name, color)
+    for type_name, color in themes["others"].items():
+        css_content = css_content.replace(type_name, color)
+    return css_content
+
+
+def parse_declarations(declarations: str) -> Dict[str, str]:
+    """
+    "color: #fff; padding: 2px 0;" -> {"color": "#fff", "padding": "2px 0"}
+    """
+    result = {}
+    for declaration in declarations.split(";"):
+        name, _, value = declaration.partition(":")
+        if value.strip():
+            result[name.strip()] = value.strip()
+    return result
+
+
+def style_key(language: str, css_class: str) -> Optional[Tuple[int, ...]]:
+    """
+    class 为 css_class 的 span 匹配的所有规则的编号, 编号相同的两个 span 显示效果相同
+
+    language 没有 css 文件或者其中的选择器无法只根据 class 判断时返回 None
+    """
+    key = (language, css_class)
+    try:
+        return STYLE_KEY_CACHE[key]
+    except KeyError:
+        pass
+    style = get_language_style(language)
+    result = None
+    if style.resolvable:
+        classes = frozenset(css_class.split())
+        result = tuple(i for i, rule in enumerate(style.rules) if rule.classes <= classes)
+    STYLE_KEY_CACHE[key] = result
+    return result
+
+
+def class_alias(language: str, css_class: str) -> Optional[str]:
+    """
+    class 为 css_class 的 span 在 minify 模式下使用的 class, 由匹配的每个选择器的简写 a<编号> 组成,
+    例如 "a5 a7". 编号只取决于 css 文件和 themes.json, 多次运行的结果相同
+
+    只有 BASE_CLASS 的选择器 (.Token) 所有 span 都匹配, 不生成简写, 见 minified_css
+
+    与 style_key 一样, 无法判断匹配的规则时返回 None
+    """
+    key = (language, css_class)
+    try:
+        return CLASS_ALIAS_CACHE[key]
+    except KeyError:
+        pass
+    rule_ids = style_key(language, css_class)
+    result = None
+    if rule_ids is not None:
+        rules = get_language_style(language).rules
+        selector_ids = sorted({rules[i].selector_id for i in rule_ids if rules[i].classes != {BASE_CLASS}})
+        result = " ".join(f"a{selector_id}" for selector_id in selector_ids)
+    CLASS_ALIAS_CACHE[key] = result
+    return result
+
+
+def theme_rules(language: str, theme_name: str, css_classes: Collection[str] = None) -> List[CSSRule]:
+    """
+    theme_name 主题下 language 的所有规则, 给出 css_classes 时只保留至少能匹配其中一个 class 组合的规则
+    """
+    rules = [rule for rule in get_language_style(language).rules if rule.theme in (None, theme_name)]
+    if css_classes is not None:
+        class_sets = {frozenset(css_class.split()) for css_class in css_classes}
+        rules = [rule for rule in rules if any(rule.classes <= classes for classes in class_sets)]
+    return rules
+
+
+def scope_css(language: str) -> str:
+    return rules_css(get_language_style(language).scope_rules)
+
+
+def rules_css(rules: List[Tuple[str, str]]) -> str:
+    """
+    (选择器, 声明块) 转为 css 文本, 相邻的声明块相同的规则合并为一个选择器列表
+    """
+    css_content = ""
+    selectors: List[str] = []
+    for i, (selector, declarations) in enumerate(rules):
+        if selector not in selectors:
+            selectors.append(selector)
+        if i + 1 == len(rules) or rules[i + 1][1] != declarations:
+            css_content += ",\n".join(selectors) + " {\n    " + declarations + "\n}\n\n"
+            selectors = []
+    return css_content
+
+
+def minified_css(language: str, theme_name: str, css_classes: Collection[str] = None) -> Optional[str]:
+    """
+    与 class_alias 配套的 css, 每条规则的选择器替换为简写的 class, 并添加 language 的作用域.
+    给出 css_classes 时只包含这些 class 组合可能匹配的规则
+
+    简写的选择器只有一个 class, 优先级都相同, 因此按照原选择器的优先级 (class 的个数) 和出现的顺序排列规则,
+    后面的规则覆盖前面的规则, 与原 css 的层叠结果一致. 没有简写的 .Token 规则作用于 code 中的所有 span,
+    优先级低于简写的选择器, 与原 css 中 .Token 的优先级最低一致
+    """
+    if not get_language_style(language).resolvable:
+        return None
+    scope = f'pre[class*="language-{language}"]'
+    rules = sorted(theme_rules(language, theme_name, css_classes), key=lambda rule: len(rule.classes))
+    return scope_css(language) + rules_css(
+        [
+            (f"{scope} code span" if rule.classes == {BASE_CLASS} else f"{scope} .a{rule.selector_id}", rule.declarations)
+            for rule in rules
+        ]
+    )
+
+
+def used_css(language: str, theme_name: str, css_classes: Collection[str]) -> Optional[str]:
+    """
+    只包含 css_classes 中的 class 组合可能匹配的规则的 css, 规则的顺序与原 css 相同
+    """
+    if not get_language_style(language).resolvable:
+        return None
+    scope = f'pre[class*="language-{language}"]'
+    rules = theme_rules(language, theme_name, css_classes)
+    return scope_css(language) + rules_css([(f"{scope} {rule.selector}", rule.declarations) for rule in rules])
+
+
+class UsedClasses:
+    """
+    记录渲染时实际输出的 span 的 class, 作为 Parser.to_html 等的 used_classes 参数传入,
+    可以在多次渲染 (例如一个页面中的所有代码块) 之间共享, 见 export_used_css
+    """
+
+    def __init__(self) -> None:
+        # language -> 输出过的 class 字符串
+        self.classes: Dict[str, Set[str]] = {}
+
+    def add(self, language: str, css_class: str):
+        css_classes = self.classes.get(language)
+        if css_classes is None:
+            css_classes = self.classes[language] = set()
+        css_classes.add(css_class)
+
+
+def resolved_style(language: str, css_class: str, theme_name: str) -> Optional[str]:
+    """
+    class 为 css_class 的 span 在 theme_name 主题下最终生效的声明, 可以直接作为 span 的 style 属性
+
+    与浏览器的层叠规则一致: 每个属性取匹配的规则中优先级 (class 的个数) 最高的, 优先级相同时取后出现的.
+    每个 (language, 主题, class 组合) 只计算一次. 无法判断匹配的规则时返回 None
+    """
+    key = (language, theme_name, css_class)
+    try:
+        return RESOLVED_STYLE_CACHE[key]
+    except KeyError:
+        pass
+    rule_ids = style_key(language, css_class)
+    result = None
+    if rule_ids is not None:
+        rules = get_language_style(language).rules
+        matched = sorted((len(rules[i].classes), i) for i in rule_ids if rules[i].theme in (None, theme_name))
+        properties: Dict[str, str] = {}
+        for _, i in matched:
+            for name, value in parse_declarations(rules[i].declarations).items():
+                # 后生效的声明放在后面, background 等简写属性与其子属性同时出现时结果与层叠一致
+                properties.pop(name, None)
+                properties[name] = value
+        declarations = ";".join(f"{name}:{value}" for name, value in properties.items())
+        result = html.escape(apply_theme(declarations, theme_name))
+    RESOLVED_STYLE_CACHE[key] = result
+    return result
+
+
+def scope_style(language: str, theme_name: str) -> str:
+    """
+    theme_name 主题下代码块 (pre) 本身的声明, 例如背景色, 配合 resolved_style 生成不依赖外部 css 的代码块
+    """
+    properties: Dict[str, str] = {}
+    for _, declarations in get_language_style(language).scope_rules:
+        properties.update(parse_declarations(declarations))
+    return html.escape(apply_theme(";".join(f"{name}:{value}" for name, value in properties.items()), theme_name))
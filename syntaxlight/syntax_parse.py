@@ -4,10 +4,16 @@ from .parsers import *
 from .error import Error, ttyinfo
 from .language import guess_language, SUPPORTED_SYNTAX, show_help_info, clean_language
 from .asts.ast import display_ast
+from .gdt import CSS, load_prelude, dump_prelude
 import traceback
-from typing import Tuple, Optional, List
+from types import MappingProxyType
+from typing import Tuple, Optional, List, Mapping, Union
+from enum import Enum
 from dataclasses import dataclass
 
+# prelude 中保存的 id 类型, 即 CParser 在 after_eat 中识别的类型
+PRELUDE_TYPES = (CSS.TYPEDEF, CSS.MACRO_DEFINE, CSS.MACRO_FUNCTION)
+
 
 @dataclass
 class ParseResult:
@@ -16,7 +22,15 @@ class ParseResult:
     error: Error  # 错误信息(如果有)
 
 
-def parse(text: str, language=None, file_path=None) -> ParseResult:
+def parse(
+    text: str,
+    language=None,
+    file_path=None,
+    token_stream=False,
+    build_ast=True,
+    prelude: Union[str, Mapping[str, Enum]] = None,
+    packrat_window: int = 0,
+) -> ParseResult:
     """
     解析文本, 高亮代码段
 
@@ -26,22 +40,49 @@ def parse(text: str, language=None, file_path=None) -> ParseResult:
     :param save_ast_tree: 是否保存抽象语法树, 默认为 False
     :param highlight_lines: 要高亮的代码段的行号, 默认为空列表
     :param highlight_tokens: 要高亮的代码段的 token 号, 默认为空列表
+    :param token_stream: 解析完成后将 token 转换为按列存储的 TokenStream, 减小保留的解析结果占用的内存, 解析过程中仍然创建完整的 Token, 峰值内存基本不变, 默认为 False
+    :param build_ast: 是否保留抽象语法树, 为 False 时只为 token 添加 CSS 类名, parser.root 为 None, 默认为 True
+    :param prelude: 预置的 (名称 -> 类型) 或 build_prelude 生成的快照文件路径, 只读, 默认为 None
+    :param packrat_window: 大于 0 时缓存 parser 向后查看的判断结果, 只保留最近 packrat_window 个 token 以内的结果, 见 Parser.memoize, 默认为 0 (不缓存)
     :return: 返回一个 ParseResult 对象, 包含解析结果和错误信息
     """
     if len(text) == 0:
         text = " "
     language = clean_language(language)
     parser = get_parser(text, language)
-    parser.lexer.file_path = file_path
+    parser.context.build_ast = build_ast
+    parser.context.packrat_window = packrat_window
+    if prelude is not None:
+        parser.gdt.set_prelude(get_prelude(prelude))
+    return run_parser(parser, file_path=file_path, token_stream=token_stream)
+
 
+def get_prelude(prelude: Union[str, Mapping[str, Enum]]) -> Mapping[str, Enum]:
+    """
+    prelude 为快照文件路径时读取快照, 否则原样返回
+    """
+    if isinstance(prelude, str):
+        return load_prelude(prelude)
+    return prelude
+
+
+def run_parser(parser: Parser, file_path=None, token_stream=False) -> ParseResult:
+    """
+    运行 parser, 解析失败时将剩余部分也解析, 见 parse
+    """
+    parser.lexer.file_path = file_path
+    build_ast = parser.build_ast
     exception: Optional[Error] = None
     try:
-        parser.parse()
-    except Error as e:
-        exception = e
-        # 失败后将剩余部分也解析
-        while parser.current_token.type != TokenType.EOF:
-            parser.eat()
+        # 解析期间创建的 AST 节点都属于 parser.context
+        with parser.context:
+            try:
+                parser.parse()
+            except Error as e:
+                exception = e
+                # 失败后将剩余部分也解析
+                while parser.current_token.type != TokenType.EOF:
+                    parser.eat()
     except Exception as e:
         exception = Error()
         exception.self_error_info = f'  {ttyinfo("Parse running error")}: {e}\n'
@@ -49,16 +90,25 @@ def parse(text: str, language=None, file_path=None) -> ParseResult:
             exception.self_error_info += f'  {ttyinfo("File path")}: {file_path}\n'
         exception.self_error_info += traceback.format_exc()
         # 失败后将剩余部分也解析
-        while parser.current_token.type != TokenType.EOF:
-            parser.eat()
+        with parser.context:
+            while parser.current_token.type != TokenType.EOF:
+                parser.eat()
     finally:
+        parser.resolve_ast_types()
+        if not build_ast:
+            parser.root = None
+            parser.sub_roots = []
+        if token_stream:
+            parser.compact_token_list()
         # if save_ast_tree:
         #     display_ast(parser.root, parser.sub_roots)
         # print(parser.node)
         return ParseResult(success=exception is None, parser=parser, error=exception)
 
 
-def parse_file(file_path: str, language=None) -> ParseResult:
+def parse_file(
+    file_path: str, language=None, token_stream=False, build_ast=True, prelude=None, packrat_window=0
+) -> ParseResult:
     if not os.path.exists(file_path):
         print(f"{file_path} file not exsist")
 
@@ -70,7 +120,44 @@ def parse_file(file_path: str, language=None) -> ParseResult:
     else:
         language = clean_language(language)
 
-    return parse(text, language=language, file_path=file_path)
+    return parse(
+        text,
+        language=language,
+        file_path=file_path,
+        token_stream=token_stream,
+        build_ast=build_ast,
+        prelude=prelude,
+        packrat_window=packrat_window,
+    )
+
+
+def build_prelude(header_paths: List[str], output_path: str = None, language="c") -> Mapping[str, Enum]:
+    """
+    依次解析头文件, 将其中的 typedef/宏定义 冻结为只读的 prelude
+
+    后面的头文件可以使用前面头文件中的定义, 与 #include 的顺序一致.
+    output_path 不为 None 时同时保存为快照文件, 之后可以通过 parse(..., prelude=output_path) 使用
+
+    :param header_paths: 头文件路径
+    :param output_path: 快照文件的保存路径, 默认为 None
+    :param language: 头文件的语言, 默认为 c
+    :return: 只读的 (名称 -> 类型)
+    """
+    language = clean_language(language)
+    descriptors = {}
+    prelude = MappingProxyType(descriptors)
+    for header_path in header_paths:
+        with open(header_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        result = parse(text, language=language, file_path=header_path, build_ast=False, prelude=prelude)
+        # snapshot 已经包含之前的 prelude, 并去掉了被 #undef 或重新定义为其他类型的 id
+        snapshot = result.parser.gdt.snapshot(PRELUDE_TYPES)
+        descriptors.clear()
+        descriptors.update(snapshot)
+
+    if output_path is not None:
+        dump_prelude(descriptors, output_path)
+    return prelude
 
 
 def get_tokens(lexer: Lexer):
@@ -100,4 +187,5 @@ def get_lexer(text: str, language: str = None) -> Lexer:
 def get_parser(text: str, language: str = None) -> Parser:
     lexer = get_lexer(text, language)
     parser = SUPPORTED_SYNTAX[language]["parser"](lexer)
+    parser.language = language
     return parser
@@ -1,7 +1,9 @@
 
 from enum import Enum
+from bisect import bisect_right
+from typing import List, Optional, Tuple, Dict
+import threading
 
-GLOBAL_TOKEN_ID = 0
 
 class BaseTokenType(Enum):
     RESERVED_KEYWORD_START = "RESERVED_KEYWORD_START"
@@ -95,27 +97,253 @@ class TokenType(Enum):
     DOUBLE_HASH = "##"
 
 
+class LineIndex:
+    """
+    文本中每一行起始位置的索引, 每个文档只构建一次
+
+    用于按需计算 token 的行列号, 以及错误输出时获取某一行的内容
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.line_starts: List[int] = [0]
+        pos = text.find("\n")
+        while pos != -1:
+            self.line_starts.append(pos + 1)
+            pos = text.find("\n", pos + 1)
+
+    def line(self, pos: int) -> int:
+        """
+        pos 所在的行号, 从 1 开始
+        """
+        return bisect_right(self.line_starts, pos)
+
+    def column(self, pos: int) -> int:
+        """
+        pos 所在的列号, 从 1 开始
+        """
+        return pos - self.line_starts[bisect_right(self.line_starts, pos) - 1] + 1
+
+    def get_line(self, line: int) -> str:
+        """
+        第 line 行的内容, 不包含结尾的换行, 超出范围时返回空字符串
+        """
+        if line < 1 or line > len(self.line_starts):
+            return ""
+        start = self.line_starts[line - 1]
+        if line < len(self.line_starts):
+            return self.text[start : self.line_starts[line] - 1]
+        return self.text[start:]
+
+    def offset(self, line: int, column: int) -> int:
+        """
+        line 行 column 列在文本中的位置, line column 计算的逆运算
+        """
+        return self.line_starts[line - 1] + column - 1
+
+    def __len__(self):
+        return len(self.line_starts)
+
+
+# token 的 class 以不可变的元组保存, 相同的 class 组合在所有 token 之间共享同一个元组对象
+# (classes, class_name) -> 追加 class_name 之后的元组
+CLASS_APPEND_CACHE = {}
+# (classes, class_name) -> 删除第一个 class_name 之后的元组
+CLASS_REMOVE_CACHE = {}
+# classes -> 删除最后一个 class 之后的元组
+CLASS_POP_CACHE = {}
+# classes -> 去除重复 class 之后的元组
+CLASS_UNIQUE_CACHE = {}
+# (classes, token type) -> 转 html 时的 span class 字符串
+CSS_CLASS_CACHE = {}
+
+
+def append_class(classes: tuple, class_name: str) -> tuple:
+    key = (classes, class_name)
+    result = CLASS_APPEND_CACHE.get(key)
+    if result is None:
+        result = classes + (class_name,)
+        CLASS_APPEND_CACHE[key] = result
+    return result
+
+
+def remove_class(classes: tuple, class_name: str) -> tuple:
+    """
+    删除第一个 class_name, 不存在时返回原元组
+    """
+    key = (classes, class_name)
+    result = CLASS_REMOVE_CACHE.get(key)
+    if result is None:
+        result = classes
+        if class_name in classes:
+            index = classes.index(class_name)
+            result = classes[:index] + classes[index + 1 :]
+        CLASS_REMOVE_CACHE[key] = result
+    return result
+
+
+def pop_class(classes: tuple) -> tuple:
+    """
+    删除最后一个 class
+    """
+    result = CLASS_POP_CACHE.get(classes)
+    if result is None:
+        result = classes[:-1]
+        CLASS_POP_CACHE[classes] = result
+    return result
+
+
+def unique_classes(classes: tuple) -> tuple:
+    """
+    去除重复的 class, 保留第一次出现的位置
+    """
+    result = CLASS_UNIQUE_CACHE.get(classes)
+    if result is None:
+        result = tuple(dict.fromkeys(classes))
+        if result == classes:
+            result = classes
+        CLASS_UNIQUE_CACHE[classes] = result
+    return result
+
+
+def css_class_string(classes: tuple, token_type: Enum) -> str:
+    """
+    转 html 时的 span class
+    """
+    key = (classes, token_type)
+    css_class = CSS_CLASS_CACHE.get(key)
+    if css_class is None:
+        css_class = " ".join(classes) + " " + token_type.name
+        CSS_CLASS_CACHE[key] = css_class
+    return css_class
+
+
+class ClassList(list):
+    """
+    Token.class_list 返回的列表, 原地修改 (append/remove 等) 后同步回 token, 兼容直接修改 class_list 的写法
+    """
+
+    __slots__ = ("_token",)
+
+    def __init__(self, token, classes: tuple):
+        super().__init__(classes)
+        self._token = token
+
+
+def _sync_class_list(name: str):
+    method = getattr(list, name)
+
+    def wrapper(self: ClassList, *args):
+        result = method(self, *args)
+        self._token._set_classes(tuple(self))
+        return result
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in (
+    "append",
+    "extend",
+    "insert",
+    "remove",
+    "pop",
+    "clear",
+    "sort",
+    "reverse",
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+):
+    setattr(ClassList, _name, _sync_class_list(_name))
+del _name
+
+
 class Token:
-    def __init__(self, type: Enum, value, line=None, column=None):
+    __slots__ = ("type", "value", "_line", "_column", "_pos", "_line_index", "ast", "_classes", "_id")
+
+    def __init__(
+        self, type: Enum, value, line=None, column=None, pos=None, line_index: LineIndex = None, token_id: int = None
+    ):
+        """
+        line column 可以直接给出, 也可以给出 pos 和 line_index, 在第一次访问时计算 pos 处的行列号
+
+        token_id 为 token 在当前文本中被 lexer 创建的顺序, parser 拆分/合并得到的 token 为 None
+        """
         self.type: Enum = type
         self.value: str = value
-        self.line: int = line
-        self.column: int = column
-        self.ast: None
-        self.class_list = ["Token"]  # parser 语法分析阶段赋给 token
-        global GLOBAL_TOKEN_ID
-        self._id = GLOBAL_TOKEN_ID
-        GLOBAL_TOKEN_ID += 1
+        self._line: int = line
+        self._column: int = column
+        self._pos: int = pos
+        self._line_index: LineIndex = line_index
+        self.ast = None
+        self._classes: tuple = ("Token",)  # parser 语法分析阶段赋给 token
+        self._id = token_id
+
+    @property
+    def line(self) -> int:
+        if self._line is None and self._line_index is not None:
+            self._line = self._line_index.line(self._pos)
+        return self._line
+
+    @line.setter
+    def line(self, line: int):
+        self._line = line
+
+    @property
+    def column(self) -> int:
+        if self._column is None and self._line_index is not None:
+            self._column = self._line_index.column(self._pos)
+        return self._column
+
+    @column.setter
+    def column(self, column: int):
+        self._column = column
+
+    @property
+    def classes(self) -> tuple:
+        """
+        token 当前的所有 class, 只读, 修改请使用 add_class/remove_class/pop_class
+        """
+        return self._classes
+
+    @property
+    def class_list(self) -> ClassList:
+        """
+        token 当前的所有 class 的列表, 每次访问都会复制一份, 只读时使用 classes
+        """
+        return ClassList(self, self._classes)
+
+    @class_list.setter
+    def class_list(self, class_list: List[str]):
+        self._set_classes(tuple(class_list))
+
+    def _set_classes(self, classes: tuple):
+        self._classes = classes
 
     def get_css_class(self):
         # 转 html 时的 span class
-        css_class = ""
-
-        for class_type in self.class_list:
-            css_class += f"{class_type} "
+        return css_class_string(self._classes, self.type)
 
-        css_class += self.type.name
-        return css_class
+    def source_span(self, line_index: LineIndex) -> Optional[Tuple[int, int]]:
+        """
+        token 在原文中的位置 [start, end), value 不是原文的切片 (例如 parser 合并/改写过的 token) 时返回 None
+        """
+        text = line_index.text
+        if self._pos is not None and self._line_index is not None and self._line_index.text is text:
+            end = self._pos + 1
+            start = end - len(self.value)
+            if start >= 0 and text.startswith(self.value, start):
+                return start, end
+        # parser 创建或修改了行列号的 token
+        line, column = self.line, self.column
+        if line is not None and column is not None and 0 < line <= len(line_index):
+            end = line_index.offset(line, column) + 1
+            start = end - len(self.value)
+            if start >= 0 and text.startswith(self.value, start):
+                return start, end
+        return None
 
     def __str__(self):
         """
@@ -130,40 +358,92 @@ class Token:
             column=self.column,
         )
 
+    def add_class(self, class_name: str):
+        self._classes = append_class(self._classes, class_name)
+
+    def remove_class(self, class_name: str):
+        """
+        删除第一个 class_name, 不存在时忽略
+        """
+        self._classes = remove_class(self._classes, class_name)
+
+    def pop_class(self) -> str:
+        """
+        删除最后一个 class 并返回
+        """
+        class_name = self._classes[-1]
+        self._classes = pop_class(self._classes)
+        return class_name
+
+    def unique_class(self):
+        """
+        去除重复的 class
+        """
+        self._classes = unique_classes(self._classes)
+
     def add_css(self, CSS: Enum):
         if CSS is not None:
-            self.class_list.append(CSS.value)
+            self.add_class(CSS.value)
 
     def remove_css(self, CSS: Enum):
         if CSS is not None:
-            for class_type in self.class_list:
-                if class_type == CSS.value:
-                    self.class_list.remove(class_type)
-                    break
+            self.remove_class(CSS.value)
 
     def __repr__(self):
         return self.__str__()
 
 
+# token 类型的全局编号, 同一个 Enum 类的所有成员在第一次注册时一起编号, 编号保存在成员的 _kind_id 属性上
+TOKEN_KINDS: List[Enum] = []
+TOKEN_KIND_CLASSES: Dict[type, int] = {}
+# 只在注册新的 Enum 类时加锁, 保证多线程解析时编号唯一
+_KIND_LOCK = threading.Lock()
+
+
+def token_kind_id(token_type: Enum) -> int:
+    """
+    token 类型的整数编号, 用于 TokenSet 的位掩码和 TokenStream 的类型列
+    """
+    kind_id = getattr(token_type, "_kind_id", None)
+    if kind_id is None:
+        with _KIND_LOCK:
+            enum_class = type(token_type)
+            if enum_class not in TOKEN_KIND_CLASSES:
+                TOKEN_KIND_CLASSES[enum_class] = len(TOKEN_KINDS)
+                for member in enum_class:
+                    member._kind_id = len(TOKEN_KINDS)
+                    TOKEN_KINDS.append(member)
+        kind_id = token_type._kind_id
+    return kind_id
+
+
 class TokenSet:
     """
     用于 first set 的构建
+
+    集合编译为 token 类型编号的位掩码, 判断 token.type in TokenSet 只需要一次移位和与运算
     """
 
     def __init__(self, *args) -> None:
         self._token_set = set()
+        self._mask = 0
         for arg in args:
             if isinstance(arg, Enum):
                 self._token_set.add(arg)
+                self._mask |= 1 << token_kind_id(arg)
 
             elif isinstance(arg, TokenSet):
-                for token_type in arg._token_set:
-                    self._token_set.add(token_type)
+                self._token_set.update(arg._token_set)
+                self._mask |= arg._mask
             else:
                 raise TypeError(args)
 
     def __contains__(self, item):
-        return item in self._token_set
+        try:
+            return self._mask >> item._kind_id & 1
+        except AttributeError:
+            # 尚未编号的 Enum 类的成员不可能在集合中
+            return False
 
     def __eq__(self, __value: object) -> bool:
-        return self.__contains__(__value)
+        return bool(self.__contains__(__value))
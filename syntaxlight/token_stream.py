@@ -0,0 +1,215 @@
+import threading
+from array import array
+from enum import Enum
+from typing import Dict, List, Iterable, Iterator, Union, Tuple
+from .token import Token, LineIndex, ClassList, append_class, remove_class, pop_class, unique_classes, css_class_string
+from .token import TOKEN_KINDS, token_kind_id
+
+# token 类型使用 token.py 中的全局编号, class 组合的全局编号所有 TokenStream 共享
+TOKEN_TYPES: List[Enum] = TOKEN_KINDS
+CLASS_SETS: List[tuple] = []
+CLASS_SET_IDS: Dict[tuple, int] = {}
+# 只在注册新的 class 组合时加锁, 保证多线程解析时编号唯一
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_type_id(token_type: Enum) -> int:
+    return token_kind_id(token_type)
+
+
+def get_class_set_id(classes: tuple) -> int:
+    class_set_id = CLASS_SET_IDS.get(classes)
+    if class_set_id is None:
+        with _REGISTRY_LOCK:
+            class_set_id = CLASS_SET_IDS.get(classes)
+            if class_set_id is None:
+                class_set_id = len(CLASS_SETS)
+                CLASS_SETS.append(classes)
+                CLASS_SET_IDS[classes] = class_set_id
+    return class_set_id
+
+
+class StreamToken:
+    """
+    TokenStream 中第 index 个 token 的视图, 接口与 Token 一致
+
+    视图只在访问时创建, 读写直接作用于 TokenStream 的各列
+    """
+
+    __slots__ = ("_stream", "_index")
+
+    def __init__(self, stream: "TokenStream", index: int):
+        self._stream = stream
+        self._index = index
+
+    @property
+    def type(self) -> Enum:
+        return TOKEN_TYPES[self._stream.types[self._index]]
+
+    @type.setter
+    def type(self, token_type: Enum):
+        self._stream.types[self._index] = get_type_id(token_type)
+
+    @property
+    def value(self) -> str:
+        stream = self._stream
+        return stream.text[stream.starts[self._index] : stream.ends[self._index]]
+
+    @property
+    def line(self) -> int:
+        return self._stream.line_index.line(self._stream.ends[self._index] - 1)
+
+    @property
+    def column(self) -> int:
+        return self._stream.line_index.column(self._stream.ends[self._index] - 1)
+
+    @property
+    def classes(self) -> tuple:
+        return CLASS_SETS[self._stream.class_set_ids[self._index]]
+
+    @property
+    def class_list(self) -> ClassList:
+        return ClassList(self, self.classes)
+
+    @class_list.setter
+    def class_list(self, class_list: List[str]):
+        self._set_classes(tuple(class_list))
+
+    def _set_classes(self, classes: tuple):
+        self._stream.class_set_ids[self._index] = get_class_set_id(classes)
+
+    def get_css_class(self):
+        return css_class_string(self.classes, self.type)
+
+    def source_span(self, line_index: LineIndex = None) -> Tuple[int, int]:
+        stream = self._stream
+        return stream.starts[self._index], stream.ends[self._index]
+
+    def add_class(self, class_name: str):
+        self._set_classes(append_class(self.classes, class_name))
+
+    def remove_class(self, class_name: str):
+        self._set_classes(remove_class(self.classes, class_name))
+
+    def pop_class(self) -> str:
+        classes = self.classes
+        self._set_classes(pop_class(classes))
+        return classes[-1]
+
+    def unique_class(self):
+        self._set_classes(unique_classes(self.classes))
+
+    def add_css(self, CSS: Enum):
+        if CSS is not None:
+            self.add_class(CSS.value)
+
+    def remove_css(self, CSS: Enum):
+        if CSS is not None:
+            self.remove_class(CSS.value)
+
+    def __str__(self):
+        return "StreamToken[{index}]({type}, {value}, position={lineno}:{column})".format(
+            index=self._index,
+            type=self.type,
+            value=repr(self.value),
+            lineno=self.line,
+            column=self.column,
+        )
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class TokenStream:
+    """
+    按列存储的 token 序列, 可以替代 Parser.token_list 用于大文件
+
+    每个 token 只占 4 个 array('I') 中的一项: 类型编号, 起始位置, 结束位置, class 组合编号,
+    value 是原文本 [start:end] 的切片, 访问时才生成. 索引和迭代返回 StreamToken 视图,
+    因此 brace_matching / to_html 等按 Token 接口编写的代码可以直接运行在 TokenStream 上
+
+    无法表示为原文切片的 token (例如 parser 合并/改写过 value 的 token) 原样保存在 _objects 中
+
+    parser 在解析过程中仍然创建和修改完整的 Token, 解析完成后才转换为 TokenStream,
+    因此只减小保留的解析结果占用的内存, 不降低解析时的峰值内存
+    """
+
+    def __init__(self, text: str, line_index: LineIndex = None):
+        self.text = text
+        self.line_index = line_index if line_index is not None else LineIndex(text)
+        self.types = array("I")
+        self.starts = array("I")
+        self.ends = array("I")
+        self.class_set_ids = array("I")
+        self._objects: Dict[int, Token] = {}
+
+    @classmethod
+    def from_tokens(cls, text: str, tokens: Iterable[Token], line_index: LineIndex = None) -> "TokenStream":
+        stream = cls(text, line_index)
+        for token in tokens:
+            stream.append(token)
+        return stream
+
+    def append(self, token: Token):
+        """
+        添加一个 token, 之后对 token 对象的修改不会再反映到 TokenStream 中
+        """
+        span = token.source_span(self.line_index)
+        if span is None:
+            self._objects[len(self.types)] = token
+            start = end = 0
+        else:
+            start, end = span
+            line_index = self.line_index
+            if token._line is not None and (token._line, token._column) != (
+                line_index.line(end - 1),
+                line_index.column(end - 1),
+            ):
+                # 行列号与位置不一致 (例如 lexer 直接给出的行列号), 视图无法还原, 原样保存
+                self._objects[len(self.types)] = token
+        self.types.append(get_type_id(token.type))
+        self.starts.append(start)
+        self.ends.append(end)
+        self.class_set_ids.append(get_class_set_id(token.classes))
+
+    def extend(self, tokens: Iterable[Token]):
+        for token in tokens:
+            self.append(token)
+
+    def pop(self, index: int = -1) -> Union[Token, StreamToken]:
+        """
+        只支持删除结尾的 token
+        """
+        length = len(self.types)
+        if index < 0:
+            index += length
+        assert index == length - 1, "TokenStream only supports popping the last token"
+        token = self._objects.pop(index, None)
+        if token is None:
+            view = StreamToken(self, index)
+            token = Token(view.type, view.value, pos=self.ends[index] - 1, line_index=self.line_index)
+            token._classes = view.classes
+        self.types.pop()
+        self.starts.pop()
+        self.ends.pop()
+        self.class_set_ids.pop()
+        return token
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Union[Token, StreamToken]:
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError("TokenStream index out of range")
+        token = self._objects.get(index)
+        if token is not None:
+            return token
+        return StreamToken(self, index)
+
+    def __iter__(self) -> Iterator[Union[Token, StreamToken]]:
+        objects = self._objects
+        for index in range(len(self.types)):
+            token = objects.get(index)
+            yield token if token is not None else StreamToken(self, index)
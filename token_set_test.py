@@ -0,0 +1,54 @@
+import unittest
+from enum import Enum
+from syntaxlight import TokenSet, TokenType
+from syntaxlight.lexers import CTokenType, RustTokenType, JsonTokenType
+from syntaxlight.parsers.rust_parser import RustParser
+from syntaxlight.parsers.json_parser import JsonParser
+from syntaxlight.parsers.toml_parser import TomlParser
+from syntaxlight.parsers.bnf_parser import BNFParser
+
+
+class UnusedTokenType(Enum):
+    # 没有被任何 TokenSet 使用过, 成员尚未编号
+    A = "a"
+
+
+class TestTokenSet(unittest.TestCase):
+    def test_membership(self):
+        members = [TokenType.ID, TokenType.LPAREN, CTokenType.STRUCT, RustTokenType.FN]
+        token_set = TokenSet(*members)
+        for token_type in (*TokenType, *CTokenType, *RustTokenType):
+            self.assertEqual(bool(token_type in token_set), token_type in members, token_type)
+        self.assertFalse(UnusedTokenType.A in token_set)
+
+    def test_union(self):
+        first = TokenSet(TokenType.ID)
+        second = TokenSet(first, CTokenType.STRUCT)
+        self.assertTrue(TokenType.ID in second)
+        self.assertTrue(CTokenType.STRUCT in second)
+        self.assertFalse(CTokenType.STRUCT in first)
+        # 列表中的 TokenSet 与成员比较时按照包含关系判断
+        self.assertTrue(CTokenType.STRUCT in [TokenType.LPAREN, second])
+
+    def test_parser_sets(self):
+        # membership 判断使用的集合都是类属性的 TokenSet, 所有 parser 共享, 不在 __init__ 中重复创建
+        for parser_class, name in (
+            (RustParser, "binary_op_set"),
+            (JsonParser, "value_first_set"),
+            (TomlParser, "value_first_set"),
+            (TomlParser, "path_first_set"),
+            (BNFParser, "punctuator_first_set"),
+            (BNFParser, "term_first_set"),
+        ):
+            self.assertIsInstance(parser_class.__dict__.get(name), TokenSet, name)
+        self.assertTrue(TokenType.PLUS in RustParser.binary_op_set)
+        self.assertFalse(TokenType.SEMI in RustParser.binary_op_set)
+        self.assertTrue(JsonTokenType.NULL in JsonParser.value_first_set)
+
+    def test_invalid_member(self):
+        with self.assertRaises(TypeError):
+            TokenSet("ID")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import syntaxlight
+from syntaxlight.token import Token, TokenType, LineIndex
+from syntaxlight.token_stream import TokenStream, StreamToken
+from corpus import load_test_files
+
+TEST_FILES = load_test_files()
+
+
+def token_attributes(parser):
+    line_index = parser.lexer.line_index
+    return [
+        (token.type, token.value, token.line, token.column, token.classes, token.source_span(line_index))
+        for token in parser.token_list
+    ]
+
+
+class TestTokenStream(unittest.TestCase):
+    def test_token_stream(self):
+        # token_stream=True 与默认模式的 token 属性和高亮结果相同
+        for language, files in TEST_FILES.items():
+            for file_path in files:
+                with self.subTest(file_path=file_path):
+                    expected = syntaxlight.parse_file(file_path, language)
+                    result = syntaxlight.parse_file(file_path, language, token_stream=True)
+                    self.assertIsInstance(result.parser.token_list, TokenStream)
+                    self.assertEqual(result.success, expected.success)
+                    self.assertEqual(token_attributes(result.parser), token_attributes(expected.parser))
+                    self.assertEqual(result.parser.to_html([2], [3]), expected.parser.to_html([2], [3]))
+
+    def test_objects(self):
+        # value 不是原文切片的 token 原样保存, 其余 token 保存为视图
+        text = "a = bc"
+        line_index = LineIndex(text)
+        tokens = [
+            Token(TokenType.ID, "a", pos=0, line_index=line_index),
+            Token(TokenType.ASSIGN, "==", 1, 3),
+            Token(TokenType.ID, "bc", pos=5, line_index=line_index),
+        ]
+        tokens[2].add_class("Name")
+        stream = TokenStream.from_tokens(text, tokens, line_index)
+        self.assertEqual(len(stream), 3)
+        self.assertIsInstance(stream[0], StreamToken)
+        self.assertIs(stream[1], tokens[1])
+        self.assertEqual([token.value for token in stream], ["a", "==", "bc"])
+        self.assertEqual(stream[-1].classes, ("Token", "Name"))
+        self.assertEqual((stream[2].line, stream[2].column), (1, 6))
+
+        stream[0].add_class("Name")
+        self.assertEqual(stream[0].get_css_class(), "Token Name ID")
+        token = stream.pop()
+        self.assertIsInstance(token, Token)
+        self.assertEqual((token.value, token.classes), ("bc", ("Token", "Name")))
+        self.assertEqual(len(stream), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import syntaxlight
+
+
+def first_token(**kwargs):
+    result = syntaxlight.parse("int a = 1;", "c", **kwargs)
+    return result.parser, result.parser.token_list[0]
+
+
+class TestClassList(unittest.TestCase):
+    def test_class_list(self):
+        # 原地修改 class_list 或重新赋值都会同步到 token, 与 add_class/remove_class 的效果相同
+        for token_stream in (False, True):
+            with self.subTest(token_stream=token_stream):
+                parser, token = first_token(token_stream=token_stream)
+                classes = token.classes
+                self.assertIsInstance(classes, tuple)
+                self.assertEqual(token.class_list, list(classes))
+
+                token.class_list.append("Extra")
+                self.assertEqual(token.classes, classes + ("Extra",))
+                self.assertIn("Extra", parser.to_html().split("</span>")[0])
+
+                class_list = token.class_list
+                class_list.remove("Extra")
+                class_list += ["A", "B"]
+                del class_list[-1]
+                self.assertEqual(token.classes, classes + ("A",))
+                self.assertEqual(token.class_list.pop(), "A")
+                self.assertEqual(token.classes, classes)
+
+                token.class_list = ["Token", "Other"]
+                self.assertEqual(token.classes, ("Token", "Other"))
+
+
+if __name__ == "__main__":
+    unittest.main()